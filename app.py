@@ -1,37 +1,149 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import Flask, abort, current_app, render_template, request, redirect, url_for, flash, session, jsonify, g
+from flask.cli import AppGroup
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import joinedload
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileAllowed
 from wtforms import StringField, PasswordField, TextAreaField, SelectField, FloatField, IntegerField
 from wtforms.validators import DataRequired, Email, Length
-from flask_babel import Babel, gettext as _
+from flask_babel import Babel, gettext as _, lazy_gettext as _l
 import os
+import hashlib
+import secrets
+import time
+import click
+from bisect import bisect_right
+from operator import attrgetter
 from dotenv import load_dotenv
+from identity_cache import Identity, IdentityCache
+from catalog_cache import CatalogCache, CatalogRecord, LocalizedProduct, localized_field
+from search_index import SearchIndex
+from db_config import configure_database, install_sqlite_pragmas
+from jobs import JobQueue
+from mailer import build_message, make_mail_sink
+from cart_store import CartStore, encode_cart
+from http_cache import HTTPCache
+from fragment_cache import FragmentCache
+from static_assets import StaticAssets, build_assets, image_url
+from image_pipeline import ImagePipeline, ImageError
+from metrics import Metrics
+from instrumentation import Instrumentation, record_phase
+from translations import catalogs as translation_catalogs
+from synthetic_data import SCALES, seed as seed_synthetic_data
+from catalog_io import (FORMATS, ImportReport, ProductImporter, detect_format, export_products,
+                        open_stream, read_records, write_records)
 
 load_dotenv()
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-super-secret-key-change-this-in-production')
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///party_yacout.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-# Babel configuration for multilingual support
-app.config['BABEL_DEFAULT_LOCALE'] = 'en'
-app.config['LANGUAGES'] = {
-    'en': 'English',
-    'fr': 'Français',
-    'ar': 'العربية'
-}
-
-db = SQLAlchemy(app)
-login_manager = LoginManager(app)
+db = SQLAlchemy()
+login_manager = LoginManager()
 login_manager.login_view = 'login'
-babel = Babel(app)
+babel = Babel()
+
+# Views and CLI commands are collected at import and attached to each app by
+# create_app(); unlike a blueprint this keeps the endpoint names ('index',
+# 'products', ...) that templates and redirects already use.
+views = []
+commands = AppGroup('commands')
+
+def route(rule, **options):
+    def register(view):
+        views.append((rule, view, options))
+        return view
+    return register
+
+def create_app(config=None, instance_path=None):
+    """Build and configure the app without touching the database.
+
+    Engines and cart/mail backends connect on first use; `flask init-db`
+    does the one-time bootstrap (tables, indexes, admin, sample data).
+    """
+    app = Flask(__name__, instance_path=instance_path)
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-super-secret-key-change-this-in-production')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['CATALOG_CACHE_TTL'] = int(os.getenv('CATALOG_CACHE_TTL', 300))
+    app.config['CATALOG_CACHE_MAX_ENTRIES'] = int(os.getenv('CATALOG_CACHE_MAX_ENTRIES', 256))
+    app.config['PRODUCTS_PER_PAGE'] = int(os.getenv('PRODUCTS_PER_PAGE', 24))
+    app.config['MAX_PRODUCTS_PER_PAGE'] = 100
+    app.config['ORDERS_PER_PAGE'] = int(os.getenv('ORDERS_PER_PAGE', 10))
+    app.config['JOB_QUEUE_MODE'] = os.getenv('JOB_QUEUE_MODE', 'thread')
+    app.config['MAIL_BACKEND'] = os.getenv('MAIL_BACKEND', 'file')
+    app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER', 'localhost')
+    app.config['MAIL_PORT'] = int(os.getenv('MAIL_PORT', 25))
+    app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')
+    app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
+    app.config['MAIL_USE_TLS'] = os.getenv('MAIL_USE_TLS', '').lower() in ('1', 'true', 'yes')
+    app.config['MAIL_DEFAULT_SENDER'] = os.getenv('MAIL_DEFAULT_SENDER', 'orders@partyyacout.com')
+    app.config['ADMIN_EMAIL'] = os.getenv('ADMIN_EMAIL', 'admin@partyyacout.com')
+    app.config['LOW_STOCK_THRESHOLD'] = int(os.getenv('LOW_STOCK_THRESHOLD', 5))
+    app.config['CART_BACKEND'] = os.getenv('CART_BACKEND', 'sqlite')
+    app.config['CART_STORE_PATH'] = os.getenv('CART_STORE_PATH')
+    app.config['CART_REDIS_URL'] = os.getenv('CART_REDIS_URL', 'redis://localhost:6379/0')
+    app.config['CART_TTL'] = int(os.getenv('CART_TTL', 30 * 24 * 3600))
+    app.config['HTTP_CACHE_MAX_AGE'] = int(os.getenv('HTTP_CACHE_MAX_AGE', 60))
+    app.config['PAGE_CACHE_ENABLED'] = os.getenv('PAGE_CACHE_ENABLED', '').lower() in ('1', 'true', 'yes')
+    app.config['PAGE_CACHE_MAX_BYTES'] = int(os.getenv('PAGE_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    app.config['FRAGMENT_CACHE_MAX_BYTES'] = int(os.getenv('FRAGMENT_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+    app.config['PRODUCT_IMAGE_WIDTHS'] = [int(w) for w in os.getenv('PRODUCT_IMAGE_WIDTHS', '200,400,800').split(',')]
+    app.config['PRODUCT_IMAGE_MAX_BYTES'] = int(os.getenv('PRODUCT_IMAGE_MAX_BYTES', 10 * 1024 * 1024))
+    app.config['PRODUCT_IMAGE_FETCH_TIMEOUT'] = int(os.getenv('PRODUCT_IMAGE_FETCH_TIMEOUT', 10))
+    app.config['PRODUCT_IMAGE_WORKERS'] = int(os.getenv('PRODUCT_IMAGE_WORKERS', 2))
+    app.config['IDENTITY_CACHE_TTL'] = int(os.getenv('IDENTITY_CACHE_TTL', 300))
+    app.config['IDENTITY_CACHE_MAX_ENTRIES'] = int(os.getenv('IDENTITY_CACHE_MAX_ENTRIES', 10000))
+    app.config['INSTRUMENTATION_ENABLED'] = os.getenv('INSTRUMENTATION_ENABLED', '1').lower() in ('1', 'true', 'yes')
+    app.config['SERVER_TIMING_HEADER'] = os.getenv('SERVER_TIMING_HEADER', '1').lower() in ('1', 'true', 'yes')
+    app.config['SLOW_REQUEST_MS'] = int(os.getenv('SLOW_REQUEST_MS', 500))
+    app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN')
+
+    # Babel configuration for multilingual support
+    app.config['BABEL_DEFAULT_LOCALE'] = 'en'
+    app.config['LANGUAGES'] = {
+        'en': 'English',
+        'fr': 'Français',
+        'ar': 'العربية'
+    }
+    # UI strings in translations/<lang>.json; re-read on change only in development
+    app.config['TRANSLATIONS_AUTO_RELOAD'] = os.getenv(
+        'TRANSLATIONS_AUTO_RELOAD', '1' if app.debug else '').lower() in ('1', 'true', 'yes')
+    app.config.update(config or {})
+    configure_database(app)
+
+    db.init_app(app)
+    with app.app_context():
+        install_sqlite_pragmas(db.engine, app.config)
+        # Registered first so its timer starts before any other request hook
+        if app.config['INSTRUMENTATION_ENABLED']:
+            Instrumentation(app, db.engine,
+                            server_timing=app.config['SERVER_TIMING_HEADER'],
+                            slow_request_ms=app.config['SLOW_REQUEST_MS'])
+    login_manager.init_app(app)
+    babel.init_app(app, locale_selector=get_locale)
+    for extension in (identity_cache, cart_store, catalog_cache, search_index, fragment_cache, http_cache,
+                      static_assets, job_queue, image_pipeline, translation_catalogs):
+        extension.init_app(app)
+
+    for rule, view, options in views:
+        app.add_url_rule(rule, view_func=view, **options)
+    for command in commands.commands.values():
+        app.cli.add_command(command)
+    app.add_template_filter(image_url)
+    app.add_template_filter(image_srcset, 'srcset')
+    app.context_processor(inject_global_variables)
+    return app
 
-@babel.localeselector
 def get_locale():
-    # Check if language is set in session, otherwise use browser preference
-    return session.get('language', request.accept_languages.best_match(app.config['LANGUAGES'].keys()))
+    # Check if language is set in session, otherwise use browser preference.
+    # Resolved once per request: templates call this for every product.
+    if 'locale' not in g:
+        started = time.perf_counter()
+        g.locale = session.get('language') or request.accept_languages.best_match(current_app.config['LANGUAGES'].keys())
+        record_phase('locale', time.perf_counter() - started)
+    return g.locale
+
+def translate(key):
+    """UI string from the compiled JSON catalogs for the current locale"""
+    return translation_catalogs.catalog(get_locale()).get(key, key)
 
 # Database Models
 class User(UserMixin, db.Model):
@@ -45,6 +157,7 @@ class User(UserMixin, db.Model):
     address = db.Column(db.Text)
     is_admin = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, server_default=db.func.now())
+    orders = db.relationship('Order', backref='user', lazy=True)
 
 class Category(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -69,6 +182,12 @@ class Product(db.Model):
     category_id = db.Column(db.Integer, db.ForeignKey('category.id'))
     is_active = db.Column(db.Boolean, default=True)
 
+    __table_args__ = (
+        db.Index('ix_product_active_category', 'is_active', 'category_id', 'id'),
+        # The catalog load filters on is_active alone and orders by id
+        db.Index('ix_product_active_id', 'is_active', 'id'),
+    )
+
 class Order(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
@@ -80,210 +199,781 @@ class Order(db.Model):
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     order_items = db.relationship('OrderItem', backref='order', lazy=True)
 
+    __table_args__ = (
+        db.Index('ix_order_user_created', 'user_id', 'created_at', 'id'),
+    )
+
 class OrderItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey('order.id'))
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'))
     quantity = db.Column(db.Integer, nullable=False)
     price = db.Column(db.Float, nullable=False)
+    product = db.relationship('Product')
+
+    __table_args__ = (
+        db.Index('ix_order_item_order', 'order_id'),
+    )
+
+class ProductImage(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False, index=True)
+    width = db.Column(db.Integer, nullable=False)
+    height = db.Column(db.Integer, nullable=False)
+    format = db.Column(db.String(10), nullable=False)
+    path = db.Column(db.String(200), nullable=False)
+
+# Dashboard rollups, kept up to date by Metrics
+class DailyMetric(db.Model):
+    day = db.Column(db.Date, primary_key=True)
+    orders = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    revenue = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    units = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    signups = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+class OrderStatusCount(db.Model):
+    status = db.Column(db.String(20), primary_key=True)
+    orders = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+class ProductSales(db.Model):
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), primary_key=True)
+    units = db.Column(db.Integer, nullable=False, default=0, server_default='0', index=True)
+    revenue = db.Column(db.Float, nullable=False, default=0, server_default='0')
+
+class MetricCounter(db.Model):
+    name = db.Column(db.String(20), primary_key=True)
+    value = db.Column(db.Float, nullable=False, default=0, server_default='0')
+
+class Job(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text)
+    status = db.Column(db.String(20), default='pending', nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    max_attempts = db.Column(db.Integer, default=5, nullable=False)
+    run_at = db.Column(db.DateTime, nullable=False)
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+
+    __table_args__ = (
+        db.Index('ix_job_status_run_at', 'status', 'run_at'),
+    )
 
 # Forms
 class LoginForm(FlaskForm):
-    email = StringField(_('Email'), validators=[DataRequired(), Email()])
-    password = PasswordField(_('Password'), validators=[DataRequired()])
+    email = StringField(_l('Email'), validators=[DataRequired(), Email()])
+    password = PasswordField(_l('Password'), validators=[DataRequired()])
 
 class RegisterForm(FlaskForm):
-    username = StringField(_('Username'), validators=[DataRequired(), Length(min=3, max=80)])
-    email = StringField(_('Email'), validators=[DataRequired(), Email()])
-    password = PasswordField(_('Password'), validators=[DataRequired(), Length(min=6)])
-    first_name = StringField(_('First Name'))
-    last_name = StringField(_('Last Name'))
+    username = StringField(_l('Username'), validators=[DataRequired(), Length(min=3, max=80)])
+    email = StringField(_l('Email'), validators=[DataRequired(), Email()])
+    password = PasswordField(_l('Password'), validators=[DataRequired(), Length(min=6)])
+    first_name = StringField(_l('First Name'))
+    last_name = StringField(_l('Last Name'))
+
+class CheckoutForm(FlaskForm):
+    full_name = StringField(_l('Full Name'), validators=[DataRequired(), Length(max=200)])
+    email = StringField(_l('Email'), validators=[DataRequired(), Email()])
+    phone = StringField(_l('Phone'), validators=[DataRequired(), Length(max=20)])
+    address = TextAreaField(_l('Address'), validators=[DataRequired()])
+    city = StringField(_l('City'), validators=[DataRequired(), Length(max=100)])
 
 class ProductForm(FlaskForm):
-    name_en = StringField(_('Name (English)'), validators=[DataRequired()])
-    name_fr = StringField(_('Name (French)'))
-    name_ar = StringField(_('Name (Arabic)'))
-    description_en = TextAreaField(_('Description (English)'))
-    description_fr = TextAreaField(_('Description (French)'))
-    description_ar = TextAreaField(_('Description (Arabic)'))
-    price = FloatField(_('Price (MAD)'), validators=[DataRequired()])
-    original_price = FloatField(_('Original Price (MAD)'))
-    discount = IntegerField(_('Discount (%)'))
-    image = StringField(_('Image URL'))
-    stock = IntegerField(_('Stock'), default=0)
-    category_id = SelectField(_('Category'), coerce=int)
+    name_en = StringField(_l('Name (English)'), validators=[DataRequired()])
+    name_fr = StringField(_l('Name (French)'))
+    name_ar = StringField(_l('Name (Arabic)'))
+    description_en = TextAreaField(_l('Description (English)'))
+    description_fr = TextAreaField(_l('Description (French)'))
+    description_ar = TextAreaField(_l('Description (Arabic)'))
+    price = FloatField(_l('Price (MAD)'), validators=[DataRequired()])
+    original_price = FloatField(_l('Original Price (MAD)'))
+    discount = IntegerField(_l('Discount (%)'))
+    image = StringField(_l('Image URL'))
+    image_file = FileField(_l('Upload Image'), validators=[FileAllowed(['jpg', 'jpeg', 'png', 'gif', 'webp'])])
+    stock = IntegerField(_l('Stock'), default=0)
+    category_id = SelectField(_l('Category'), coerce=int)
+
+def load_identity(user_id):
+    user = db.session.get(User, user_id)
+    return Identity(user) if user is not None else None
+
+identity_cache = IdentityCache(load_identity)
+identity_cache.watch(db.session, User)
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # A cached snapshot, not the ORM row: logged-in browsing runs no user query
+    return identity_cache.get(int(user_id))
 
 # Helper functions
+FREE_SHIPPING_THRESHOLD = 500
+SHIPPING_COST = 45
+MAX_CART_QUANTITY = 999
+
+cart_store = CartStore()
+
+def get_cart():
+    """The cart as {product_id: quantity}, read from the cart store once per request"""
+    if 'cart' not in g:
+        items, summary = {}, None
+        cart_id = session.get('cart_id')
+        if cart_id:
+            items, summary = cart_store.load(cart_id)
+        g.cart, g.cart_summary = items, summary
+
+        # Carry over carts from before they were stored server-side
+        legacy_cart = session.pop('cart', None)
+        session.pop('cart_summary', None)
+        if legacy_cart:
+            for product_id, item in legacy_cart.items():
+                items[int(product_id)] = item['quantity'] if isinstance(item, dict) else int(item)
+            save_cart(items)
+    return g.cart
+
+def write_cart(items, summary=None):
+    cart_id = session.get('cart_id')
+    if cart_id is None:
+        if not items:
+            return
+        cart_id = session['cart_id'] = secrets.token_urlsafe(16)
+    cart_store.save(cart_id, items, summary)
+    g.cart, g.cart_summary = items, summary
+
+def save_cart(items):
+    """Store a changed cart; its cached summary is dropped with the old contents"""
+    write_cart(items)
+    g.pop('cart_snapshot', None)
+
+def get_cart_snapshot():
+    """Price the cart with a single product query, memoized per request"""
+    if 'cart_snapshot' not in g:
+        cart = get_cart()
+        products = {}
+        if cart:
+            products = {p.id: p for p in Product.query.filter(Product.id.in_(list(cart))).all()}
+
+        items = []
+        total = 0
+        for product_id, quantity in cart.items():
+            product = products.get(product_id)
+            if product:
+                item_total = product.price * quantity
+                total += item_total
+                items.append({
+                    'product': product,
+                    'quantity': quantity,
+                    'item_total': item_total
+                })
+
+        g.cart_snapshot = {'items': items, 'total': total}
+    return g.cart_snapshot
+
+def summarize_cart(snapshot):
+    subtotal = snapshot['total']
+    shipping = 0 if subtotal >= FREE_SHIPPING_THRESHOLD else SHIPPING_COST
+    return {
+        'count': len(snapshot['items']),
+        'subtotal': subtotal,
+        'shipping': shipping,
+        'grand_total': subtotal + shipping
+    }
+
+def get_cart_summary(refresh=False):
+    """Cart count and totals, computed lazily and cached in the cart store until the cart changes"""
+    items = get_cart()
+    if not items:
+        return summarize_cart(get_cart_snapshot())
+    summary = g.cart_summary
+    if refresh or summary is None:
+        fresh = summarize_cart(get_cart_snapshot())
+        if fresh != summary:
+            write_cart(items, fresh)
+        summary = fresh
+    return summary
+
+def get_cart_count():
+    """Lines in the cart: the cached summary's count when there is one, else the stored items"""
+    items = get_cart()
+    return g.cart_summary['count'] if g.cart_summary is not None else len(items)
+
 def get_cart_total():
-    cart = session.get('cart', {})
-    total = 0
-    for product_id, item in cart.items():
-        product = Product.query.get(int(product_id))
-        if product:
-            total += product.price * item['quantity']
-    return total
+    return get_cart_summary()['subtotal']
 
 def get_shipping_cost():
-    total = get_cart_total()
-    return 0 if total >= 500 else 45
+    return get_cart_summary()['shipping']
+
+def load_catalog():
+    """Load active products and categories as detached records"""
+    category_columns = [c.key for c in Category.__table__.columns]
+    product_columns = [c.key for c in Product.__table__.columns]
+    categories = [CatalogRecord(c, category_columns) for c in Category.query.order_by(Category.id).all()]
+    categories_by_id = {c.id: c for c in categories}
+    images = {}
+    for image in ProductImage.query.order_by(ProductImage.product_id, ProductImage.width).all():
+        images.setdefault(image.product_id, []).append(
+            {'width': image.width, 'height': image.height, 'format': image.format, 'path': image.path})
+    products = []
+    for row in Product.query.filter_by(is_active=True).order_by(Product.id).all():
+        product = CatalogRecord(row, product_columns, images=tuple(images.get(row.id, ())))
+        product.category = categories_by_id.get(product.category_id)
+        products.append(product)
+    return products, categories
+
+catalog_cache = CatalogCache(load_catalog)
+
+search_index = SearchIndex()
+
+@catalog_cache.on_load
+def index_catalog(catalog):
+    # Built with the catalog (once per worker, then incrementally), never inside a search request
+    search_index.sync(catalog.products, catalog.digest)
+fragment_cache = FragmentCache()
+static_assets = StaticAssets()
+
+PRODUCT_CARD_TEMPLATES = {
+    'desktop': 'partials/product_card.html',
+    'mobile': 'partials/product_card_mobile.html',
+    'mobile_compact': 'partials/product_card_mobile_compact.html',
+    'search': 'partials/product_card_search.html',
+}
+
+def render_product_card(product, layout='desktop'):
+    """Product card markup, rendered once per product version, locale and layout"""
+    key = (product.id, product.version, get_locale(), layout)
+    return fragment_cache.get_or_render(
+        key, lambda: render_template(PRODUCT_CARD_TEMPLATES[layout], product=product))
+
+def product_changed(product_id=None):
+    """Invalidate everything derived from the catalog after an admin change"""
+    catalog_cache.bump()
+    if product_id is not None:
+        fragment_cache.invalidate(lambda key: key[0] == product_id)
+
+def search_catalog(catalog, category_id=None, search_query='', limit=None):
+    if not search_query:
+        products = catalog.by_category.get(category_id, []) if category_id else catalog.products
+        return products[:limit] if limit else products
+
+    products = []
+    # A category filter drops matches after ranking, so it needs the full ranking
+    for product_id in search_index.search(search_query, limit=None if category_id else limit):
+        product = catalog.by_id.get(product_id)
+        if product and (not category_id or product.category_id == category_id):
+            products.append(product)
+            if limit and len(products) >= limit:
+                break
+    return products
+
+def get_page_size():
+    per_page = request.args.get('per_page', current_app.config['PRODUCTS_PER_PAGE'], type=int)
+    return max(1, min(per_page, current_app.config['MAX_PRODUCTS_PER_PAGE']))
+
+def build_listing(products, ordered_by_id):
+    return {
+        'products': products,
+        'positions': {p.id: i for i, p in enumerate(products)},
+        'ordered_by_id': ordered_by_id
+    }
+
+def paginate_listing(listing, cursor, per_page):
+    """Keyset page of an in-memory listing: the products after the cursor product id"""
+    products = listing['products']
+    start = 0
+    if cursor:
+        if cursor in listing['positions']:
+            start = listing['positions'][cursor] + 1
+        elif listing['ordered_by_id']:
+            start = bisect_right(products, cursor, key=attrgetter('id'))
+    page = products[start:start + per_page]
+    next_cursor = page[-1].id if page and start + per_page < len(products) else None
+    return page, next_cursor
+
+def order_history_query():
+    """Orders with their customer, items and item products loaded in one statement"""
+    return Order.query.options(
+        joinedload(Order.user),
+        joinedload(Order.order_items).joinedload(OrderItem.product)
+    ).order_by(Order.created_at.desc(), Order.id.desc())
+
+def paginate_orders(query, cursor, per_page):
+    """Keyset page of newest-first orders after the cursor order id"""
+    if cursor:
+        cursor_created_at = db.session.query(Order.created_at).filter(Order.id == cursor).scalar_subquery()
+        query = query.filter(
+            (Order.created_at < cursor_created_at) |
+            ((Order.created_at == cursor_created_at) & (Order.id < cursor))
+        )
+    orders = query.limit(per_page + 1).all()
+    next_cursor = orders[per_page - 1].id if len(orders) > per_page else None
+    return orders[:per_page], next_cursor
+
+class OrderError(Exception):
+    """Raised when a cart cannot be turned into an order"""
+
+    def __init__(self, message, product_ids=()):
+        super().__init__(message)
+        self.product_ids = list(product_ids)
+
+def generate_order_number():
+    # 72 random bits: collisions are negligible, so no lookup is needed
+    return 'PY' + secrets.token_hex(9).upper()
+
+def place_order(snapshot, user_id, shipping_address, email=None):
+    """Create an order from a priced cart snapshot in one short transaction.
+
+    Stock is decremented with conditional UPDATEs, so two concurrent
+    checkouts can never oversell: the second one simply matches no row.
+    """
+    items = snapshot['items']
+    if not items:
+        raise OrderError(_('Your cart is empty'))
+
+    unavailable = [item['product'].id for item in items
+                   if not item['product'].is_active or item['quantity'] > (item['product'].stock or 0)]
+    if unavailable:
+        raise OrderError(_('Some items are no longer available in the requested quantity'), unavailable)
+
+    summary = summarize_cart(snapshot)
+    lines = [{'product_id': item['product'].id, 'quantity': item['quantity'], 'price': item['product'].price}
+             for item in items]
+    try:
+        # Write first so SQLite takes the write lock up front instead of upgrading a read lock
+        product_table = Product.__table__
+        result = db.session.execute(
+            product_table.update()
+            .where(product_table.c.id == db.bindparam('b_id'))
+            .where(product_table.c.is_active == True)
+            .where(product_table.c.stock >= db.bindparam('b_quantity'))
+            .values(stock=product_table.c.stock - db.bindparam('b_quantity')),
+            [{'b_id': line['product_id'], 'b_quantity': line['quantity']} for line in lines]
+        )
+        if result.rowcount != len(lines):
+            raise OrderError(_('Some items are no longer available in the requested quantity'))
+
+        order = Order(
+            user_id=user_id,
+            order_number=generate_order_number(),
+            total_amount=summary['subtotal'],
+            shipping_cost=summary['shipping'],
+            shipping_address=shipping_address
+        )
+        db.session.add(order)
+        db.session.flush()
+        db.session.execute(OrderItem.__table__.insert(), [dict(line, order_id=order.id) for line in lines])
+        metrics.order_placed(lines)
+
+        # Follow-up work is committed with the order and runs outside the request
+        if email:
+            job_queue.enqueue('send_order_confirmation', {'order_id': order.id, 'email': email})
+        job_queue.enqueue('notify_admin_new_order', {'order_id': order.id})
+        low_stock = [item['product'].id for item in items
+                     if (item['product'].stock or 0) - item['quantity'] < current_app.config['LOW_STOCK_THRESHOLD']]
+        if low_stock:
+            job_queue.enqueue('low_stock_alert', {'product_ids': low_stock})
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return order
+
+job_queue = JobQueue(db, Job)
+metrics = Metrics(db, DailyMetric, OrderStatusCount, ProductSales, MetricCounter)
+image_pipeline = ImagePipeline()
+
+def get_mail_sink():
+    """The app's mail sink, built on first use so workers that never send mail skip it"""
+    sink = current_app.extensions.get('mail_sink')
+    if sink is None:
+        sink = current_app.extensions['mail_sink'] = make_mail_sink(current_app.config, current_app.instance_path)
+    return sink
+
+def send_email(to, subject, body):
+    get_mail_sink().send(build_message(current_app.config['MAIL_DEFAULT_SENDER'], to, subject, body))
+
+def format_order_lines(order):
+    lines = [f"- {item.product.name_en if item.product else '#%s' % item.product_id} x{item.quantity}: "
+             f"{item.price * item.quantity:.2f} MAD" for item in order.order_items]
+    lines.append(f"Shipping: {order.shipping_cost:.2f} MAD")
+    lines.append(f"Total: {order.total_amount + order.shipping_cost:.2f} MAD")
+    return '\n'.join(lines)
+
+@job_queue.task('send_order_confirmation')
+def send_order_confirmation(order_id, email):
+    order = order_history_query().filter(Order.id == order_id).one()
+    send_email(email, f"Party Yacout order #{order.order_number}",
+               f"Thank you for your order!\n\n{format_order_lines(order)}\n\n"
+               f"Shipping to:\n{order.shipping_address}\n")
+
+@job_queue.task('notify_admin_new_order')
+def notify_admin_new_order(order_id):
+    order = order_history_query().filter(Order.id == order_id).one()
+    send_email(current_app.config['ADMIN_EMAIL'], f"New order #{order.order_number}",
+               f"{format_order_lines(order)}\n\nShipping to:\n{order.shipping_address}\n")
+
+@job_queue.task('low_stock_alert')
+def low_stock_alert(product_ids):
+    products = Product.query.filter(
+        Product.id.in_(product_ids),
+        Product.stock < current_app.config['LOW_STOCK_THRESHOLD']
+    ).order_by(Product.id).all()
+    if products:
+        send_email(current_app.config['ADMIN_EMAIL'], "Low stock alert",
+                   '\n'.join(f"- #{p.id} {p.name_en}: {p.stock} left" for p in products))
+
+@job_queue.task('generate_product_images')
+def generate_product_images(product_id, source):
+    variants = image_pipeline.generate(source)
+    ProductImage.query.filter_by(product_id=product_id).delete()
+    db.session.add_all(ProductImage(product_id=product_id, **variant) for variant in variants)
+    db.session.commit()
+    product_changed(product_id)
+
+def ingest_product_image(form):
+    """Store an uploaded or remote product image locally; returns its static path or None"""
+    if form.image_file.data:
+        return image_pipeline.store(form.image_file.data.read())
+    if form.image.data and form.image.data.startswith(('http://', 'https://')):
+        return image_pipeline.store(image_pipeline.fetch(form.image.data))
+    return None
+
+def image_srcset(images, image_format):
+    return ', '.join(f"{url_for('static', filename=image['path'])} {image['width']}w"
+                     for image in images if image['format'] == image_format)
+
+def localize_products(catalog, products):
+    views = catalog.localized(get_locale())
+    return [views[product.id] for product in products]
 
 def get_product_name(product):
-    locale = get_locale()
-    if locale == 'fr' and product.name_fr:
-        return product.name_fr
-    elif locale == 'ar' and product.name_ar:
-        return product.name_ar
-    return product.name_en
+    if isinstance(product, LocalizedProduct):
+        return product.name
+    return localized_field(product, 'name', get_locale())
 
 def get_product_description(product):
-    locale = get_locale()
-    if locale == 'fr' and product.description_fr:
-        return product.description_fr
-    elif locale == 'ar' and product.description_ar:
-        return product.description_ar
-    return product.description_en
+    if isinstance(product, LocalizedProduct):
+        return product.description
+    return localized_field(product, 'description', get_locale())
+
+def page_variant():
+    """What besides the catalog shapes a storefront page for this visitor, and whether they are anonymous"""
+    if session.get('_flashes'):
+        return None, False
+    user_id = current_user.get_id() if current_user.is_authenticated else ''
+    cart = cart_etag() if session.get('cart_id') and get_cart() else ''
+    return f'{get_locale()}|{user_id}|{cart}', not user_id and not cart
+
+# Keyed by the catalog's contents: a TTL reload that picked up new stock changes the ETag too
+http_cache = HTTPCache(lambda: catalog_cache.get().digest, page_variant)
 
 # Routes
-@app.route('/')
+@route('/')
+@http_cache.cached
 def index():
-    featured_products = Product.query.filter_by(is_active=True).limit(4).all() if Product.query.first() else []
+    catalog = catalog_cache.get()
+    featured_products = localize_products(catalog, catalog.products[:4])
     return render_template('index.html', featured_products=featured_products)
 
-@app.route('/products')
+@route('/products')
+@http_cache.cached
 def products():
     category_id = request.args.get('category_id', type=int)
     search_query = request.args.get('search', '')
+    cursor = request.args.get('cursor', type=int)
     
-    query = Product.query.filter_by(is_active=True)
-    
-    if category_id:
-        query = query.filter_by(category_id=category_id)
+    listing = catalog_cache.memoize(
+        ('products', category_id, search_query.lower()),
+        lambda catalog: build_listing(search_catalog(catalog, category_id, search_query),
+                                      ordered_by_id=not search_query)
+    )
+    products, next_cursor = paginate_listing(listing, cursor, get_page_size())
+    catalog = catalog_cache.get()
+    products = localize_products(catalog, products)
     
-    if search_query:
-        query = query.filter(Product.name_en.ilike(f'%{search_query}%') | 
-                           Product.name_fr.ilike(f'%{search_query}%') |
-                           Product.name_ar.ilike(f'%{search_query}%'))
+    if request.args.get('format') == 'json':
+        return jsonify({
+            'products': [{
+                'id': product.id,
+                'name': product.name,
+                'price': product.price,
+                'original_price': product.original_price,
+                'discount': product.discount,
+                'image': product.image,
+                'stock': product.stock,
+                'category_id': product.category_id
+            } for product in products],
+            'next_cursor': next_cursor
+        })
     
-    products = query.all()
-    categories = Category.query.all()
+    categories = catalog.categories
     
     return render_template('products.html', products=products, categories=categories, 
-                         search_query=search_query, category_id=category_id)
+                         search_query=search_query, category_id=category_id,
+                         cursor=cursor, next_cursor=next_cursor)
 
-@app.route('/search_suggestions')
+@route('/search_suggestions')
+@http_cache.cached
 def search_suggestions():
     query = request.args.get('q', '')
     if len(query) < 2:
         return jsonify([])
     
-    products = Product.query.filter(
-        (Product.name_en.ilike(f'%{query}%')) | 
-        (Product.name_fr.ilike(f'%{query}%')) |
-        (Product.name_ar.ilike(f'%{query}%'))
-    ).limit(5).all()
+    products = catalog_cache.memoize(
+        ('suggestions', query.lower()),
+        lambda catalog: search_catalog(catalog, search_query=query, limit=5)
+    )
     
     suggestions = []
-    for product in products:
+    for product in localize_products(catalog_cache.get(), products):
         suggestions.append({
             'id': product.id,
-            'name': get_product_name(product),
+            'name': product.name,
             'price': product.price,
             'image': product.image
         })
     
     return jsonify(suggestions)
 
-@app.route('/product/<int:product_id>')
+@route('/product/<int:product_id>')
 def product_detail(product_id):
+    if product_id in catalog_cache.get().by_id:
+        return catalog_product_detail(product_id)
+    # Inactive products are not in the catalog digest, so an ETag could not see them change
     product = Product.query.get_or_404(product_id)
+    return render_template('product_detail.html', product=LocalizedProduct(product, get_locale(), product.category))
+
+@http_cache.cached
+def catalog_product_detail(product_id):
+    product = catalog_cache.get().localized(get_locale())[product_id]
     return render_template('product_detail.html', product=product)
 
-@app.route('/add_to_cart/<int:product_id>')
+@route('/add_to_cart/<int:product_id>')
 def add_to_cart(product_id):
-    product = Product.query.get_or_404(product_id)
-    cart = session.get('cart', {})
-    
-    product_key = str(product_id)
-    if product_key in cart:
-        cart[product_key]['quantity'] += 1
-    else:
-        cart[product_key] = {
-            'quantity': 1,
-            'name': get_product_name(product),
-            'price': product.price,
-            'image': product.image
-        }
-    
-    session['cart'] = cart
+    if product_id not in catalog_cache.get().by_id:
+        Product.query.get_or_404(product_id)
+    cart = get_cart()
+    cart[product_id] = cart.get(product_id, 0) + 1
+    save_cart(cart)
     flash(_('Product added to cart!'), 'success')
     return redirect(request.referrer or url_for('index'))
 
-@app.route('/update_cart/<int:product_id>', methods=['POST'])
+@route('/update_cart/<int:product_id>', methods=['POST'])
 def update_cart(product_id):
     quantity = int(request.form.get('quantity', 1))
-    cart = session.get('cart', {})
-    product_key = str(product_id)
+    cart = get_cart()
     
     if quantity <= 0:
-        cart.pop(product_key, None)
+        cart.pop(product_id, None)
     else:
-        if product_key in cart:
-            cart[product_key]['quantity'] = quantity
+        if product_id in cart:
+            cart[product_id] = quantity
     
-    session['cart'] = cart
+    save_cart(cart)
     return redirect(url_for('view_cart'))
 
-@app.route('/remove_from_cart/<int:product_id>')
+@route('/remove_from_cart/<int:product_id>')
 def remove_from_cart(product_id):
-    cart = session.get('cart', {})
-    product_key = str(product_id)
-    cart.pop(product_key, None)
-    session['cart'] = cart
+    cart = get_cart()
+    cart.pop(product_id, None)
+    save_cart(cart)
     flash(_('Product removed from cart'), 'info')
     return redirect(url_for('view_cart'))
 
-@app.route('/cart')
+@route('/cart')
 def view_cart():
-    cart = session.get('cart', {})
-    cart_items = []
-    total = 0
-    
-    for product_id, item in cart.items():
-        product = Product.query.get(int(product_id))
-        if product:
-            item_total = product.price * item['quantity']
-            total += item_total
-            cart_items.append({
-                'product': product,
-                'quantity': item['quantity'],
-                'item_total': item_total
-            })
-    
-    shipping_cost = 0 if total >= 500 else 45
-    grand_total = total + shipping_cost
-    
-    return render_template('cart.html', cart_items=cart_items, total=total, 
-                         shipping_cost=shipping_cost, grand_total=grand_total)
-
-@app.route('/checkout')
+    snapshot = get_cart_snapshot()
+    summary = get_cart_summary(refresh=True)
+    
+    return render_template('cart.html', cart_items=snapshot['items'], total=summary['subtotal'], 
+                         shipping_cost=summary['shipping'], grand_total=summary['grand_total'])
+
+@route('/checkout', methods=['GET', 'POST'])
 def checkout():
-    if not session.get('cart'):
+    if not get_cart():
         flash(_('Your cart is empty'), 'warning')
         return redirect(url_for('view_cart'))
     
-    cart = session.get('cart', {})
-    total = get_cart_total()
-    shipping_cost = get_shipping_cost()
-    grand_total = total + shipping_cost
+    form = CheckoutForm()
+    if request.method == 'GET' and current_user.is_authenticated:
+        form.full_name.data = ' '.join(filter(None, [current_user.first_name, current_user.last_name]))
+        form.email.data = current_user.email
+        form.phone.data = current_user.phone
+        form.address.data = current_user.address
+    
+    if form.validate_on_submit():
+        shipping_address = '\n'.join([form.full_name.data, form.address.data, form.city.data,
+                                      form.phone.data, form.email.data])
+        try:
+            order = place_order(get_cart_snapshot(),
+                                current_user.id if current_user.is_authenticated else None,
+                                shipping_address,
+                                email=form.email.data)
+        except OrderError as e:
+            flash(str(e), 'error')
+            return redirect(url_for('view_cart'))
+        
+        job_queue.kick()
+        
+        save_cart({})
+        # Redirect so that refreshing the confirmation cannot resubmit the form
+        session['last_order_id'] = order.id
+        return redirect(url_for('order_confirmation', order_id=order.id))
+    
+    summary = get_cart_summary(refresh=True)
     
-    return render_template('checkout.html', total=total, shipping_cost=shipping_cost, 
-                         grand_total=grand_total)
+    return render_template('checkout.html', form=form, cart_items=get_cart_snapshot()['items'], total=summary['subtotal'], shipping_cost=summary['shipping'], 
+                         grand_total=summary['grand_total'])
+
+@route('/order_confirmation/<int:order_id>')
+def order_confirmation(order_id):
+    order = order_history_query().filter(Order.id == order_id).first_or_404()
+    # Guests can only see the order they just placed in this session
+    if session.get('last_order_id') != order.id and not (
+            current_user.is_authenticated and (current_user.is_admin or current_user.id == order.user_id)):
+        abort(404)
+    return render_template('order_confirmation.html', order=order)
+
+# Cart API: small JSON responses instead of redirects and full page renders
+def cart_etag():
+    return hashlib.sha1(encode_cart(get_cart())).hexdigest()[:16]
+
+def cart_line(product_id):
+    quantity = get_cart().get(product_id, 0)
+    product = catalog_cache.get().localized(get_locale()).get(product_id)
+    line = {'product_id': product_id, 'quantity': quantity}
+    if product:
+        line.update(name=product.name, price=product.price, image=product.image,
+                    line_total=product.price * quantity)
+    return line
+
+def cart_api_response(payload, status=200):
+    payload.setdefault('success', status < 400)
+    if status < 400:
+        payload['summary'] = get_cart_summary(refresh=request.method != 'GET')
+    response = jsonify(payload)
+    response.status_code = status
+    response.set_etag(cart_etag())
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def cart_api_error(message, status):
+    response = jsonify({'success': False, 'message': message})
+    response.status_code = status
+    return response
 
-@app.route('/login', methods=['GET', 'POST'])
+def parse_cart_quantity(value, allow_zero=True):
+    try:
+        quantity = int(value)
+    except (TypeError, ValueError):
+        return None
+    if quantity < (0 if allow_zero else 1) or quantity > MAX_CART_QUANTITY:
+        return None
+    return quantity
+
+def cart_precondition_failed():
+    """True when the client sent If-Match for a cart that has changed since"""
+    return bool(request.if_match) and not request.if_match.contains(cart_etag())
+
+@route('/api/v1/cart', methods=['GET'])
+def api_cart():
+    lines = [cart_line(product_id) for product_id in get_cart()]
+    return cart_api_response({'items': lines}).make_conditional(request)
+
+@route('/api/v1/cart/summary', methods=['GET'])
+def api_cart_summary():
+    return cart_api_response({}).make_conditional(request)
+
+@route('/api/cart_count')
+def api_cart_count():
+    return jsonify({'count': get_cart_count()})
+
+@route('/api/v1/cart/items', methods=['POST'])
+def api_cart_add():
+    data = request.get_json(silent=True) or {}
+    try:
+        product_id = int(data.get('product_id'))
+    except (TypeError, ValueError):
+        return cart_api_error(_('A valid product_id is required'), 400)
+    quantity = parse_cart_quantity(data.get('quantity', 1), allow_zero=False)
+    if quantity is None:
+        return cart_api_error(_('Invalid quantity'), 400)
+    if product_id not in catalog_cache.get().by_id:
+        return cart_api_error(_('Product not found'), 404)
+    if cart_precondition_failed():
+        return cart_api_error(_('Cart has changed'), 412)
+    
+    cart = get_cart()
+    created = product_id not in cart
+    cart[product_id] = min(cart.get(product_id, 0) + quantity, MAX_CART_QUANTITY)
+    save_cart(cart)
+    return cart_api_response({'line': cart_line(product_id), 'message': _('Product added to cart!')},
+                             201 if created else 200)
+
+@route('/api/v1/cart/items/<int:product_id>', methods=['PUT', 'PATCH'])
+def api_cart_set(product_id):
+    data = request.get_json(silent=True) or {}
+    quantity = parse_cart_quantity(data.get('quantity'))
+    if quantity is None:
+        return cart_api_error(_('Invalid quantity'), 400)
+    if quantity and product_id not in catalog_cache.get().by_id:
+        return cart_api_error(_('Product not found'), 404)
+    if cart_precondition_failed():
+        return cart_api_error(_('Cart has changed'), 412)
+    
+    cart = get_cart()
+    created = product_id not in cart and quantity > 0
+    if quantity:
+        cart[product_id] = quantity
+    else:
+        cart.pop(product_id, None)
+    save_cart(cart)
+    return cart_api_response({'line': cart_line(product_id)}, 201 if created else 200)
+
+@route('/api/v1/cart/items/<int:product_id>', methods=['DELETE'])
+def api_cart_remove(product_id):
+    if cart_precondition_failed():
+        return cart_api_error(_('Cart has changed'), 412)
+    cart = get_cart()
+    if product_id not in cart:
+        return cart_api_error(_('Product is not in the cart'), 404)
+    cart.pop(product_id)
+    save_cart(cart)
+    return cart_api_response({'line': cart_line(product_id), 'message': _('Product removed from cart')})
+
+@route('/api/v1/cart', methods=['PATCH'])
+def api_cart_bulk_update():
+    """Set several quantities at once: {"items": {"<product_id>": quantity, ...}}"""
+    data = request.get_json(silent=True) or {}
+    items = data.get('items')
+    if not isinstance(items, dict) or not items:
+        return cart_api_error(_('An items object is required'), 400)
+    
+    updates = {}
+    products = catalog_cache.get().by_id
+    for key, value in items.items():
+        try:
+            product_id = int(key)
+        except (TypeError, ValueError):
+            return cart_api_error(_('A valid product_id is required'), 400)
+        quantity = parse_cart_quantity(value)
+        if quantity is None:
+            return cart_api_error(_('Invalid quantity'), 400)
+        if quantity and product_id not in products:
+            return cart_api_error(_('Product not found'), 404)
+        updates[product_id] = quantity
+    if cart_precondition_failed():
+        return cart_api_error(_('Cart has changed'), 412)
+    
+    cart = get_cart()
+    for product_id, quantity in updates.items():
+        if quantity:
+            cart[product_id] = quantity
+        else:
+            cart.pop(product_id, None)
+    save_cart(cart)
+    return cart_api_response({'lines': [cart_line(product_id) for product_id in updates]})
+
+@route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
         return redirect(url_for('index'))
@@ -300,7 +990,7 @@ def login():
     
     return render_template('login.html', form=form)
 
-@app.route('/register', methods=['GET', 'POST'])
+@route('/register', methods=['GET', 'POST'])
 def register():
     if current_user.is_authenticated:
         return redirect(url_for('index'))
@@ -315,59 +1005,140 @@ def register():
             last_name=form.last_name.data
         )
         db.session.add(user)
+        metrics.user_registered()
         db.session.commit()
         flash(_('Account created successfully! Please login.'), 'success')
         return redirect(url_for('login'))
     
     return render_template('register.html', form=form)
 
-@app.route('/logout')
+@route('/logout')
 @login_required
 def logout():
     logout_user()
     flash(_('Logged out successfully'), 'info')
     return redirect(url_for('index'))
 
-@app.route('/profile')
+@route('/profile')
 @login_required
 def profile():
-    orders = Order.query.filter_by(user_id=current_user.id).order_by(Order.created_at.desc()).all()
-    return render_template('profile.html', orders=orders)
+    orders, next_cursor = paginate_orders(
+        order_history_query().filter(Order.user_id == current_user.id),
+        request.args.get('cursor', type=int),
+        current_app.config['ORDERS_PER_PAGE']
+    )
+    return render_template('profile.html', orders=orders, next_cursor=next_cursor)
 
-@app.route('/change_language/<language>')
+@route('/change_language/<language>')
 def change_language(language):
-    if language in app.config['LANGUAGES']:
+    if language in current_app.config['LANGUAGES']:
         session['language'] = language
+        g.pop('locale', None)
     return redirect(request.referrer or url_for('index'))
 
 # Admin routes
-@app.route('/admin')
+@route('/admin')
 @login_required
 def admin_dashboard():
     if not current_user.is_admin:
         flash(_('Access denied'), 'error')
         return redirect(url_for('index'))
     
-    products_count = Product.query.count()
-    orders_count = Order.query.count()
-    users_count = User.query.count()
+    catalog = catalog_cache.get()
+    totals = metrics.totals()
+    top_products = [(catalog.by_id.get(product_id), units, revenue)
+                    for product_id, units, revenue in metrics.top_products()]
+    daily = metrics.daily_range(30)
     
     return render_template('admin/dashboard.html', 
-                         products_count=products_count,
-                         orders_count=orders_count,
-                         users_count=users_count)
+                         products_count=int(totals['products']),
+                         orders_count=int(totals['orders']),
+                         users_count=int(totals['users']),
+                         revenue=totals['revenue'],
+                         orders_by_status=metrics.orders_by_status(),
+                         top_products=top_products,
+                         daily=daily,
+                         max_daily_revenue=max(day['revenue'] for day in daily) or 1)
 
-@app.route('/admin/products')
+@route('/admin/metrics')
+def admin_metrics():
+    """Per-endpoint request histograms in the Prometheus text format"""
+    token = current_app.config['METRICS_TOKEN']
+    authorization = request.headers.get('Authorization', '')
+    scraper = token and secrets.compare_digest(authorization.encode(), f'Bearer {token}'.encode())
+    if not scraper and not (current_user.is_authenticated and current_user.is_admin):
+        return 'Forbidden\n', 403, {'Content-Type': 'text/plain; charset=utf-8'}
+    instrumentation = current_app.extensions.get('instrumentation')
+    if instrumentation is None:
+        return 'Instrumentation is disabled\n', 404, {'Content-Type': 'text/plain; charset=utf-8'}
+    return instrumentation.render_metrics(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8',
+                                                   'Cache-Control': 'no-store'}
+
+@route('/admin/products')
 @login_required
 def admin_products():
     if not current_user.is_admin:
         flash(_('Access denied'), 'error')
         return redirect(url_for('index'))
     
-    products = Product.query.all()
-    return render_template('admin/products.html', products=products)
+    per_page = get_page_size()
+    products = admin_products_query(request.args.get('cursor', type=int)).limit(per_page + 1).all()
+    next_cursor = products[per_page - 1].id if len(products) > per_page else None
+    
+    return render_template('admin/products.html', products=products[:per_page],
+                         next_cursor=next_cursor)
+
+def admin_products_query(cursor=None):
+    # A rowid range even on the first page, so SQLite searches the primary key instead of scanning
+    return (Product.query.options(joinedload(Product.category))
+            .filter(Product.id > (cursor or 0)).order_by(Product.id))
+
+@route('/admin/orders')
+@login_required
+def admin_orders():
+    if not current_user.is_admin:
+        flash(_('Access denied'), 'error')
+        return redirect(url_for('index'))
+    
+    orders, next_cursor = paginate_orders(
+        order_history_query(),
+        request.args.get('cursor', type=int),
+        get_page_size()
+    )
+    return render_template('admin/orders.html', orders=orders, next_cursor=next_cursor)
+
+ORDER_STATUSES = ('pending', 'Processing', 'Shipped', 'Delivered', 'Completed', 'Cancelled')
+
+@route('/admin/orders/update_status/<int:order_id>', methods=['POST'])
+@login_required
+def update_order_status(order_id):
+    if not current_user.is_admin:
+        return jsonify({'success': False, 'message': _('Access denied')}), 403
+    
+    status = (request.get_json(silent=True) or {}).get('status')
+    if status not in ORDER_STATUSES:
+        return jsonify({'success': False, 'message': _('Invalid status')}), 400
+    
+    order = db.session.get(Order, order_id)
+    if order is None:
+        return jsonify({'success': False, 'message': _('Order not found')}), 404
+    
+    old_status = order.status or 'pending'
+    if old_status != status:
+        # Only the request that actually flips the status updates the rollups
+        result = db.session.execute(
+            Order.__table__.update()
+            .where(Order.__table__.c.id == order_id, db.func.coalesce(Order.__table__.c.status, 'pending') == old_status)
+            .values(status=status)
+        )
+        if result.rowcount:
+            lines = [{'product_id': item.product_id, 'quantity': item.quantity, 'price': item.price}
+                     for item in order.order_items]
+            metrics.order_status_changed(lines, old_status, status, order.created_at)
+        db.session.commit()
+    return jsonify({'success': True, 'status': status})
 
-@app.route('/admin/product/new', methods=['GET', 'POST'])
+@route('/admin/product/new', methods=['GET', 'POST'])
 @login_required
 def admin_add_product():
     if not current_user.is_admin:
@@ -378,6 +1149,12 @@ def admin_add_product():
     form.category_id.choices = [(c.id, c.name_en) for c in Category.query.all()]
     
     if form.validate_on_submit():
+        try:
+            image_source = ingest_product_image(form)
+        except ImageError as e:
+            flash(str(e), 'error')
+            return render_template('admin/product_form.html', form=form)
+
         product = Product(
             name_en=form.name_en.data,
             name_fr=form.name_fr.data,
@@ -388,126 +1165,317 @@ def admin_add_product():
             price=form.price.data,
             original_price=form.original_price.data,
             discount=form.discount.data,
-            image=form.image.data,
+            image=url_for('static', filename=image_source) if image_source else form.image.data,
             stock=form.stock.data,
             category_id=form.category_id.data
         )
         db.session.add(product)
+        metrics.products_added()
+        db.session.flush()
+        if image_source:
+            job_queue.enqueue('generate_product_images', {'product_id': product.id, 'source': image_source})
         db.session.commit()
+        product_changed(product.id)
+        job_queue.kick()
         flash(_('Product added successfully!'), 'success')
         return redirect(url_for('admin_products'))
     
     return render_template('admin/product_form.html', form=form)
 
-@app.route('/about')
+@route('/about')
 def about():
     return render_template('about.html')
 
-@app.route('/contact')
+@route('/contact')
 def contact():
     return render_template('contact.html')
 
-# Initialize database
+# Initialize database: run once per deployment with `flask init-db`, never at worker startup
 def initialize_database():
-    with app.app_context():
-        db.create_all()
-        
-        # Create admin user if not exists
-        if not User.query.filter_by(email='admin@partyyacout.com').first():
-            admin = User(
-                username='admin',
-                email='admin@partyyacout.com',
-                password='admin123',  # Change this in production!
-                first_name='Admin',
-                last_name='User',
-                is_admin=True
+    db.create_all()
+    
+    # Create admin user if not exists
+    if not User.query.filter_by(email='admin@partyyacout.com').first():
+        admin = User(
+            username='admin',
+            email='admin@partyyacout.com',
+            password='admin123',  # Change this in production!
+            first_name='Admin',
+            last_name='User',
+            is_admin=True
+        )
+        db.session.add(admin)
+        db.session.commit()
+        print("✅ Admin user created: admin@partyyacout.com / admin123")
+    
+    # Create default categories if not exist
+    if Category.query.count() == 0:
+        categories = [
+            {'en': 'Birthday Parties', 'fr': 'Fêtes d\'anniversaire', 'ar': 'حفلات أعياد الميلاد'},
+            {'en': 'Wedding Decorations', 'fr': 'Décorations de mariage', 'ar': 'ديكورات الزفاف'},
+            {'en': 'Balloons', 'fr': 'Ballons', 'ar': 'البالونات'},
+            {'en': 'Tableware', 'fr': 'Articles de table', 'ar': 'أدوات المائدة'}
+        ]
+        for cat_data in categories:
+            category = Category(
+                name_en=cat_data['en'],
+                name_fr=cat_data['fr'],
+                name_ar=cat_data['ar']
             )
-            db.session.add(admin)
-            db.session.commit()
-            print("✅ Admin user created: admin@partyyacout.com / admin123")
-        
-        # Create default categories if not exist
-        if Category.query.count() == 0:
-            categories = [
-                {'en': 'Birthday Parties', 'fr': 'Fêtes d\'anniversaire', 'ar': 'حفلات أعياد الميلاد'},
-                {'en': 'Wedding Decorations', 'fr': 'Décorations de mariage', 'ar': 'ديكورات الزفاف'},
-                {'en': 'Balloons', 'fr': 'Ballons', 'ar': 'البالونات'},
-                {'en': 'Tableware', 'fr': 'Articles de table', 'ar': 'أدوات المائدة'}
-            ]
-            for cat_data in categories:
-                category = Category(
-                    name_en=cat_data['en'],
-                    name_fr=cat_data['fr'],
-                    name_ar=cat_data['ar']
-                )
-                db.session.add(category)
-            db.session.commit()
-            print("✅ Default categories created")
-        
-        # Create sample products if none exist
-        if Product.query.count() == 0:
-            sample_products = [
-                {
-                    'name_en': 'Birthday Party Set',
-                    'name_fr': 'Kit de fête d\'anniversaire',
-                    'name_ar': 'مجموعة حفلة عيد الميلاد',
-                    'description_en': 'Complete birthday party package with decorations, plates, cups, and balloons',
-                    'description_fr': 'Kit complet de fête d\'anniversaire avec décorations, assiettes, verres et ballons',
-                    'description_ar': 'طقم حفلة عيد ميلاد كامل مع ديكورات وأطباق وأكواب وبالونات',
-                    'price': 299.99,
-                    'original_price': 349.99,
-                    'discount': 14,
-                    'image': 'https://images.unsplash.com/photo-1530103862676-de8c9debad1d?ixlib=rb-4.0.3&auto=format&fit=crop&w=500&q=80',
-                    'stock': 50
-                },
-                {
-                    'name_en': 'Balloon Garland Kit',
-                    'name_fr': 'Kit de guirlande de ballons',
-                    'name_ar': 'مجموعة إكليل البالونات',
-                    'description_en': 'Beautiful balloon garland kit for party decorations',
-                    'description_fr': 'Kit de guirlande de ballons pour décorations de fête',
-                    'description_ar': 'مجموعة إكليل بالونات جميلة لديكورات الحفلات',
-                    'price': 149.99,
-                    'image': 'https://images.unsplash.com/photo-1511795409834-ef04bbd61622?ixlib=rb-4.0.3&auto=format&fit=crop&w=500&q=80',
-                    'stock': 30
-                }
-            ]
-            
-            category = Category.query.first()
-            for prod_data in sample_products:
-                product = Product(
-                    name_en=prod_data['name_en'],
-                    name_fr=prod_data['name_fr'],
-                    name_ar=prod_data['name_ar'],
-                    description_en=prod_data['description_en'],
-                    description_fr=prod_data['description_fr'],
-                    description_ar=prod_data['description_ar'],
-                    price=prod_data['price'],
-                    original_price=prod_data.get('original_price'),
-                    discount=prod_data.get('discount'),
-                    image=prod_data['image'],
-                    stock=prod_data['stock'],
-                    category_id=category.id if category else 1
-                )
-                db.session.add(product)
-            db.session.commit()
-            print("✅ Sample products created")
+            db.session.add(category)
+        db.session.commit()
+        print("✅ Default categories created")
+    
+    # Create sample products if none exist
+    if Product.query.count() == 0:
+        sample_products = [
+            {
+                'name_en': 'Birthday Party Set',
+                'name_fr': 'Kit de fête d\'anniversaire',
+                'name_ar': 'مجموعة حفلة عيد الميلاد',
+                'description_en': 'Complete birthday party package with decorations, plates, cups, and balloons',
+                'description_fr': 'Kit complet de fête d\'anniversaire avec décorations, assiettes, verres et ballons',
+                'description_ar': 'طقم حفلة عيد ميلاد كامل مع ديكورات وأطباق وأكواب وبالونات',
+                'price': 299.99,
+                'original_price': 349.99,
+                'discount': 14,
+                'image': 'https://images.unsplash.com/photo-1530103862676-de8c9debad1d?ixlib=rb-4.0.3&auto=format&fit=crop&w=500&q=80',
+                'stock': 50
+            },
+            {
+                'name_en': 'Balloon Garland Kit',
+                'name_fr': 'Kit de guirlande de ballons',
+                'name_ar': 'مجموعة إكليل البالونات',
+                'description_en': 'Beautiful balloon garland kit for party decorations',
+                'description_fr': 'Kit de guirlande de ballons pour décorations de fête',
+                'description_ar': 'مجموعة إكليل بالونات جميلة لديكورات الحفلات',
+                'price': 149.99,
+                'image': 'https://images.unsplash.com/photo-1511795409834-ef04bbd61622?ixlib=rb-4.0.3&auto=format&fit=crop&w=500&q=80',
+                'stock': 30
+            }
+        ]
+    
+        category = Category.query.first()
+        for prod_data in sample_products:
+            product = Product(
+                name_en=prod_data['name_en'],
+                name_fr=prod_data['name_fr'],
+                name_ar=prod_data['name_ar'],
+                description_en=prod_data['description_en'],
+                description_fr=prod_data['description_fr'],
+                description_ar=prod_data['description_ar'],
+                price=prod_data['price'],
+                original_price=prod_data.get('original_price'),
+                discount=prod_data.get('discount'),
+                image=prod_data['image'],
+                stock=prod_data['stock'],
+                category_id=category.id if category else 1
+            )
+            db.session.add(product)
+        db.session.commit()
+        print("✅ Sample products created")
+
+# Schema migrations for databases created before the indexes were declared
+def rebuild_metrics():
+    metrics.rebuild(Order, OrderItem, User, Product)
+
+def migrate_database():
+    db.create_all()
+    # Rollups start from the existing rows the first time, and again when a counter is added
+    if not metrics.complete():
+        rebuild_metrics()
+    created = []
+    inspector = db.inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(db.engine)
+                created.append(index.name)
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql('ANALYZE')
+    return created
+
+def explain_queries():
+    """EXPLAIN QUERY PLAN for the app's main queries"""
+    queries = {
+        'catalog products': Product.query.filter_by(is_active=True).order_by(Product.id),
+        'category products': Product.query.filter_by(is_active=True, category_id=1).order_by(Product.id),
+        'admin products page': admin_products_query().limit(25),
+        'profile orders page': order_history_query().filter(Order.user_id == 1).limit(11),
+        'order items': OrderItem.query.filter_by(order_id=1),
+    }
+    plans = {}
+    # A new connection: the session's read snapshot may predate the indexes and ANALYZE just run
+    with db.engine.connect() as connection:
+        for name, query in queries.items():
+            sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+            rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}').all()
+            plans[name] = [row[-1] for row in rows]
+    return plans
+
+@commands.command('init-db')
+def init_db_command():
+    """Create tables and indexes, the admin account and sample data; safe to re-run"""
+    started = time.perf_counter()
+    initialize_database()
+    for name in migrate_database():
+        print(f"✅ Created index {name}")
+    print(f"✅ Database ready in {time.perf_counter() - started:.2f}s")
+
+@commands.command('migrate-db')
+@click.option('--explain', is_flag=True, help='Print EXPLAIN QUERY PLAN for the main queries.')
+def migrate_db_command(explain):
+    """Create missing indexes and refresh the query planner statistics"""
+    created = migrate_database()
+    for name in created:
+        print(f"✅ Created index {name}")
+    print("✅ Database statistics analyzed")
+    if explain:
+        for name, plan in explain_queries().items():
+            print(f"\n{name}:")
+            for step in plan:
+                full_scan = step.startswith('SCAN') and 'INDEX' not in step and not step.startswith('SCAN anon_')
+                warning = '  ⚠️ full scan' if full_scan else ''
+                print(f"  {step}{warning}")
+
+@commands.command('seed-synthetic')
+@click.option('--scale', type=click.Choice(list(SCALES)), default='1k', help='Number of products to add.')
+@click.option('--seed', default=42, help='Random seed; the same seed gives the same data.')
+def seed_synthetic_command(scale, seed):
+    """Add a synthetic trilingual catalog with users and orders (for benchmarks)"""
+    started = time.perf_counter()
+    counts = seed_synthetic_data(db, {'Category': Category, 'Product': Product, 'User': User,
+                                      'Order': Order, 'OrderItem': OrderItem}, scale, seed=seed)
+    migrate_database()
+    rebuild_metrics()
+    product_changed()
+    for name, count in counts.items():
+        print(f"🌱 {count} {name}")
+    print(f"✅ Synthetic data seeded in {time.perf_counter() - started:.1f}s")
+
+@commands.command('rebuild-metrics')
+def rebuild_metrics_command():
+    """Recompute the dashboard rollups from orders and users"""
+    started = time.perf_counter()
+    rebuild_metrics()
+    print(f"✅ Dashboard metrics rebuilt in {time.perf_counter() - started:.2f}s")
+
+@commands.command('build-assets')
+def build_assets_command():
+    """Minify, fingerprint and precompress static files into static/dist"""
+    manifest = build_assets(current_app.static_folder)
+    static_assets.reload()
+    for logical, built in sorted(manifest.items()):
+        print(f"📦 {logical} -> {built}")
+    print(f"✅ Built {len(manifest)} static assets")
+
+@commands.command('import-products')
+@click.argument('path')
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), help='Defaults to the file extension.')
+@click.option('--batch-size', default=1000, help='Rows validated and written per transaction.')
+@click.option('--dry-run', is_flag=True, help='Validate and roll back every batch.')
+@click.option('--no-create-categories', is_flag=True, help='Reject rows whose category does not exist.')
+def import_products_command(path, fmt, batch_size, dry_run, no_create_categories):
+    """Upsert products from a CSV, JSON or JSON Lines file ('-' for stdin)"""
+    try:
+        fmt = detect_format(path, fmt)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    importer = ProductImporter(db, Product, Category, batch_size=batch_size,
+                               create_categories=not no_create_categories)
+    report = ImportReport()
+    with open_stream(path) as f:
+        try:
+            importer.run(read_records(f, fmt), dry_run=dry_run, report=report)
+        except ValueError as e:
+            print(f"❌ {e}")
+        finally:
+            # Batches committed before a failure still have to reach the caches
+            if not dry_run and report.inserted:
+                metrics.products_added(report.inserted)
+                db.session.commit()
+            if not dry_run and (report.inserted or report.updated):
+                product_changed()
+    for line, message in report.errors:
+        print(f"⚠️ line {line}: {message}")
+    if report.error_count > len(report.errors):
+        print(f"⚠️ ... and {report.error_count - len(report.errors)} more errors")
+    prefix = "🧪 Dry run: " if dry_run else "✅ "
+    print(f"{prefix}{report.read} rows read, {report.inserted} inserted, {report.updated} updated, "
+          f"{report.error_count} rejected, {report.categories_created} categories created "
+          f"in {report.elapsed:.2f}s ({report.rate:,.0f} rows/s)")
+
+@commands.command('export-products')
+@click.argument('path')
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), help='Defaults to the file extension.')
+def export_products_command(path, fmt):
+    """Write every product to a CSV, JSON or JSON Lines file ('-' for stdout)"""
+    try:
+        fmt = detect_format(path, fmt)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    started = time.perf_counter()
+    with open_stream(path, 'w') as f:
+        count = write_records(f, fmt, export_products(db, Product, Category))
+    elapsed = time.perf_counter() - started
+    click.echo(f"✅ Exported {count} products in {elapsed:.2f}s", err=path == '-')
+
+@commands.command('migrate-legacy-data')
+@click.option('--data-dir', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'), help='Directory holding the legacy JSON files.')
+@click.option('--batch-size', default=500, help='Records per batch insert.')
+@click.option('--dry-run', is_flag=True, help='Report what would be migrated and roll back.')
+def migrate_legacy_data_command(data_dir, batch_size, dry_run):
+    """Move the old data/*.json stores into the database (safe to run again)"""
+    from legacy_migration import LegacyMigrator
+    migrator = LegacyMigrator(db, User, Category, Product, Order, OrderItem, data_dir, batch_size=batch_size)
+    started = time.perf_counter()
+    try:
+        reports = migrator.run(dry_run=dry_run)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    for report in reports:
+        print(f"📄 {report.name}: {report.read} read, {report.inserted} migrated, {report.existing} already present")
+        for legacy_id, message in report.conflicts:
+            where = f" #{legacy_id}" if legacy_id is not None else ""
+            print(f"   ⚠️{where} {message}")
+    if not dry_run and any(report.inserted for report in reports):
+        product_changed()
+        rebuild_metrics()
+    prefix = "🧪 Dry run finished" if dry_run else "✅ Legacy data migrated"
+    print(f"{prefix} in {time.perf_counter() - started:.2f}s")
+
+@commands.command('run-jobs')
+@click.option('--once', is_flag=True, help='Run the due jobs and exit.')
+@click.option('--poll', default=1.0, help='Seconds to wait when the queue is empty.')
+def run_jobs_command(once, poll):
+    """Run background jobs (confirmation emails, admin notifications, stock alerts)"""
+    print(f"⚙️ Job worker started (poll every {poll}s)")
+    ran = job_queue.work(poll_interval=poll, once=once)
+    if once:
+        print(f"✅ Ran {ran} job(s)")
 
 # Context processor to make functions available in all templates
-@app.context_processor
 def inject_global_variables():
     return dict(
         get_locale=get_locale,
+        t=translate,
         get_product_name=get_product_name,
         get_product_description=get_product_description,
+        render_product_card=render_product_card,
         get_cart_total=get_cart_total,
         get_shipping_cost=get_shipping_cost,
-        cart_count=len(session.get('cart', {}))
+        get_cart_summary=get_cart_summary,
+        # Called by the templates that show it, not computed for every render
+        cart_count=get_cart_count
     )
 
 if __name__ == '__main__':
-    # Initialize database before running
-    initialize_database()
+    app = create_app({'TRANSLATIONS_AUTO_RELOAD': True})
+    # Development convenience; deployments run `flask init-db` once instead
+    with app.app_context():
+        initialize_database()
+        migrate_database()
     print("🚀 Party Yacout starting on http://localhost:5000")
     print("🔐 Admin login: admin@partyyacout.com / admin123")
     app.run(debug=True)
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""Benchmark the main routes against a synthetic catalog.
+
+    python benchmark.py --scale 10k                   # run and compare with the stored baseline
+    python benchmark.py --scale 10k --save-baseline   # record a new baseline
+    python benchmark.py --scale 1k --workers 4        # multi-process load
+    python benchmark.py --startup                     # import/create_app time against a budget
+
+The startup budgets are also enforced by tests/test_startup.py.
+
+The database lives in instance/benchmark-<scale>.db and is seeded once
+(see synthetic_data.py); pass --fresh to rebuild it.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+ADMIN_LOGIN = {'email': 'admin@partyyacout.com', 'password': 'admin123'}
+CHECKOUT_FORM = {'full_name': 'Bench User', 'email': 'bench@example.com', 'phone': '0600000000',
+                 'address': '1 Rue des Fêtes', 'city': 'Casablanca'}
+
+shop = None          # the app module, imported once the environment is configured
+flask_app = None
+state = {}           # product ids, category ids and users shared with worker processes
+sql_statements = [0]
+
+
+def configure_environment(db_path):
+    os.environ.update({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
+        'CART_BACKEND': 'memory',
+        'MAIL_BACKEND': 'memory',
+        'JOB_QUEUE_MODE': 'worker',
+        'PAGE_CACHE_ENABLED': '0',
+    })
+
+
+def count_statement(*args):
+    sql_statements[0] += 1
+
+
+def prepare(scale, seed):
+    """Import the app, seed the database if needed and collect ids for the scenarios"""
+    global shop, flask_app
+    sys.path.insert(0, ROOT)
+    import app as shop_module
+    from sqlalchemy import event
+    from synthetic_data import SCALES, SEARCH_TERMS
+    import synthetic_data
+
+    shop = shop_module
+    flask_app = shop.create_app({'WTF_CSRF_ENABLED': False})
+    with flask_app.app_context():
+        shop.initialize_database()
+        products = shop.Product.query.count()
+        if products < SCALES[scale]:
+            print(f"🌱 Seeding {scale} synthetic products...")
+            started = time.perf_counter()
+            counts = synthetic_data.seed(shop.db, {
+                'Category': shop.Category, 'Product': shop.Product, 'User': shop.User,
+                'Order': shop.Order, 'OrderItem': shop.OrderItem,
+            }, scale, seed=seed)
+            print(f"✅ Seeded {counts} in {time.perf_counter() - started:.1f}s")
+        shop.migrate_database()
+        shop.rebuild_metrics()
+        shop.product_changed()
+
+        catalog = shop.catalog_cache.get()
+        state['product_ids'] = [product.id for product in catalog.products]
+        state['category_ids'] = [category.id for category in catalog.categories]
+        # Checkout gets its own user so the orders it adds do not grow /profile between runs
+        user, buyer = shop.User.query.filter(shop.User.username.like('bench%')).order_by(shop.User.id).limit(2)
+        state['user_login'] = {'email': user.email, 'password': user.password}
+        state['buyer_login'] = {'email': buyer.email, 'password': buyer.password}
+        state['search_terms'] = SEARCH_TERMS
+        event.listen(shop.db.engine, 'before_cursor_execute', count_statement)
+
+
+# Scenarios
+def fill_cart(client, rng, items=5):
+    for product_id in rng.sample(state['product_ids'], items):
+        client.post('/api/v1/cart/items', json={'product_id': product_id, 'quantity': 1})
+
+
+def _pick(key):
+    return lambda rng: rng.choice(state[key])
+
+
+SCENARIOS = [
+    {'name': 'home', 'url': lambda rng: '/'},
+    {'name': 'products', 'url': lambda rng: '/products'},
+    {'name': 'products_category', 'url': lambda rng: f"/products?category_id={_pick('category_ids')(rng)}"},
+    {'name': 'products_search', 'url': lambda rng: f"/products?search={_pick('search_terms')(rng)}"},
+    {'name': 'product_detail', 'url': lambda rng: f"/product/{_pick('product_ids')(rng)}"},
+    {'name': 'search_suggestions', 'url': lambda rng: f"/search_suggestions?q={_pick('search_terms')(rng)}"},
+    {'name': 'view_cart', 'role': 'user', 'url': lambda rng: '/cart', 'once': fill_cart},
+    {'name': 'checkout_form', 'role': 'user', 'url': lambda rng: '/checkout', 'once': fill_cart},
+    {'name': 'checkout_submit', 'role': 'buyer', 'method': 'POST', 'url': lambda rng: '/checkout',
+     'data': CHECKOUT_FORM, 'before': lambda client, rng: fill_cart(client, rng, 2)},
+    {'name': 'profile', 'role': 'user', 'url': lambda rng: '/profile'},
+    {'name': 'admin_dashboard', 'role': 'admin', 'url': lambda rng: '/admin'},
+    {'name': 'admin_orders', 'role': 'admin', 'url': lambda rng: '/admin/orders'},
+]
+
+
+def make_client(role):
+    client = flask_app.test_client()
+    if role in ('user', 'buyer'):
+        client.post('/login', data=state[f'{role}_login'])
+    elif role == 'admin':
+        client.post('/login', data=ADMIN_LOGIN)
+    return client
+
+
+def run_scenario(scenario, requests, warmup, seed):
+    """Time ``requests`` calls of one scenario; returns latencies (s), SQL counts and errors"""
+    rng = random.Random(seed)
+    client = make_client(scenario.get('role'))
+    if scenario.get('once'):
+        scenario['once'](client, rng)
+    latencies, statements, errors = [], [], 0
+    for number in range(warmup + requests):
+        if scenario.get('before'):
+            scenario['before'](client, rng)
+        url = scenario['url'](rng)
+        sql_statements[0] = 0
+        started = time.perf_counter()
+        response = client.open(url, method=scenario.get('method', 'GET'), data=scenario.get('data'))
+        elapsed = time.perf_counter() - started
+        if number < warmup:
+            continue
+        latencies.append(elapsed)
+        statements.append(sql_statements[0])
+        if response.status_code >= 400:
+            errors += 1
+    return latencies, statements, errors
+
+
+def _worker(args):
+    index, requests, warmup, seed = args
+    with flask_app.app_context():
+        shop.db.engine.dispose(close=False)
+    return run_scenario(SCENARIOS[index], requests, warmup, seed)
+
+
+def measure(index, requests, warmup, workers, seed):
+    started = time.perf_counter()
+    if workers <= 1:
+        parts = [run_scenario(SCENARIOS[index], requests, warmup, seed)]
+    else:
+        context = multiprocessing.get_context('fork')
+        share = max(requests // workers, 1)
+        with context.Pool(workers) as pool:
+            parts = pool.map(_worker, [(index, share, warmup, seed + worker) for worker in range(workers)])
+    wall = time.perf_counter() - started
+
+    latencies = sorted(latency for part in parts for latency in part[0])
+    statements = [count for part in parts for count in part[1]]
+    percentiles = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+    return {
+        'requests': len(latencies),
+        'p50_ms': round(percentiles[49] * 1000, 3),
+        'p99_ms': round(percentiles[98] * 1000, 3),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 3),
+        'rps': round(len(latencies) / (wall if workers > 1 else sum(latencies)), 1),
+        'sql_per_request': round(statistics.fmean(statements), 2),
+        'sql_max': max(statements),
+        'errors': sum(part[2] for part in parts),
+    }
+
+
+# Startup
+# Budgets for what this codebase adds on top of its frameworks, which are
+# imported (and timed) first so their cost does not count against the app.
+IMPORT_BUDGET_MS = 250
+CREATE_APP_BUDGET_MS = 100
+FRAMEWORKS = ('flask', 'flask_sqlalchemy', 'flask_login', 'flask_wtf', 'flask_babel', 'wtforms', 'sqlalchemy.orm')
+
+STARTUP_PROBE = """
+import importlib, json, sys, time
+started = time.perf_counter()
+for name in %r:
+    importlib.import_module(name)
+frameworks = time.perf_counter()
+import app
+imported = time.perf_counter()
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+statements = []
+event.listen(Engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+app.create_app()
+created = time.perf_counter()
+print(json.dumps({'framework_ms': (frameworks - started) * 1000, 'import_ms': (imported - frameworks) * 1000,
+                  'create_app_ms': (created - imported) * 1000, 'sql': len(statements),
+                  'modules': len(sys.modules)}))
+""" % (FRAMEWORKS,)
+
+
+def measure_startup(runs):
+    """Median framework, app import and create_app() time over fresh interpreters, plus the SQL create_app ran"""
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', STARTUP_PROBE], cwd=ROOT, env=os.environ,
+                                capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        'framework_ms': round(statistics.median(s['framework_ms'] for s in samples), 1),
+        'import_ms': round(statistics.median(s['import_ms'] for s in samples), 1),
+        'create_app_ms': round(statistics.median(s['create_app_ms'] for s in samples), 1),
+        'sql': max(s['sql'] for s in samples),
+        'modules': samples[-1]['modules'],
+    }
+
+
+def startup_failures(result):
+    failures = []
+    if result['import_ms'] > IMPORT_BUDGET_MS:
+        failures.append(f"import app took {result['import_ms']} ms")
+    if result['create_app_ms'] > CREATE_APP_BUDGET_MS:
+        failures.append(f"create_app() took {result['create_app_ms']} ms")
+    if result['sql']:
+        failures.append(f"create_app() ran {result['sql']} SQL statements; startup must not touch the database")
+    return failures
+
+
+def check_startup(args):
+    result = measure_startup(args.runs)
+    print(f"📚 frameworks: {result['framework_ms']} ms")
+    print(f"📦 import app: {result['import_ms']} ms (budget {IMPORT_BUDGET_MS} ms), "
+          f"{result['modules']} modules loaded")
+    print(f"🏗️ create_app(): {result['create_app_ms']} ms (budget {CREATE_APP_BUDGET_MS} ms), "
+          f"{result['sql']} SQL statements")
+    failures = startup_failures(result)
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ Startup within budget")
+    return 1 if failures else 0
+
+
+# Baselines
+def compare(results, baseline, tolerance):
+    """Regressions: more SQL per request than the baseline, or latency beyond the tolerance"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if result['sql_per_request'] > base['sql_per_request'] + 0.5:
+            regressions.append(f"{name}: {result['sql_per_request']} SQL/request (baseline {base['sql_per_request']})")
+        for key, allowed in (('p50_ms', tolerance), ('p99_ms', tolerance * 2)):
+            # Ignore sub-millisecond jitter on very fast routes
+            if result[key] > base[key] * (1 + allowed) and result[key] - base[key] > 1:
+                regressions.append(f"{name}: {key} {result[key]} (baseline {base[key]})")
+        if result['errors'] > base.get('errors', 0):
+            regressions.append(f"{name}: {result['errors']} error responses")
+    return regressions
+
+
+def print_table(results, baseline):
+    print(f"\n{'route':<20} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>9} {'SQL':>6} {'max':>5} {'err':>4}  vs baseline p50")
+    for name, result in results.items():
+        base = baseline.get(name)
+        delta = f"{(result['p50_ms'] / base['p50_ms'] - 1) * 100:+.0f}%" if base and base['p50_ms'] else ''
+        print(f"{name:<20} {result['p50_ms']:>9.2f} {result['p99_ms']:>9.2f} {result['rps']:>9.1f} "
+              f"{result['sql_per_request']:>6.2f} {result['sql_max']:>5} {result['errors']:>4}  {delta}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=('1k', '10k', '100k'), default='1k')
+    parser.add_argument('--requests', type=int, default=200, help='Timed requests per route.')
+    parser.add_argument('--warmup', type=int, default=20, help='Untimed requests per route (and per worker).')
+    parser.add_argument('--workers', type=int, default=1, help='Processes driving load at the same time.')
+    parser.add_argument('--routes', help='Comma-separated subset of routes to run.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db', help='Database file (default instance/benchmark-<scale>.db).')
+    parser.add_argument('--fresh', action='store_true', help='Delete and reseed the benchmark database.')
+    parser.add_argument('--baseline', help='Baseline file (default benchmarks/baseline-<scale>[-w<workers>].json).')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline.')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed p50 slowdown (p99 gets twice this).')
+    parser.add_argument('--startup', action='store_true', help='Check worker startup time instead of routes.')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to time for --startup.')
+    args = parser.parse_args()
+
+    db_path = os.path.abspath(args.db or os.path.join(ROOT, 'instance', f'benchmark-{args.scale}.db'))
+    # Latencies under concurrent load are not comparable with single-process ones
+    suffix = f'-w{args.workers}' if args.workers > 1 else ''
+    baseline_path = args.baseline or os.path.join(ROOT, 'benchmarks', f'baseline-{args.scale}{suffix}.json')
+    if args.fresh and os.path.exists(db_path):
+        os.remove(db_path)
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    configure_environment(db_path)
+    if args.startup:
+        return check_startup(args)
+    prepare(args.scale, args.seed)
+
+    selected = set(args.routes.split(',')) if args.routes else None
+    results = {}
+    for index, scenario in enumerate(SCENARIOS):
+        if selected and scenario['name'] not in selected:
+            continue
+        print(f"⏱️ {scenario['name']}...", flush=True)
+        results[scenario['name']] = measure(index, args.requests, args.warmup, args.workers, args.seed)
+
+    baseline = {}
+    if os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            baseline = json.load(f).get('results', {})
+    print_table(results, baseline)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        with open(baseline_path, 'w') as f:
+            json.dump({'scale': args.scale, 'workers': args.workers, 'requests': args.requests,
+                       'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+                       'results': {**baseline, **results}}, f, indent=2, sort_keys=True)
+        print(f"\n💾 Baseline saved to {baseline_path}")
+        return 0
+
+    if not baseline:
+        print(f"\nℹ️ No baseline at {baseline_path}; run with --save-baseline to record one")
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"❌ {regression}")
+    if not regressions:
+        print("\n✅ No regressions against the baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
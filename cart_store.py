@@ -0,0 +1,174 @@
+# Server-side cart storage
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+
+KEY_RE = re.compile(r'^[A-Za-z0-9_:-]{8,80}$')
+
+
+def encode_cart(items, summary=None):
+    """Compact encoding: ``id:qty,id:qty`` plus an optional ``;count,subtotal,shipping``"""
+    value = ','.join(f'{product_id}:{quantity}' for product_id, quantity in items.items())
+    if summary is not None:
+        value += f";{summary['count']},{summary['subtotal']!r},{summary['shipping']!r}"
+    return value.encode('ascii')
+
+
+def decode_cart(value):
+    if not value:
+        return {}, None
+    if isinstance(value, bytes):
+        value = value.decode('ascii')
+    items_part, _, summary_part = value.partition(';')
+    items = {}
+    for pair in filter(None, items_part.split(',')):
+        product_id, _, quantity = pair.partition(':')
+        items[int(product_id)] = int(quantity)
+    summary = None
+    if summary_part:
+        count, subtotal, shipping = summary_part.split(',')
+        subtotal, shipping = float(subtotal), float(shipping)
+        summary = {'count': int(count), 'subtotal': subtotal, 'shipping': shipping,
+                   'grand_total': subtotal + shipping}
+    return items, summary
+
+
+class MemoryCartBackend:
+    """Process-local stand-in for Redis (tests, single-process development)"""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = (value, time.time() + ex if ex else None)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class SQLiteCartBackend:
+    """Redis-style get/set/delete on a small SQLite key-value table"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS cart_store ('
+                               'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL) WITHOUT ROWID')
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        row = self._connection().execute(
+            'SELECT value FROM cart_store WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)',
+            (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ex=None):
+        connection = self._connection()
+        connection.execute('INSERT OR REPLACE INTO cart_store (key, value, expires_at) VALUES (?, ?, ?)',
+                           (key, value, time.time() + ex if ex else None))
+        if random.random() < 0.01:
+            connection.execute('DELETE FROM cart_store WHERE expires_at <= ?', (time.time(),))
+
+    def delete(self, key):
+        self._connection().execute('DELETE FROM cart_store WHERE key = ?', (key,))
+
+
+class FileCartBackend:
+    """One small file per cart; the file's mtime holds its expiry time"""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, key):
+        if not KEY_RE.match(key):
+            raise ValueError('Invalid cart key')
+        return os.path.join(self.directory, key.replace(':', '_'))
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            if os.stat(path).st_mtime <= time.time():
+                os.remove(path)
+                return None
+            with open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def set(self, key, value, ex=None):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(value)
+        expires_at = time.time() + (ex or 10 * 365 * 24 * 3600)
+        os.utime(tmp_path, (expires_at, expires_at))
+        os.replace(tmp_path, path)
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+def make_cart_backend(config, instance_path):
+    backend = config.get('CART_BACKEND', 'sqlite')
+    if backend == 'redis':
+        import redis
+        return redis.Redis.from_url(config['CART_REDIS_URL'])
+    if backend == 'memory':
+        return MemoryCartBackend()
+    if backend == 'file':
+        return FileCartBackend(config.get('CART_STORE_PATH') or os.path.join(instance_path, 'carts'))
+    return SQLiteCartBackend(config.get('CART_STORE_PATH') or os.path.join(instance_path, 'carts.db'))
+
+
+class CartStore:
+    """Carts keyed by a random id kept in the session cookie"""
+
+    def __init__(self, backend=None, ttl=30 * 24 * 3600, prefix='cart:'):
+        self.backend = backend
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def init_app(self, app):
+        # Backends connect on first use, not here
+        self.backend = make_cart_backend(app.config, app.instance_path)
+        self.ttl = app.config.setdefault('CART_TTL', self.ttl)
+
+    def load(self, cart_id):
+        return decode_cart(self.backend.get(self.prefix + cart_id))
+
+    def save(self, cart_id, items, summary=None):
+        if items:
+            self.backend.set(self.prefix + cart_id, encode_cart(items, summary), ex=self.ttl)
+        else:
+            self.backend.delete(self.prefix + cart_id)
@@ -0,0 +1,226 @@
+# In-process catalog cache
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogRecord:
+    """Detached, read-only copy of a model row"""
+
+    def __init__(self, row, columns, **extra):
+        values = []
+        for name in columns:
+            value = getattr(row, name)
+            setattr(self, name, value)
+            values.append(value)
+        for name, value in extra.items():
+            setattr(self, name, value)
+            values.append(value)
+        # Changes whenever any column does; keys rendered fragments
+        self.version = hashlib.md5(repr(values).encode('utf-8')).hexdigest()[:12]
+
+    def __repr__(self):
+        return f'<CatalogRecord {getattr(self, "id", None)}>'
+
+
+def localized_field(row, field, locale):
+    """Localized column value, falling back to English"""
+    if locale and locale != 'en':
+        value = getattr(row, f'{field}_{locale}', None)
+        if value:
+            return value
+    return getattr(row, f'{field}_en', None)
+
+
+class LocalizedProduct:
+    """Lightweight product view with name and description resolved for one locale"""
+
+    __slots__ = ('id', 'name', 'description', 'price', 'original_price', 'discount',
+                 'image', 'images', 'stock', 'category_id', 'category', 'version')
+
+    def __init__(self, product, locale, category=None):
+        self.id = product.id
+        self.name = localized_field(product, 'name', locale)
+        self.description = localized_field(product, 'description', locale)
+        self.price = product.price
+        self.original_price = product.original_price
+        self.discount = product.discount
+        self.image = product.image
+        self.images = getattr(product, 'images', ())
+        self.stock = product.stock
+        self.category_id = product.category_id
+        self.category = localized_field(category, 'name', locale) if category is not None else None
+        self.version = f"{getattr(product, 'version', '')}.{getattr(category, 'version', '')}"
+
+    def __repr__(self):
+        return f'<LocalizedProduct {self.id}>'
+
+
+class Catalog:
+    """One immutable version of the storefront catalog.
+
+    ``version`` is the shared invalidation counter; ``digest`` changes
+    whenever the loaded rows do (stock included), even when they changed
+    without a bump and were only picked up by a TTL reload.
+    """
+
+    def __init__(self, version, products, categories):
+        self.version = version
+        digest = hashlib.md5()
+        for record in categories + products:
+            digest.update(record.version.encode('ascii'))
+        self.digest = digest.hexdigest()[:16]
+        self.categories = categories
+        self.products = products
+        self.by_id = {product.id: product for product in products}
+        self.by_category = {}
+        for product in products:
+            self.by_category.setdefault(product.category_id, []).append(product)
+        self.loaded_at = time.monotonic()
+        self._localized = {}
+
+    def localized(self, locale):
+        """Products projected for a locale, keyed by id, built once per catalog version"""
+        views = self._localized.get(locale)
+        if views is None:
+            views = {product.id: LocalizedProduct(product, locale, product.category)
+                     for product in self.products}
+            self._localized[locale] = views
+        return views
+
+
+class VersionFile:
+    """A version string in a small file, so that a bump from one worker is
+    seen by every other worker without any SQL (one stat per read).
+
+    Every process reads the same string, so anything derived from it (cache
+    keys, ETags) agrees across workers.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._stamp = None
+        self._version = ''
+
+    def read(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return ''
+        stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if stamp != self._stamp:
+            try:
+                with open(self.path, 'r') as f:
+                    self._version = f.read().strip()
+            except OSError:
+                self._version = ''
+            self._stamp = stamp
+        return self._version
+
+    def bump(self):
+        """Write a new version; returns False (and logs) if the file could not be written"""
+        if not self.path:
+            return False
+        version = f'{time.time_ns()}-{os.getpid()}'
+        temporary = f'{self.path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # Replaced atomically, so a reader never sees a half-written version
+            with open(temporary, 'w') as f:
+                f.write(version)
+            os.replace(temporary, self.path)
+            stat = os.stat(self.path)
+        except OSError:
+            logger.exception('Could not write %s; other workers keep the old version until their TTL expires',
+                             self.path)
+            try:
+                os.unlink(temporary)
+            except OSError:
+                pass
+            return False
+        # Timestamps can be coarser than two quick bumps: trust our own write
+        self._stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        self._version = version
+        return True
+
+
+class CatalogCache:
+    """Versioned catalog snapshot with a TTL and an LRU of derived listings.
+
+    The version lives in a small file so that a bump from one worker is
+    picked up by every other worker on its next request, without any SQL,
+    and is the same string in every worker.
+    """
+
+    def __init__(self, loader, version_file=None, ttl=300, max_entries=256):
+        self.loader = loader
+        self.version_file = VersionFile(version_file or '')
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.RLock()
+        self._catalog = None
+        self._entries = OrderedDict()
+        self._load_listeners = []
+
+    def init_app(self, app):
+        self.version_file = VersionFile(os.path.join(app.instance_path, 'catalog.version'))
+        self.ttl = app.config.setdefault('CATALOG_CACHE_TTL', self.ttl)
+        self.max_entries = app.config.setdefault('CATALOG_CACHE_MAX_ENTRIES', self.max_entries)
+        self._catalog = None
+        self._entries.clear()
+
+    def on_load(self, func):
+        """Register ``func(catalog)`` to run on every newly loaded catalog before it is served"""
+        self._load_listeners.append(func)
+        return func
+
+    @property
+    def version(self):
+        return self.version_file.read()
+
+    def bump(self):
+        """Invalidate the catalog in this process and in every other worker"""
+        with self._lock:
+            self._catalog = None
+            self._entries.clear()
+            self.version_file.bump()
+
+    def get(self):
+        """Current catalog, reloaded when the version changes or the TTL expires"""
+        version = self.version
+        catalog = self._catalog
+        if (catalog is not None and catalog.version == version
+                and time.monotonic() - catalog.loaded_at < self.ttl):
+            return catalog
+
+        with self._lock:
+            catalog = self._catalog
+            if (catalog is None or catalog.version != version
+                    or time.monotonic() - catalog.loaded_at >= self.ttl):
+                products, categories = self.loader()
+                catalog = Catalog(version, products, categories)
+                for listener in self._load_listeners:
+                    listener(catalog)
+                self._catalog = catalog
+                self._entries.clear()
+            return catalog
+
+    def memoize(self, key, compute):
+        """Cache a value derived from the current catalog, bounded by LRU"""
+        catalog = self.get()
+        cache_key = (catalog.digest, key)
+        with self._lock:
+            if cache_key in self._entries:
+                self._entries.move_to_end(cache_key)
+                return self._entries[cache_key]
+        value = compute(catalog)
+        with self._lock:
+            self._entries[cache_key] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
@@ -0,0 +1,385 @@
+# Streaming product import/export
+import csv
+import io
+import json
+import re
+import sys
+import time
+from contextlib import nullcontext
+from itertools import islice
+
+from sqlalchemy import bindparam, select
+from sqlalchemy.exc import IntegrityError
+
+from search_index import normalize
+
+FORMATS = ('csv', 'json', 'jsonl')
+EXPORT_FIELDS = ['id', 'name_en', 'name_fr', 'name_ar', 'description_en', 'description_fr', 'description_ar',
+                 'price', 'original_price', 'discount', 'image', 'stock', 'category', 'is_active']
+ALIASES = {'name': 'name_en', 'description': 'description_en'}
+TEXT_FIELDS = ('name_en', 'name_fr', 'name_ar', 'description_en', 'description_fr', 'description_ar', 'image')
+NON_SPACE = re.compile(r'\S')
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    extension = path.rsplit('.', 1)[-1].lower() if '.' in path else ''
+    if extension not in FORMATS:
+        raise ValueError(f'Cannot tell the format of {path}; pass --format')
+    return extension
+
+
+def open_stream(path, mode='r'):
+    """Open a text file for import/export; ``-`` means stdin/stdout"""
+    if path == '-':
+        stream = sys.stdin if mode == 'r' else sys.stdout
+        return nullcontext(io.TextIOWrapper(stream.buffer, encoding='utf-8-sig' if mode == 'r' else 'utf-8',
+                                            newline='', write_through=True))
+    return open(path, mode, encoding='utf-8-sig' if mode == 'r' else 'utf-8', newline='')
+
+
+def iter_json_array(f, chunk_size=1 << 16):
+    """Yield the items of a top-level JSON array without loading the whole file"""
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = '', 0, False
+
+    def more():
+        nonlocal buffer, pos, eof
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer, pos = buffer[pos:] + chunk, 0
+        return not eof
+
+    def peek():
+        nonlocal pos
+        while True:
+            match = NON_SPACE.search(buffer, pos)
+            if match:
+                pos = match.start()
+                return buffer[pos]
+            pos = len(buffer)
+            if not more():
+                return ''
+
+    if peek() != '[':
+        raise ValueError('Expected a JSON array')
+    pos += 1
+    if peek() == ']':
+        return
+    while True:
+        if not peek():
+            raise ValueError('Unexpected end of JSON array')
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                if not more():
+                    raise ValueError(f'Invalid JSON: {e}') from e
+                continue
+            # A number may have been cut at the chunk boundary ('3.' + '5'): only trust
+            # the value once what follows it is in the buffer and is a separator
+            if not eof:
+                following = NON_SPACE.search(buffer, end)
+                cut = following is None or (isinstance(value, (int, float)) and buffer[following.start()] not in ',]')
+                if cut and more():
+                    continue
+            break
+        pos = end
+        yield value
+        separator = peek()
+        if separator == ',':
+            pos += 1
+        elif separator == ']':
+            return
+        else:
+            raise ValueError('Malformed JSON array')
+
+
+def read_records(f, fmt):
+    """Yield ``(line_or_index, record)`` pairs from a CSV, JSON array or JSON Lines file"""
+    if fmt == 'csv':
+        reader = csv.DictReader(f)
+        for record in reader:
+            yield reader.line_num, record
+    elif fmt == 'jsonl':
+        for number, line in enumerate(f, 1):
+            if line.strip():
+                yield number, json.loads(line)
+    else:
+        yield from enumerate(iter_json_array(f), 1)
+
+
+def write_records(f, fmt, records, fields=EXPORT_FIELDS):
+    """Write dict records one at a time; returns how many were written"""
+    count = 0
+    if fmt == 'csv':
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        for count, record in enumerate(records, 1):
+            writer.writerow(record)
+    elif fmt == 'jsonl':
+        for count, record in enumerate(records, 1):
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    else:
+        f.write('[')
+        for count, record in enumerate(records, 1):
+            f.write(('\n' if count == 1 else ',\n') + json.dumps(record, ensure_ascii=False))
+        f.write('\n]\n')
+    return count
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _number(record, field, cast, required=False, minimum=0):
+    value = record.get(field)
+    if _blank(value):
+        if required:
+            raise ValueError(f'{field} is required')
+        return None
+    try:
+        value = cast(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{field} must be a number') from None
+    if value < minimum:
+        raise ValueError(f'{field} must be at least {minimum}')
+    return value
+
+
+def _boolean(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'y')
+
+
+class ImportReport:
+    def __init__(self, max_errors=50):
+        self.max_errors = max_errors
+        self.read = 0
+        self.inserted = 0
+        self.updated = 0
+        self.categories_created = 0
+        self.errors = []
+        self.error_count = 0
+        self.started = time.perf_counter()
+
+    def error(self, line, message, rows=1):
+        self.error_count += rows
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line, message))
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rate(self):
+        return self.read / self.elapsed if self.elapsed else 0.0
+
+
+class ProductImporter:
+    """Validate and upsert product records in batches with executemany.
+
+    Records with an existing ``id`` update only the fields they carry;
+    other records are inserted. Categories come from ``category_id`` or a
+    ``category`` name in any language.
+    """
+
+    def __init__(self, db, product_model, category_model, batch_size=1000, create_categories=True):
+        self.db = db
+        self.products = product_model.__table__
+        self.categories = category_model.__table__
+        self.batch_size = batch_size
+        self.create_categories = create_categories
+        self._category_ids = {}
+        self._known_category_ids = set()
+        self._new_categories = []  # created in the current batch's transaction
+
+    def _load_categories(self, connection):
+        self._category_ids = {}
+        self._known_category_ids = set()
+        rows = connection.execute(select(self.categories.c.id, self.categories.c.name_en,
+                                         self.categories.c.name_fr, self.categories.c.name_ar))
+        for row in rows:
+            self._known_category_ids.add(row.id)
+            for name in (row.name_en, row.name_fr, row.name_ar):
+                if name:
+                    self._category_ids.setdefault(normalize(name), row.id)
+
+    def _category_id(self, connection, record, report):
+        if not _blank(record.get('category_id')):
+            category_id = _number(record, 'category_id', int, minimum=1)
+            if category_id not in self._known_category_ids:
+                raise ValueError(f'Unknown category id {category_id}')
+            return category_id
+        name = record.get('category')
+        if _blank(name):
+            return None
+        key = normalize(name)
+        if key not in self._category_ids:
+            if not self.create_categories:
+                raise ValueError(f'Unknown category {name!r}')
+            result = connection.execute(self.categories.insert().values(name_en=name.strip()))
+            category_id = result.inserted_primary_key[0]
+            self._category_ids[key] = category_id
+            self._known_category_ids.add(category_id)
+            self._new_categories.append((key, category_id))
+        return self._category_ids[key]
+
+    def _forget_new_categories(self):
+        """Categories created by a rolled-back batch no longer exist"""
+        for key, category_id in self._new_categories:
+            self._category_ids.pop(key, None)
+            self._known_category_ids.discard(category_id)
+        self._new_categories = []
+
+    def validate(self, connection, record, report):
+        """Map one raw record to product column values, or raise ValueError"""
+        if not isinstance(record, dict):
+            raise ValueError('Record must be an object')
+        record = {ALIASES.get(key, key): value for key, value in record.items()}
+        values = {}
+        product_id = _number(record, 'id', int, minimum=1)
+        if product_id is not None:
+            values['id'] = product_id
+        for field in TEXT_FIELDS:
+            if field in record:
+                values[field] = None if _blank(record[field]) else str(record[field]).strip()
+        if product_id is None and not values.get('name_en'):
+            raise ValueError('name_en is required')
+        if 'name_en' in values and not values['name_en']:
+            raise ValueError('name_en cannot be blank')
+        if 'price' in record or product_id is None:
+            values['price'] = _number(record, 'price', float, required=True)
+        for field, cast in (('original_price', float), ('discount', int), ('stock', int)):
+            if field in record:
+                values[field] = _number(record, field, cast)
+        if 'discount' in values and values['discount'] is not None and values['discount'] > 100:
+            raise ValueError('discount must be at most 100')
+        if 'is_active' in record:
+            values['is_active'] = _boolean(record['is_active'])
+        if 'category' in record or 'category_id' in record:
+            values['category_id'] = self._category_id(connection, record, report)
+        return values
+
+    @staticmethod
+    def _executemany(connection, statement_for, rows):
+        """executemany needs the same columns in every row of a statement"""
+        groups = {}
+        for row in rows:
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+        for fields, group in groups.items():
+            connection.execute(statement_for(fields), group)
+
+    @staticmethod
+    def _merge_duplicate_ids(rows):
+        """Fold repeated ids into one row, later fields winning, as if written one after another"""
+        merged, positions = [], {}
+        for line, values in rows:
+            position = positions.get(values.get('id'))
+            if position is None:
+                if 'id' in values:
+                    positions[values['id']] = len(merged)
+                merged.append((line, values))
+            else:
+                merged[position] = (line, {**merged[position][1], **values})
+        return merged
+
+    def _write_batch(self, connection, rows, report):
+        """Write validated rows; returns the (inserted, updated) counts"""
+        rows = self._merge_duplicate_ids(rows)
+        ids = [values['id'] for line, values in rows if 'id' in values]
+        existing = set()
+        if ids:
+            existing = set(connection.execute(
+                select(self.products.c.id).where(self.products.c.id.in_(ids))).scalars())
+
+        inserts, updates = [], []
+        for line, values in rows:
+            if values.get('id') in existing:
+                updates.append({**values, '_id': values['id']})
+            elif not values.get('name_en') or values.get('price') is None:
+                report.error(line, f"product {values['id']} does not exist; name_en and price are required")
+            else:
+                values.setdefault('stock', 0)
+                values.setdefault('is_active', True)
+                inserts.append(values)
+
+        if updates:
+            self._executemany(connection, lambda fields: (
+                self.products.update()
+                .where(self.products.c.id == bindparam('_id'))
+                .values({field: bindparam(field) for field in fields if field not in ('id', '_id')})
+            ), updates)
+        if inserts:
+            self._executemany(connection, lambda fields: self.products.insert(), inserts)
+        return len(inserts), len(updates)
+
+    def run(self, records, dry_run=False, report=None):
+        """Import ``(line, record)`` pairs; each batch commits on its own.
+
+        Counts in the report only include batches that committed (or, in a
+        dry run, would have), so a caller can refresh caches from them even
+        if a later batch raised.
+        """
+        report = report or ImportReport()
+        would_create = set()
+        with self.db.engine.connect() as connection:
+            self._load_categories(connection)
+            connection.rollback()
+            for batch in chunked(records, self.batch_size):
+                rows = []
+                self._new_categories = []
+                try:
+                    with connection.begin() as transaction:
+                        for line, record in batch:
+                            report.read += 1
+                            try:
+                                rows.append((line, self.validate(connection, record, report)))
+                            except ValueError as e:
+                                report.error(line, str(e))
+                        inserted, updated = self._write_batch(connection, rows, report) if rows else (0, 0)
+                        if dry_run:
+                            transaction.rollback()
+                except IntegrityError as e:
+                    self._forget_new_categories()
+                    report.error(f'{batch[0][0]}-{batch[-1][0]}', f'batch rolled back: {e.orig}', rows=len(rows))
+                    continue
+                except Exception:
+                    self._forget_new_categories()
+                    raise
+                if dry_run:
+                    would_create.update(key for key, category_id in self._new_categories)
+                    report.categories_created = len(would_create)
+                    self._forget_new_categories()
+                else:
+                    report.categories_created += len(self._new_categories)
+                report.inserted += inserted
+                report.updated += updated
+        return report
+
+
+def export_products(db, product_model, category_model, batch_size=1000):
+    """Yield products as export records, streamed from the database"""
+    products = product_model.__table__
+    categories = category_model.__table__
+    query = (
+        select(products, categories.c.name_en.label('category'))
+        .select_from(products.outerjoin(categories, products.c.category_id == categories.c.id))
+        .order_by(products.c.id)
+    )
+    with db.engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=batch_size).execute(query)
+        for row in result.mappings():
+            yield {field: row[field] for field in EXPORT_FIELDS}
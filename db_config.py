@@ -0,0 +1,82 @@
+# Database engine configuration
+import os
+import sqlite3
+
+from sqlalchemy import event
+
+DEFAULT_DATABASE_URI = 'sqlite:///party_yacout.db'
+
+
+def env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def configure_database(app):
+    """Set the database URI, pool sizing and SQLite pragmas from the environment"""
+    config = app.config
+    config.setdefault('SQLALCHEMY_DATABASE_URI', os.getenv('SQLALCHEMY_DATABASE_URI',
+                                                           os.getenv('DATABASE_URL', DEFAULT_DATABASE_URI)))
+
+    # WAL lets catalog reads run while a checkout is writing; NORMAL is still
+    # crash-safe in WAL mode and avoids an fsync per commit.
+    config.setdefault('SQLITE_JOURNAL_MODE', os.getenv('SQLITE_JOURNAL_MODE', 'WAL'))
+    config.setdefault('SQLITE_SYNCHRONOUS', os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'))
+    config.setdefault('SQLITE_BUSY_TIMEOUT_MS', env_int('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    config.setdefault('SQLITE_CACHE_SIZE_KB', env_int('SQLITE_CACHE_SIZE_KB', 20000))
+    config.setdefault('SQLITE_MMAP_SIZE', env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+
+    # One pool per gunicorn worker: size it to the worker's threads
+    config.setdefault('DB_POOL_SIZE', env_int('DB_POOL_SIZE', 5))
+    config.setdefault('DB_MAX_OVERFLOW', env_int('DB_MAX_OVERFLOW', 10))
+    config.setdefault('DB_POOL_TIMEOUT', env_int('DB_POOL_TIMEOUT', 10))
+    config.setdefault('DB_POOL_RECYCLE', env_int('DB_POOL_RECYCLE', 3600))
+
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    if not is_memory_database(uri):
+        options.setdefault('pool_size', config['DB_POOL_SIZE'])
+        options.setdefault('max_overflow', config['DB_MAX_OVERFLOW'])
+        options.setdefault('pool_timeout', config['DB_POOL_TIMEOUT'])
+    if not uri.startswith('sqlite'):
+        # A local SQLite file has no server to drop idle connections; elsewhere ping and recycle
+        options.setdefault('pool_recycle', config['DB_POOL_RECYCLE'])
+        options.setdefault('pool_pre_ping', True)
+    if uri.startswith('sqlite'):
+        connect_args = dict(options.get('connect_args', {}))
+        connect_args.setdefault('timeout', config['SQLITE_BUSY_TIMEOUT_MS'] / 1000)
+        options['connect_args'] = connect_args
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+def is_memory_database(uri):
+    return uri in ('sqlite://', 'sqlite:///:memory:') or 'mode=memory' in uri
+
+
+def sqlite_pragmas(config):
+    return [
+        f"PRAGMA journal_mode={config['SQLITE_JOURNAL_MODE']}",
+        f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT_MS'])}",
+        f"PRAGMA cache_size=-{int(config['SQLITE_CACHE_SIZE_KB'])}",
+        f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}",
+    ]
+
+
+def install_sqlite_pragmas(engine, config):
+    """Apply the SQLite pragmas to every new connection of an engine"""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = sqlite_pragmas(config)
+    if is_memory_database(str(engine.url)):
+        pragmas = [p for p in pragmas if not p.startswith('PRAGMA journal_mode')]
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        if not isinstance(dbapi_connection, sqlite3.Connection):
+            return
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
@@ -0,0 +1,60 @@
+# Rendered template fragment cache
+import threading
+from collections import OrderedDict
+
+from markupsafe import Markup
+
+
+class FragmentCache:
+    """LRU of rendered HTML fragments bounded by total size in bytes.
+
+    Keys should include everything the fragment depends on (for product
+    cards: product id, product version, locale and layout), so an edited
+    product simply stops matching its old entries, which age out.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._fragments = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.max_bytes = app.config.setdefault('FRAGMENT_CACHE_MAX_BYTES', self.max_bytes)
+        self.clear()
+
+    def __len__(self):
+        return len(self._fragments)
+
+    def get_or_render(self, key, render):
+        with self._lock:
+            fragment = self._fragments.get(key)
+            if fragment is not None:
+                self._fragments.move_to_end(key)
+                self.hits += 1
+                return fragment
+            self.misses += 1
+
+        fragment = Markup(render())
+        size = len(fragment.encode('utf-8'))
+        with self._lock:
+            if key not in self._fragments:
+                self._fragments[key] = fragment
+                self._bytes += size
+                while self._bytes > self.max_bytes and self._fragments:
+                    _, evicted = self._fragments.popitem(last=False)
+                    self._bytes -= len(evicted.encode('utf-8'))
+        return fragment
+
+    def invalidate(self, predicate):
+        """Drop every fragment whose key matches ``predicate``"""
+        with self._lock:
+            for key in [key for key in self._fragments if predicate(key)]:
+                self._bytes -= len(self._fragments.pop(key).encode('utf-8'))
+
+    def clear(self):
+        with self._lock:
+            self._fragments.clear()
+            self._bytes = 0
@@ -0,0 +1,104 @@
+# Conditional GET and optional full-page caching for catalog pages
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, make_response, session
+
+
+class HTTPCache:
+    """ETag/304 handling for views whose output depends only on the catalog.
+
+    ``version_func`` returns a digest of the catalog as loaded.
+    ``variant_func`` returns a string describing everything else that
+    changes the page for this visitor (locale, user, cart), ``None`` when
+    the page must not be cached, and reports whether the visitor is
+    anonymous.
+    """
+
+    def __init__(self, version_func, variant_func, max_age=60, page_cache=False, max_bytes=32 * 1024 * 1024):
+        self.version_func = version_func
+        self.variant_func = variant_func
+        self.max_age = max_age
+        self.page_cache = page_cache
+        self.max_bytes = max_bytes
+        self._pages = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_age = app.config.setdefault('HTTP_CACHE_MAX_AGE', self.max_age)
+        self.page_cache = app.config.setdefault('PAGE_CACHE_ENABLED', self.page_cache)
+        self.max_bytes = app.config.setdefault('PAGE_CACHE_MAX_BYTES', self.max_bytes)
+        self.clear()
+
+    def etag_for(self, variant):
+        key = f'{self.version_func()}|{variant}|{request.full_path}'
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+
+    def _headers(self, response, etag, anonymous):
+        response.set_etag(etag)
+        if anonymous:
+            response.headers['Cache-Control'] = f'public, max-age=0, s-maxage={self.max_age}, must-revalidate'
+        else:
+            response.headers['Cache-Control'] = 'private, no-cache'
+        response.vary.update(('Accept-Language', 'Cookie'))
+        return response
+
+    def _get_page(self, key):
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+            return page
+
+    def _store_page(self, key, response):
+        body = response.get_data()
+        size = len(body)
+        if size > self.max_bytes // 4:
+            return
+        with self._lock:
+            old = self._pages.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[0])
+            self._pages[key] = (body, response.headers.get('Content-Type'))
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._pages:
+                _, (evicted, _) = self._pages.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+            self._bytes = 0
+
+    def cached(self, view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(*args, **kwargs)
+            variant, anonymous = self.variant_func()
+            if variant is None:
+                return view(*args, **kwargs)
+
+            etag = self.etag_for(variant)
+            # If-None-Match uses the weak comparison (RFC 9110 13.1.2), so W/"..." from gzip or a CDN matches
+            if request.if_none_match.contains_weak(etag):
+                return self._headers(make_response('', 304), etag, anonymous)
+
+            use_page_cache = self.page_cache and anonymous
+            if use_page_cache:
+                page = self._get_page(etag)
+                if page is not None:
+                    body, content_type = page
+                    return self._headers(make_response(body, 200, {'Content-Type': content_type}), etag, anonymous)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            self._headers(response, etag, anonymous)
+            if use_page_cache and not session.modified:
+                self._store_page(etag, response)
+            return response
+        return wrapper
@@ -0,0 +1,104 @@
+# In-process cache of the logged-in user's identity
+import os
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain
+
+from flask_login import UserMixin
+from sqlalchemy import event
+
+from catalog_cache import VersionFile
+
+IDENTITY_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name', 'phone', 'address', 'is_admin')
+_MISSING = object()
+
+
+class Identity(UserMixin):
+    """Detached, read-only copy of the user fields requests and templates read"""
+
+    def __init__(self, row, fields=IDENTITY_FIELDS):
+        for name in fields:
+            setattr(self, name, getattr(row, name))
+
+    def __repr__(self):
+        return f'<Identity {self.id}>'
+
+
+class IdentityCache:
+    """TTL/LRU cache of ``Identity`` objects keyed by user id.
+
+    ``invalidate`` drops users in this process and bumps a version file,
+    which empties the cache in every other worker on its next lookup.
+    ``watch`` calls it after any commit that changed or deleted a user, and
+    the TTL bounds staleness for changes made outside the ORM.
+    """
+
+    def __init__(self, loader, version_file=None, ttl=300, max_entries=10000):
+        self.loader = loader
+        self.version_file = VersionFile(version_file or '')
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._version = None
+
+    def init_app(self, app):
+        self.version_file = VersionFile(os.path.join(app.instance_path, 'identity.version'))
+        self.ttl = app.config.setdefault('IDENTITY_CACHE_TTL', self.ttl)
+        self.max_entries = app.config.setdefault('IDENTITY_CACHE_MAX_ENTRIES', self.max_entries)
+        self.clear()
+
+    def get(self, user_id):
+        """Identity for a user id, or None if there is no such user"""
+        version = self.version_file.read()
+        now = time.monotonic()
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            entry = self._entries.get(user_id, _MISSING)
+            if entry is not _MISSING and now - entry[1] < self.ttl:
+                self._entries.move_to_end(user_id)
+                return entry[0]
+
+        identity = self.loader(user_id)
+        with self._lock:
+            if self._version == version:
+                self._entries[user_id] = (identity, now)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return identity
+
+    def invalidate(self, user_ids=None):
+        """Forget some users (or all of them) here and in every other worker"""
+        with self._lock:
+            if user_ids is None:
+                self._entries.clear()
+            else:
+                for user_id in user_ids:
+                    self._entries.pop(user_id, None)
+        self.version_file.bump()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def watch(self, session, user_model):
+        """Invalidate users changed or deleted through ``session``, once the change commits"""
+        @event.listens_for(session, 'after_flush')
+        def collect_changed_users(session, flush_context):
+            changed = {obj.id for obj in chain(session.dirty, session.deleted) if isinstance(obj, user_model)}
+            if changed:
+                session.info.setdefault('changed_user_ids', set()).update(changed)
+
+        @event.listens_for(session, 'after_commit')
+        def invalidate_changed_users(session):
+            changed = session.info.pop('changed_user_ids', None)
+            if changed:
+                self.invalidate(changed)
+
+        @event.listens_for(session, 'after_rollback')
+        def forget_changed_users(session):
+            session.info.pop('changed_user_ids', None)
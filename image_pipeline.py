@@ -0,0 +1,160 @@
+# Product image ingestion and responsive thumbnails
+import hashlib
+import os
+import threading
+import urllib.request
+
+SIGNATURES = (
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+SAVE_OPTIONS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+
+class ImageError(ValueError):
+    pass
+
+
+def pillow():
+    """``(Image, ImageOps)``, or None without Pillow (then only the original is stored).
+
+    Imported on first use rather than at startup, which Pillow would slow down.
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return None
+    return Image, ImageOps
+
+
+def sniff_extension(data):
+    """File extension for supported image bytes, judged by content rather than name"""
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'webp'
+    for signature, extension in SIGNATURES:
+        if data.startswith(signature):
+            return extension
+    return None
+
+
+def _render_variant(source_path, target_path, width, image_format):
+    """Runs in a worker process: resize one source into one width/format"""
+    Image, ImageOps = pillow()
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.width > width:
+            image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        if image_format == 'jpeg' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        tmp_path = f'{target_path}.{os.getpid()}.tmp'
+        image.save(tmp_path, **SAVE_OPTIONS[image_format])
+        os.replace(tmp_path, target_path)
+        return image.width, image.height
+
+
+class ImagePipeline:
+    """Store each source image once (content-addressed) and derive fixed-width variants.
+
+    Files live under ``static_folder/subdir`` so they are served like any
+    other static file; paths returned are relative to the static folder.
+    """
+
+    def __init__(self, static_folder=None, subdir='uploads/products', widths=(200, 400, 800),
+                 formats=('webp', 'jpeg'), max_bytes=10 * 1024 * 1024, timeout=10, max_workers=None):
+        self.static_folder = static_folder
+        self.subdir = subdir
+        self.widths = tuple(sorted(widths))
+        self.formats = formats
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.static_folder = app.static_folder
+        self.widths = tuple(sorted(app.config.setdefault('PRODUCT_IMAGE_WIDTHS', list(self.widths))))
+        self.max_bytes = app.config.setdefault('PRODUCT_IMAGE_MAX_BYTES', self.max_bytes)
+        self.timeout = app.config.setdefault('PRODUCT_IMAGE_FETCH_TIMEOUT', self.timeout)
+        self.max_workers = app.config.setdefault('PRODUCT_IMAGE_WORKERS', self.max_workers)
+
+    def _pool_executor(self):
+        with self._lock:
+            if self._pool is None:
+                from concurrent.futures import ProcessPoolExecutor
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._pool
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def fetch(self, url):
+        if not url.startswith(('http://', 'https://')):
+            raise ImageError('Only http(s) image URLs can be fetched')
+        request = urllib.request.Request(url, headers={'User-Agent': 'PartyYacout image fetcher'})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                data = response.read(self.max_bytes + 1)
+        except OSError as e:
+            raise ImageError(f'Could not fetch image: {e}') from e
+        return data
+
+    def store(self, data):
+        """Save the source bytes and return their path relative to the static folder"""
+        if len(data) > self.max_bytes:
+            raise ImageError('Image is too large')
+        extension = sniff_extension(data)
+        if extension is None:
+            raise ImageError('Unsupported image type')
+        digest = hashlib.sha256(data).hexdigest()[:20]
+        relative = f'{self.subdir}/{digest}/original.{extension}'
+        path = os.path.join(self.static_folder, relative)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return relative
+
+    def generate(self, source):
+        """Render every width/format of a stored source in the process pool.
+
+        Returns ``[{'width', 'height', 'format', 'path'}]``; widths wider than
+        the source are skipped (the source width is used once instead).
+        """
+        modules = pillow()
+        if modules is None:
+            return []
+        Image, ImageOps = modules
+        source_path = os.path.join(self.static_folder, source)
+        with Image.open(source_path) as image:
+            source_width = ImageOps.exif_transpose(image).width
+        widths = [width for width in self.widths if width < source_width] or [source_width]
+        if widths[-1] != source_width and len(widths) < len(self.widths):
+            widths.append(source_width)
+
+        directory = os.path.dirname(source)
+        jobs = []
+        pool = self._pool_executor()
+        for width in widths:
+            for image_format in self.formats:
+                relative = f'{directory}/{width}w.{EXTENSIONS[image_format]}'
+                target_path = os.path.join(self.static_folder, relative)
+                future = pool.submit(_render_variant, source_path, target_path, width, image_format)
+                jobs.append((future, image_format, relative))
+
+        variants = []
+        for future, image_format, relative in jobs:
+            width, height = future.result()
+            variants.append({'width': width, 'height': height, 'format': image_format, 'path': relative})
+        return variants
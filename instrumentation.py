@@ -0,0 +1,231 @@
+# Per-request timings (SQL, templates, locale) and Prometheus histograms
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from flask import before_render_template, request, template_rendered
+from sqlalchemy import event
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+UNMATCHED = '<unmatched>'
+
+logger = logging.getLogger(__name__)
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    __slots__ = ('started', 'sql_started', 'sql_count', 'sql', 'sql_in_templates',
+                 'template_count', 'template_depth', 'template_started', 'template', 'phases')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_started = 0.0
+        self.sql_count = 0
+        self.sql = 0.0
+        self.sql_in_templates = 0.0
+        self.template_count = 0
+        self.template_depth = 0
+        self.template_started = 0.0
+        self.template = 0.0
+        self.phases = {}
+
+    @property
+    def template_only(self):
+        """Rendering time without the queries that ran while rendering"""
+        return max(self.template - self.sql_in_templates, 0.0)
+
+
+def record_phase(name, seconds):
+    """Add time spent in a named phase (e.g. locale) to the current request, if any"""
+    timings = _current.get()
+    if timings is not None:
+        timings.phases[name] = timings.phases.get(name, 0.0) + seconds
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    return ','.join(f'{name}="{_label_value(value)}"' for name, value in pairs)
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Instrumentation:
+    """Time each request's SQL, template rendering and named phases.
+
+    Results go to a ``Server-Timing`` header, a JSON log line (INFO, or
+    WARNING past ``slow_request_ms``) and per-endpoint histograms rendered
+    in the Prometheus text format by ``render_metrics``. The per-statement
+    and per-template work is a couple of ``perf_counter`` calls; histograms
+    are per process, so each worker reports its own.
+    """
+
+    HISTOGRAMS = {
+        'http_request_duration_seconds': ('Time spent handling the request.', DURATION_BUCKETS),
+        'http_request_sql_queries': ('SQL statements executed per request.', QUERY_BUCKETS),
+        'http_request_sql_duration_seconds': ('Time spent in SQL per request.', DURATION_BUCKETS),
+        'http_request_template_duration_seconds': ('Time spent rendering templates per request, '
+                                                   'excluding SQL.', DURATION_BUCKETS),
+    }
+
+    def __init__(self, app, engine, server_timing=True, slow_request_ms=500):
+        self.server_timing = server_timing
+        self.slow_request_ms = slow_request_ms
+        self._histograms = {name: {} for name in self.HISTOGRAMS}
+        self._requests = {}
+        self._lock = threading.Lock()
+        app.extensions['instrumentation'] = self
+
+        event.listen(engine, 'before_cursor_execute', self._before_cursor)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor)
+        before_render_template.connect(self._before_template, app, weak=False)
+        template_rendered.connect(self._after_template, app, weak=False)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._teardown)
+
+    # Collection
+    @staticmethod
+    def _before_cursor(conn, cursor, statement, parameters, context, executemany):
+        timings = _current.get()
+        if timings is not None:
+            timings.sql_started = time.perf_counter()
+
+    @staticmethod
+    def _after_cursor(conn, cursor, statement, parameters, context, executemany):
+        timings = _current.get()
+        if timings is not None:
+            elapsed = time.perf_counter() - timings.sql_started
+            timings.sql_count += 1
+            timings.sql += elapsed
+            if timings.template_depth:
+                timings.sql_in_templates += elapsed
+
+    @staticmethod
+    def _before_template(sender, template, context, **extra):
+        timings = _current.get()
+        if timings is not None:
+            # Fragments rendered inside a page are counted but not timed twice
+            if not timings.template_depth:
+                timings.template_started = time.perf_counter()
+            timings.template_depth += 1
+            timings.template_count += 1
+
+    @staticmethod
+    def _after_template(sender, template, context, **extra):
+        timings = _current.get()
+        if timings is not None and timings.template_depth:
+            timings.template_depth -= 1
+            if not timings.template_depth:
+                timings.template += time.perf_counter() - timings.template_started
+
+    def _start(self):
+        request.environ['instrumentation.token'] = _current.set(RequestTimings())
+
+    def _teardown(self, exc=None):
+        token = request.environ.pop('instrumentation.token', None)
+        if token is not None:
+            _current.reset(token)
+
+    def _finish(self, response):
+        timings = _current.get()
+        if timings is None:
+            return response
+        total = time.perf_counter() - timings.started
+        endpoint = request.endpoint or UNMATCHED
+        if self.server_timing:
+            response.headers['Server-Timing'] = self.server_timing_header(timings, total)
+        self.observe(endpoint, request.method, response.status_code, timings, total)
+        self.log(endpoint, response.status_code, timings, total)
+        return response
+
+    # Reporting
+    @staticmethod
+    def server_timing_header(timings, total):
+        parts = [
+            f'app;dur={total * 1000:.2f}',
+            f'db;dur={timings.sql * 1000:.2f};desc="{timings.sql_count} queries"',
+            f'tpl;dur={timings.template_only * 1000:.2f};desc="{timings.template_count} templates"',
+        ]
+        parts.extend(f'{name};dur={seconds * 1000:.2f}' for name, seconds in timings.phases.items())
+        return ', '.join(parts)
+
+    def observe(self, endpoint, method, status, timings, total):
+        labels = (('endpoint', endpoint), ('method', method))
+        values = {
+            'http_request_duration_seconds': total,
+            'http_request_sql_queries': timings.sql_count,
+            'http_request_sql_duration_seconds': timings.sql,
+            'http_request_template_duration_seconds': timings.template_only,
+        }
+        with self._lock:
+            for name, value in values.items():
+                histogram = self._histograms[name].get(labels)
+                if histogram is None:
+                    histogram = self._histograms[name][labels] = Histogram(self.HISTOGRAMS[name][1])
+                histogram.observe(value)
+            key = labels + (('status', status),)
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+    def log(self, endpoint, status, timings, total):
+        total_ms = total * 1000
+        level = logging.WARNING if total_ms >= self.slow_request_ms else logging.INFO
+        if not logger.isEnabledFor(level):
+            return
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'endpoint': endpoint,
+            'status': status,
+            'duration_ms': round(total_ms, 2),
+            'sql_queries': timings.sql_count,
+            'sql_ms': round(timings.sql * 1000, 2),
+            'templates': timings.template_count,
+            'template_ms': round(timings.template_only * 1000, 2),
+        }
+        record.update({f'{name}_ms': round(seconds * 1000, 3) for name, seconds in timings.phases.items()})
+        logger.log(level, json.dumps(record))
+
+    def render_metrics(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            histograms = {name: {labels: (list(h.counts), h.sum) for labels, h in series.items()}
+                          for name, series in self._histograms.items()}
+            requests = dict(self._requests)
+
+        lines = ['# HELP http_requests_total Requests handled, by endpoint, method and status.',
+                 '# TYPE http_requests_total counter']
+        lines.extend(f'http_requests_total{{{_labels(labels)}}} {count}'
+                     for labels, count in sorted(requests.items()))
+        for name, (help_text, buckets) in self.HISTOGRAMS.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for labels, (counts, total) in sorted(histograms[name].items()):
+                cumulative = 0
+                for bound, count in zip(buckets + ('+Inf',), counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{_labels(labels + (("le", _number(bound)),))}}} {cumulative}')
+                lines.append(f'{name}_sum{{{_labels(labels)}}} {_number(total)}')
+                lines.append(f'{name}_count{{{_labels(labels)}}} {cumulative}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,189 @@
+# Background job queue backed by a database table
+import json
+import logging
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """Durable job queue.
+
+    Jobs are rows in the ``Job`` table, so they can be enqueued in the same
+    transaction as the order that produced them and survive restarts.
+    ``mode`` decides who runs them:
+
+    - ``thread``: an in-process thread pool drains the queue after each commit,
+      and a timer wakes it again when a retried job comes due
+    - ``worker``: a separate ``flask run-jobs`` process polls the table
+    - ``inline``: run immediately in the request (tests and debugging)
+    """
+
+    def __init__(self, db, model, app=None):
+        self.db = db
+        self.model = model
+        self.handlers = {}
+        self.app = None
+        self._executor = None
+        self._lock = threading.Lock()
+        self._timer = None
+        self._timer_due = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('JOB_QUEUE_MODE', 'thread')
+        app.config.setdefault('JOB_THREADS', 2)
+        app.config.setdefault('JOB_MAX_ATTEMPTS', 5)
+        app.config.setdefault('JOB_RETRY_BASE_DELAY', 30)
+        app.config.setdefault('JOB_RETRY_MAX_DELAY', 3600)
+        app.config.setdefault('JOB_LOCK_TIMEOUT', 600)
+        self.app = app
+
+    @property
+    def mode(self):
+        return self.app.config['JOB_QUEUE_MODE']
+
+    def task(self, name):
+        """Register a handler for jobs called ``name``"""
+        def decorator(func):
+            self.handlers[name] = func
+            return func
+        return decorator
+
+    def enqueue(self, name, payload=None, delay=0):
+        """Add a job to the current session; it is committed with the caller's transaction"""
+        if name not in self.handlers:
+            raise KeyError(f'Unknown job: {name}')
+        job = self.model(
+            name=name,
+            payload=json.dumps(payload or {}),
+            status='pending',
+            attempts=0,
+            max_attempts=self.app.config['JOB_MAX_ATTEMPTS'],
+            run_at=datetime.utcnow() + timedelta(seconds=delay)
+        )
+        self.db.session.add(job)
+        return job
+
+    def kick(self):
+        """Start running committed jobs according to the queue mode"""
+        if self.mode == 'inline':
+            self.run_pending()
+        elif self.mode == 'thread':
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.app.config['JOB_THREADS'],
+                                                    thread_name_prefix='jobs')
+            self._executor.submit(self._drain_in_app_context)
+
+    def _drain_in_app_context(self):
+        try:
+            with self.app.app_context():
+                self.run_pending()
+                next_run = self.next_run_at()
+        except Exception:
+            logger.exception('Job queue drain failed')
+            return
+        if next_run is not None:
+            self._wake_at(next_run)
+
+    def next_run_at(self):
+        """When the earliest pending job is due, or None if nothing is pending"""
+        Job = self.model
+        run_at = self.db.session.query(func.min(Job.run_at)).filter(Job.status == 'pending').scalar()
+        self.db.session.commit()
+        return run_at
+
+    def _wake_at(self, run_at):
+        """Drain again at ``run_at`` unless a drain is already scheduled earlier"""
+        with self._lock:
+            if self._timer is not None:
+                if self._timer_due <= run_at:
+                    return
+                self._timer.cancel()
+            delay = max((run_at - datetime.utcnow()).total_seconds(), 0)
+            self._timer = threading.Timer(delay, self._wake)
+            self._timer.daemon = True
+            self._timer_due = run_at
+            self._timer.start()
+
+    def _wake(self):
+        with self._lock:
+            self._timer = None
+            self._timer_due = None
+        self.kick()
+
+    def claim(self):
+        """Atomically mark the next due job as running and return it"""
+        Job = self.model
+        session = self.db.session
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=self.app.config['JOB_LOCK_TIMEOUT'])
+        while True:
+            job_id = session.query(Job.id).filter(
+                ((Job.status == 'pending') & (Job.run_at <= now)) |
+                ((Job.status == 'running') & (Job.locked_at < stale))
+            ).order_by(Job.run_at, Job.id).limit(1).scalar()
+            if job_id is None:
+                session.commit()
+                return None
+            # Conditional update: if another worker got there first, nothing matches
+            claimed = session.query(Job).filter(
+                Job.id == job_id,
+                ((Job.status == 'pending') | ((Job.status == 'running') & (Job.locked_at < stale)))
+            ).update({'status': 'running', 'locked_at': now, 'attempts': Job.attempts + 1},
+                     synchronize_session=False)
+            session.commit()
+            if claimed:
+                return session.get(Job, job_id)
+
+    def run_job(self, job):
+        session = self.db.session
+        try:
+            self.handlers[job.name](**json.loads(job.payload or '{}'))
+        except Exception as e:
+            session.rollback()
+            job = session.get(self.model, job.id)
+            job.last_error = ''.join(traceback.format_exception_only(type(e), e)).strip()[:1000]
+            if job.attempts >= job.max_attempts:
+                job.status = 'failed'
+                logger.error('Job %s (%s) failed permanently: %s', job.id, job.name, job.last_error)
+            else:
+                delay = min(self.app.config['JOB_RETRY_BASE_DELAY'] * 2 ** (job.attempts - 1),
+                            self.app.config['JOB_RETRY_MAX_DELAY'])
+                job.status = 'pending'
+                job.run_at = datetime.utcnow() + timedelta(seconds=delay)
+            job.locked_at = None
+            session.commit()
+            return False
+        job.status = 'done'
+        job.locked_at = None
+        job.last_error = None
+        session.commit()
+        return True
+
+    def run_pending(self, limit=None):
+        """Run due jobs until the queue is empty or ``limit`` jobs ran"""
+        ran = 0
+        while limit is None or ran < limit:
+            job = self.claim()
+            if job is None:
+                break
+            self.run_job(job)
+            ran += 1
+        return ran
+
+    def work(self, poll_interval=1.0, once=False):
+        """Worker process loop"""
+        while True:
+            ran = self.run_pending()
+            if once:
+                return ran
+            if not ran:
+                time.sleep(poll_interval)
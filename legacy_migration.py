@@ -0,0 +1,327 @@
+# One-shot migration of the JSON-file stores in data/ into the database
+import os
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+from catalog_io import chunked, iter_json_array
+from search_index import normalize
+
+LEGACY_ORDER_PREFIX = 'LEGACY'
+IMAGE_PREFIXES = ('http://', 'https://', '/static/')
+
+
+def parse_timestamp(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+def _text(value):
+    value = '' if value is None else str(value).strip()
+    return value or None
+
+
+def _image(value):
+    """An image the storefront can put in <img src>: an http(s) URL or a /static/ path"""
+    value = _text(value)
+    if value and value.lower().startswith(IMAGE_PREFIXES):
+        return value
+    return None
+
+
+class SourceReport:
+    def __init__(self, name):
+        self.name = name
+        self.read = 0
+        self.inserted = 0
+        self.existing = 0
+        self.conflicts = []
+
+    def conflict(self, legacy_id, message):
+        self.conflicts.append((legacy_id, message))
+
+
+class LegacyMigrator:
+    """Stream data/*.json into the models, keyed so that re-running is a no-op.
+
+    Natural keys decide what is already migrated: category names (any
+    language), product English names, user emails and ``LEGACY<id>``
+    order numbers. Legacy ids are never reused as primary keys; they are
+    mapped to the new ids so orders can find their users and products.
+    """
+
+    def __init__(self, db, user_model, category_model, product_model, order_model, order_item_model,
+                 data_dir, batch_size=500):
+        self.db = db
+        self.users = user_model.__table__
+        self.categories = category_model.__table__
+        self.products = product_model.__table__
+        self.orders = order_model.__table__
+        self.order_items = order_item_model.__table__
+        self.data_dir = data_dir
+        self.batch_size = batch_size
+        self.product_ids = {}
+        self.product_ids_by_name = {}
+        self.user_ids = {}
+        self.user_ids_by_email = {}
+
+    def _records(self, name):
+        path = os.path.join(self.data_dir, name)
+        if not os.path.exists(path):
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            yield from iter_json_array(f)
+
+    def run(self, dry_run=False):
+        reports = []
+        with self.db.engine.connect() as connection:
+            with connection.begin() as transaction:
+                reports.append(self.migrate_products(connection))
+                reports.append(self.migrate_users(connection))
+                reports.append(self.migrate_orders(connection))
+                reports.append(self.report_unmigrated('wishlist.json', 'no wishlist table; entries were not migrated'))
+                if dry_run:
+                    transaction.rollback()
+        return reports
+
+    # Products and categories
+    def _category_lookup(self, connection):
+        lookup = {}
+        rows = connection.execute(select(self.categories.c.id, self.categories.c.name_en,
+                                         self.categories.c.name_fr, self.categories.c.name_ar))
+        for row in rows:
+            for name in (row.name_en, row.name_fr, row.name_ar):
+                if name:
+                    lookup.setdefault(normalize(name), row.id)
+        return lookup
+
+    def _product_lookup(self, connection):
+        """Every product by normalized English name; SQLite's lower() only folds ASCII, so match in Python"""
+        lookup = {}
+        rows = connection.execution_options(yield_per=5000).execute(
+            select(self.products.c.id, self.products.c.name_en).order_by(self.products.c.id))
+        for row in rows:
+            lookup.setdefault(normalize(row.name_en), row.id)
+        return lookup
+
+    def migrate_products(self, connection):
+        report = SourceReport('products.json')
+        categories = self._category_lookup(connection)
+        existing = self._product_lookup(connection)
+        reviews = 0
+        for batch in chunked(self._records('products.json'), self.batch_size):
+            rows, pending, aliases = [], set(), []
+            for record in batch:
+                report.read += 1
+                if not isinstance(record, dict):
+                    report.conflict(None, 'not an object')
+                    continue
+                legacy_id, name = record.get('id'), _text(record.get('name'))
+                reviews += len(record.get('reviews') or ())
+                if not name or record.get('price') is None:
+                    report.conflict(legacy_id, 'missing name or price')
+                    continue
+                key = normalize(name)
+                if key in existing:
+                    self.product_ids[legacy_id] = self.product_ids_by_name[key] = existing[key]
+                    report.existing += 1
+                    continue
+                if key in pending:
+                    aliases.append((legacy_id, key))
+                    report.conflict(legacy_id, f'duplicate product name {name!r}; merged into the first one')
+                    continue
+                category_id = None
+                category = _text(record.get('category'))
+                if category:
+                    category_key = normalize(category)
+                    if category_key not in categories:
+                        result = connection.execute(self.categories.insert().values(name_en=category))
+                        categories[category_key] = result.inserted_primary_key[0]
+                    category_id = categories[category_key]
+                try:
+                    price = float(record['price'])
+                    stock = int(record.get('stock') or 0)
+                except (TypeError, ValueError):
+                    report.conflict(legacy_id, 'price or stock is not a number')
+                    continue
+                image = _image(record.get('image'))
+                if image is None and _text(record.get('image')):
+                    report.conflict(legacy_id, f"image {record['image']!r} is not a URL or static path; left empty")
+                rows.append({
+                    'name_en': name,
+                    'description_en': _text(record.get('description')),
+                    'price': price,
+                    'image': image,
+                    'stock': stock,
+                    'category_id': category_id,
+                    'is_active': True,
+                    '_legacy_id': legacy_id,
+                })
+                pending.add(key)
+            if rows:
+                legacy_ids = [row.pop('_legacy_id') for row in rows]
+                connection.execute(self.products.insert(), rows)
+                inserted = {
+                    normalize(row.name_en): row.id for row in connection.execute(
+                        select(self.products.c.id, self.products.c.name_en)
+                        .where(self.products.c.name_en.in_([row['name_en'] for row in rows])))
+                }
+                for legacy_id, row in zip(legacy_ids, rows):
+                    key = normalize(row['name_en'])
+                    self.product_ids[legacy_id] = self.product_ids_by_name[key] = existing[key] = inserted[key]
+                report.inserted += len(rows)
+            for legacy_id, key in aliases:
+                self.product_ids[legacy_id] = self.product_ids_by_name[key]
+        if reviews:
+            report.conflict(None, f'{reviews} product reviews skipped (no review table)')
+        return report
+
+    # Users
+    def _unique_username(self, connection, name, legacy_id, taken):
+        base = (_text(name) or f'user{legacy_id}')[:70]
+        candidate = base
+        if candidate.lower() in taken or connection.execute(
+                select(self.users.c.id).where(func.lower(self.users.c.username) == candidate.lower())).first():
+            candidate = f'{base}-{legacy_id}'
+        taken.add(candidate.lower())
+        return candidate
+
+    def migrate_users(self, connection):
+        report = SourceReport('users.json')
+        taken_usernames = set()
+        for batch in chunked(self._records('users.json'), self.batch_size):
+            emails = {(_text(r.get('email')) or '').lower() for r in batch if isinstance(r, dict)}
+            existing = {
+                row.email.lower(): row.id for row in connection.execute(
+                    select(self.users.c.id, self.users.c.email).where(func.lower(self.users.c.email).in_(emails)))
+            }
+            rows, aliases = [], []
+            for record in batch:
+                report.read += 1
+                if not isinstance(record, dict):
+                    report.conflict(None, 'not an object')
+                    continue
+                legacy_id = record.get('id')
+                email = (_text(record.get('email')) or '').lower()
+                if not email or not record.get('password'):
+                    report.conflict(legacy_id, 'missing email or password')
+                    continue
+                if email in self.user_ids_by_email or any(row['email'] == email for row in rows):
+                    admin_note = '; its admin flag was not carried over' if record.get('is_admin') else ''
+                    report.conflict(legacy_id, f'duplicate email {email}; kept the first account{admin_note}')
+                    aliases.append((legacy_id, email))
+                    continue
+                if email in existing:
+                    self.user_ids[legacy_id] = self.user_ids_by_email[email] = existing[email]
+                    report.existing += 1
+                    continue
+                username = self._unique_username(connection, record.get('name'), legacy_id, taken_usernames)
+                if username != _text(record.get('name')):
+                    report.conflict(legacy_id, f'username taken; migrated as {username}')
+                rows.append({
+                    'username': username,
+                    'email': email,
+                    # Stored as-is: login still compares plain passwords
+                    'password': str(record['password']),
+                    'phone': _text(record.get('phone')),
+                    'is_admin': bool(record.get('is_admin')),
+                    'created_at': parse_timestamp(record.get('created_at')) or datetime.utcnow(),
+                    '_legacy_id': legacy_id,
+                })
+            if rows:
+                legacy_ids = [row.pop('_legacy_id') for row in rows]
+                connection.execute(self.users.insert(), rows)
+                inserted = {
+                    row.email: row.id for row in connection.execute(
+                        select(self.users.c.id, self.users.c.email)
+                        .where(self.users.c.email.in_([row['email'] for row in rows])))
+                }
+                for legacy_id, row in zip(legacy_ids, rows):
+                    self.user_ids[legacy_id] = self.user_ids_by_email[row['email']] = inserted[row['email']]
+                report.inserted += len(rows)
+            for legacy_id, email in aliases:
+                self.user_ids[legacy_id] = self.user_ids_by_email[email]
+        return report
+
+    # Orders
+    def _order_items(self, record, report, legacy_id):
+        items = []
+        for item in record.get('items') or record.get('order_items') or ():
+            product_id = self.product_ids.get(item.get('product_id'))
+            if product_id is None and item.get('product_name'):
+                product_id = self.product_ids_by_name.get(normalize(item['product_name']))
+            try:
+                quantity = int(item.get('quantity') or 1)
+                price = float(item.get('price') or 0)
+            except (TypeError, ValueError):
+                report.conflict(legacy_id, 'order item with a non-numeric quantity or price')
+                continue
+            if product_id is None:
+                report.conflict(legacy_id, f"order item for unknown product {item.get('product_name') or item.get('product_id')}")
+            items.append({'product_id': product_id, 'quantity': quantity, 'price': price})
+        return items
+
+    def migrate_orders(self, connection):
+        report = SourceReport('orders.json')
+        for batch in chunked(self._records('orders.json'), self.batch_size):
+            numbers = {f"{LEGACY_ORDER_PREFIX}{r.get('id')}" for r in batch if isinstance(r, dict)}
+            existing = set(connection.execute(
+                select(self.orders.c.order_number).where(self.orders.c.order_number.in_(numbers))).scalars())
+            orders, items_by_number = [], {}
+            for record in batch:
+                report.read += 1
+                if not isinstance(record, dict) or record.get('id') is None:
+                    report.conflict(None, 'order without an id')
+                    continue
+                legacy_id = record['id']
+                number = f'{LEGACY_ORDER_PREFIX}{legacy_id}'
+                if number in existing or number in items_by_number:
+                    report.existing += 1
+                    continue
+                user_id = self.user_ids.get(record.get('user_id'))
+                if user_id is None and record.get('customer_email'):
+                    user_id = self.user_ids_by_email.get(record['customer_email'].strip().lower())
+                items = self._order_items(record, report, legacy_id)
+                try:
+                    total = float(record.get('total') or sum(i['price'] * i['quantity'] for i in items))
+                except (TypeError, ValueError):
+                    report.conflict(legacy_id, 'total is not a number')
+                    continue
+                address = '\n'.join(filter(None, (
+                    _text(record.get('customer_name')), _text(record.get('customer_address')),
+                    _text(record.get('customer_city')), _text(record.get('customer_phone')),
+                    _text(record.get('customer_email')))))
+                orders.append({
+                    'order_number': number,
+                    'user_id': user_id,
+                    'total_amount': total,
+                    'shipping_cost': 0,
+                    'status': _text(record.get('status')) or 'pending',
+                    'shipping_address': address,
+                    'created_at': parse_timestamp(record.get('order_date') or record.get('created_at'))
+                                  or datetime.utcnow(),
+                })
+                items_by_number[number] = items
+            if orders:
+                connection.execute(self.orders.insert(), orders)
+                order_ids = dict(connection.execute(
+                    select(self.orders.c.order_number, self.orders.c.id)
+                    .where(self.orders.c.order_number.in_(list(items_by_number)))).all())
+                item_rows = [{**item, 'order_id': order_ids[number]}
+                             for number, items in items_by_number.items() for item in items]
+                if item_rows:
+                    connection.execute(self.order_items.insert(), item_rows)
+                report.inserted += len(orders)
+        return report
+
+    def report_unmigrated(self, name, message):
+        report = SourceReport(name)
+        for record in self._records(name):
+            report.read += 1
+        if report.read:
+            report.conflict(None, f'{report.read} record(s): {message}')
+        return report
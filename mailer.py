@@ -0,0 +1,73 @@
+# Pluggable outgoing email sinks
+import os
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+
+
+def build_message(sender, to, subject, body):
+    message = EmailMessage()
+    message['From'] = sender
+    message['To'] = to
+    message['Subject'] = subject
+    message.set_content(body)
+    return message
+
+
+class SMTPSink:
+    """Send through an SMTP server"""
+
+    def __init__(self, host, port=25, username=None, password=None, use_tls=False, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+
+    def send(self, message):
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.use_tls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            smtp.send_message(message)
+
+
+class FileSink:
+    """Write each message as an .eml file in a directory"""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def send(self, message):
+        os.makedirs(self.directory, exist_ok=True)
+        filename = f'{time.time_ns()}-{threading.get_ident()}.eml'
+        with open(os.path.join(self.directory, filename), 'wb') as f:
+            f.write(bytes(message))
+
+
+class MemorySink:
+    """Keep messages in a list"""
+
+    def __init__(self):
+        self.outbox = []
+
+    def send(self, message):
+        self.outbox.append(message)
+
+
+def make_mail_sink(config, instance_path):
+    backend = config.get('MAIL_BACKEND', 'file')
+    if backend == 'smtp':
+        return SMTPSink(
+            config['MAIL_SERVER'],
+            int(config.get('MAIL_PORT', 25)),
+            config.get('MAIL_USERNAME'),
+            config.get('MAIL_PASSWORD'),
+            config.get('MAIL_USE_TLS', False)
+        )
+    if backend == 'memory':
+        return MemorySink()
+    return FileSink(config.get('MAIL_OUTBOX_DIR') or os.path.join(instance_path, 'outbox'))
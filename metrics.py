@@ -0,0 +1,196 @@
+# Incrementally maintained dashboard rollups
+import importlib
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+CANCELLED = 'Cancelled'
+COUNTERS = ('orders', 'revenue', 'units', 'users', 'products')
+
+
+class Metrics:
+    """Rollup rows updated in the same transaction as the change they count.
+
+    ``daily`` holds one row per UTC day (orders, revenue, units, signups),
+    ``statuses`` one row per order status, ``product_sales`` one row per
+    product and ``counters`` the all-time totals (products included), so
+    the dashboard never aggregates over orders or products. Cancelled orders keep their status count but
+    are taken out of revenue and units.
+    """
+
+    def __init__(self, db, daily_model, status_model, product_sales_model, counter_model):
+        self.db = db
+        self.daily = daily_model.__table__
+        self.statuses = status_model.__table__
+        self.product_sales = product_sales_model.__table__
+        self.counters = counter_model.__table__
+
+    # Writes
+    def _increment(self, table, keys, deltas):
+        deltas = {column: value for column, value in deltas.items() if value}
+        if not deltas:
+            return
+        session = self.db.session
+        dialect = session.get_bind().dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            # Imported on use: the postgresql dialect alone adds ~25ms to worker startup
+            insert = importlib.import_module(f'sqlalchemy.dialects.{dialect}').insert(table).values(**keys, **deltas)
+            session.execute(insert.on_conflict_do_update(
+                index_elements=list(keys),
+                set_={column: table.c[column] + insert.excluded[column] for column in deltas}
+            ))
+            return
+        where = [table.c[column] == value for column, value in keys.items()]
+        result = session.execute(table.update().where(*where).values(
+            {column: table.c[column] + value for column, value in deltas.items()}))
+        if result.rowcount == 0:
+            session.execute(table.insert().values(**keys, **deltas))
+
+    def _count(self, name, delta):
+        self._increment(self.counters, {'name': name}, {'value': delta})
+
+    def _sales(self, day, items, sign):
+        """Revenue and units for an order's items, added (sign=1) or removed (sign=-1)"""
+        units = sum(item['quantity'] for item in items) * sign
+        revenue = sum(item['quantity'] * item['price'] for item in items) * sign
+        self._increment(self.daily, {'day': day}, {'revenue': revenue, 'units': units})
+        for item in items:
+            if item['product_id'] is not None:
+                self._increment(self.product_sales, {'product_id': item['product_id']},
+                                {'units': item['quantity'] * sign, 'revenue': item['quantity'] * item['price'] * sign})
+        self._count('revenue', revenue)
+        self._count('units', units)
+
+    def order_placed(self, items, status='pending', created_at=None):
+        """``items`` are dicts with product_id, quantity and price"""
+        day = (created_at or datetime.utcnow()).date()
+        self._increment(self.daily, {'day': day}, {'orders': 1})
+        self._increment(self.statuses, {'status': status}, {'orders': 1})
+        self._count('orders', 1)
+        if status != CANCELLED:
+            self._sales(day, items, 1)
+
+    def order_status_changed(self, items, old_status, new_status, created_at=None):
+        if old_status == new_status:
+            return
+        self._increment(self.statuses, {'status': old_status}, {'orders': -1})
+        self._increment(self.statuses, {'status': new_status}, {'orders': 1})
+        day = (created_at or datetime.utcnow()).date()
+        if new_status == CANCELLED:
+            self._sales(day, items, -1)
+        elif old_status == CANCELLED:
+            self._sales(day, items, 1)
+
+    def user_registered(self, created_at=None):
+        self._increment(self.daily, {'day': (created_at or datetime.utcnow()).date()}, {'signups': 1})
+        self._count('users', 1)
+
+    def products_added(self, count=1):
+        """Products created (a negative ``count`` for products deleted)"""
+        self._count('products', count)
+
+    def rebuild(self, order_model, order_item_model, user_model, product_model):
+        """Recompute every rollup from the source tables"""
+        session = self.db.session
+        orders, items, users = order_model.__table__, order_item_model.__table__, user_model.__table__
+        products = product_model.__table__
+        for table in (self.daily, self.statuses, self.product_sales, self.counters):
+            session.execute(table.delete())
+
+        live = func.coalesce(orders.c.status, '') != CANCELLED
+        order_day = func.date(orders.c.created_at)
+        line_total = items.c.quantity * items.c.price
+        daily = {}
+
+        def day_row(day):
+            if isinstance(day, str):
+                day = datetime.strptime(day, '%Y-%m-%d').date()
+            return daily.setdefault(day, {'day': day, 'orders': 0, 'revenue': 0.0, 'units': 0, 'signups': 0})
+
+        for day, count in session.execute(select(order_day, func.count()).select_from(orders).group_by(order_day)):
+            if day is not None:
+                day_row(day)['orders'] = count
+        sales = (
+            select(order_day, func.sum(items.c.quantity), func.sum(line_total))
+            .select_from(items.join(orders, items.c.order_id == orders.c.id))
+            .where(live).group_by(order_day)
+        )
+        for day, units, revenue in session.execute(sales):
+            if day is not None:
+                row = day_row(day)
+                row['units'], row['revenue'] = int(units or 0), float(revenue or 0)
+        signup_day = func.date(users.c.created_at)
+        for day, count in session.execute(select(signup_day, func.count()).select_from(users).group_by(signup_day)):
+            if day is not None:
+                day_row(day)['signups'] = count
+        if daily:
+            session.execute(self.daily.insert(), list(daily.values()))
+
+        # NULL is counted as 'pending' (as the incremental path does), so group on the coalesced value
+        order_status = func.coalesce(orders.c.status, 'pending')
+        statuses = [{'status': status, 'orders': count} for status, count in session.execute(
+            select(order_status, func.count()).group_by(order_status))]
+        if statuses:
+            session.execute(self.statuses.insert(), statuses)
+
+        product_sales = [{'product_id': product_id, 'units': int(units), 'revenue': float(revenue)}
+                         for product_id, units, revenue in session.execute(
+                             select(items.c.product_id, func.sum(items.c.quantity), func.sum(line_total))
+                             .select_from(items.join(orders, items.c.order_id == orders.c.id))
+                             .where(live, items.c.product_id.isnot(None)).group_by(items.c.product_id))]
+        if product_sales:
+            session.execute(self.product_sales.insert(), product_sales)
+
+        totals = session.execute(select(
+            select(func.count()).select_from(orders).scalar_subquery(),
+            select(func.coalesce(func.sum(line_total), 0)).select_from(
+                items.join(orders, items.c.order_id == orders.c.id)).where(live).scalar_subquery(),
+            select(func.coalesce(func.sum(items.c.quantity), 0)).select_from(
+                items.join(orders, items.c.order_id == orders.c.id)).where(live).scalar_subquery(),
+            select(func.count()).select_from(users).scalar_subquery(),
+            select(func.count()).select_from(products).scalar_subquery(),
+        )).one()
+        session.execute(self.counters.insert(), [{'name': name, 'value': value} for name, value in zip(COUNTERS, totals)])
+        session.commit()
+
+    # Reads
+    def complete(self):
+        """Whether every counter has a row (rollups written before a counter existed lack it)"""
+        names = set(self.db.session.execute(select(self.counters.c.name)).scalars())
+        return names >= set(COUNTERS)
+
+    def totals(self):
+        values = dict(self.db.session.execute(select(self.counters.c.name, self.counters.c.value)).all())
+        return {name: values.get(name, 0) for name in COUNTERS}
+
+    def orders_by_status(self):
+        return self.db.session.execute(
+            select(self.statuses.c.status, self.statuses.c.orders)
+            .where(self.statuses.c.orders > 0).order_by(self.statuses.c.orders.desc())
+        ).all()
+
+    def top_products(self, limit=5):
+        return self.db.session.execute(
+            select(self.product_sales.c.product_id, self.product_sales.c.units, self.product_sales.c.revenue)
+            .where(self.product_sales.c.units > 0)
+            .order_by(self.product_sales.c.units.desc()).limit(limit)
+        ).all()
+
+    def daily_range(self, days=30, today=None):
+        """Pre-bucketed rows for the last ``days`` days, with empty days filled in"""
+        today = today or datetime.utcnow().date()
+        start = today - timedelta(days=days - 1)
+        rows = {row.day: row for row in self.db.session.execute(
+            select(self.daily).where(self.daily.c.day >= start, self.daily.c.day <= today))}
+        series = []
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            row = rows.get(day)
+            series.append({
+                'day': day,
+                'orders': row.orders if row else 0,
+                'revenue': row.revenue if row else 0.0,
+                'units': row.units if row else 0,
+                'signups': row.signups if row else 0,
+            })
+        return series
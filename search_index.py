@@ -0,0 +1,222 @@
+# In-memory trilingual product search index
+import heapq
+import re
+import threading
+import unicodedata
+
+ARABIC_LETTER_VARIANTS = str.maketrans({
+    'أ': 'ا',
+    'إ': 'ا',
+    'آ': 'ا',
+    'ٱ': 'ا',
+    'ى': 'ي',
+    'ة': 'ه',
+    'ؤ': 'و',
+    'ئ': 'ي',
+    'ـ': None,  # tatweel
+})
+
+WORD_RE = re.compile(r'\w+')
+
+
+def normalize(text):
+    """Lowercase and strip French accents and Arabic diacritics"""
+    if not text:
+        return ''
+    folded = text.casefold()
+    if folded.isascii():
+        return folded
+    decomposed = unicodedata.normalize('NFKD', folded)
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return stripped.translate(ARABIC_LETTER_VARIANTS)
+
+
+def tokenize(text):
+    return WORD_RE.findall(normalize(text))
+
+
+def trigrams(token):
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+def index_keys(word):
+    """Every key a word is found under: its trigrams, or its 1-2 letter substrings"""
+    keys = [('gram', gram) for gram in trigrams(word)]
+    keys += [('short', word[i:i + size]) for size in (1, 2) for i in range(len(word) - size + 1)]
+    return keys
+
+
+class SearchIndex:
+    """Trigram index over product names with word-prefix ranking.
+
+    Products are indexed by word, and each distinct word once by its
+    trigrams, so adding a product costs a set insert per word however long
+    the words are. Every query word must appear as a substring of some
+    indexed word, which keeps the old ilike('%q%') semantics while only
+    touching the words that share the query's trigrams.
+    """
+
+    def __init__(self, fields=('name_en', 'name_fr', 'name_ar')):
+        self.fields = fields
+        self.version = None
+        self._lock = threading.RLock()
+        self._docs = {}
+        self._words = {}  # word -> product ids
+        self._keys = {}  # trigram / short substring -> words
+        self._lengths = {}  # product id -> number of distinct words, the ranking tie-breaker
+        self._ranked = {}  # word -> its product ids in rank order
+
+    def init_app(self, app):
+        self.clear()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def clear(self):
+        with self._lock:
+            self._docs.clear()
+            self._words.clear()
+            self._keys.clear()
+            self._lengths.clear()
+            self._ranked.clear()
+            self.version = None
+
+    def _signature(self, product):
+        return tuple(getattr(product, field, None) for field in self.fields)
+
+    def add(self, product):
+        """Index or re-index a single product"""
+        signature = self._signature(product)
+        with self._lock:
+            current = self._docs.get(product.id)
+            if current is not None:
+                if current[0] == signature:
+                    return
+                self._unlink(product.id, current[1])
+            words = set()
+            for value in signature:
+                words.update(tokenize(value))
+            for word in words:
+                ids = self._words.get(word)
+                if ids is None:
+                    ids = self._words[word] = set()
+                    for key in index_keys(word):
+                        self._keys.setdefault(key, set()).add(word)
+                ids.add(product.id)
+                self._ranked.pop(word, None)
+            self._docs[product.id] = (signature, frozenset(words))
+            self._lengths[product.id] = len(words)
+
+    def remove(self, product_id):
+        with self._lock:
+            current = self._docs.pop(product_id, None)
+            if current is not None:
+                self._unlink(product_id, current[1])
+                del self._lengths[product_id]
+
+    def _unlink(self, product_id, words):
+        for word in words:
+            ids = self._words.get(word)
+            if ids is None:
+                continue
+            ids.discard(product_id)
+            self._ranked.pop(word, None)
+            if not ids:
+                del self._words[word]
+                for key in index_keys(word):
+                    keyed = self._keys.get(key)
+                    if keyed is not None:
+                        keyed.discard(word)
+                        if not keyed:
+                            del self._keys[key]
+
+    def sync(self, products, version):
+        """Bring the index in line with a product list, touching only changed rows"""
+        if version == self.version:
+            return
+        with self._lock:
+            if version == self.version:
+                return
+            seen = set()
+            for product in products:
+                seen.add(product.id)
+                self.add(product)
+            for product_id in set(self._docs) - seen:
+                self.remove(product_id)
+            # Rank what changed now, so the first suggestion request does not sort
+            for word in self._words:
+                if word not in self._ranked:
+                    self._ranked_ids(word)
+            self.version = version
+
+    def _matching_words(self, word):
+        """Indexed words containing ``word``, each with its tier: exact 3, prefix 2, infix 1"""
+        if len(word) < 3:
+            candidates = self._keys.get(('short', word), ())
+        else:
+            keyed = [self._keys.get(('gram', gram)) for gram in trigrams(word)]
+            if not all(keyed):
+                return []
+            keyed.sort(key=len)
+            candidates = set.intersection(*keyed)
+        return [(candidate, 3 if candidate == word else 2 if candidate.startswith(word) else 1)
+                for candidate in candidates if word in candidate]
+
+    def _rank_key(self, product_id):
+        return self._lengths[product_id], product_id
+
+    def _ranked_ids(self, word):
+        ranked = self._ranked.get(word)
+        if ranked is None:
+            ranked = sorted(self._words[word])
+            ranked.sort(key=self._lengths.__getitem__)
+            self._ranked[word] = ranked
+        return ranked
+
+    def _first_matches(self, word, limit):
+        """Top ``limit`` products for one word, merged from per-word rankings tier by tier"""
+        by_tier = {3: [], 2: [], 1: []}
+        for candidate, tier in self._matching_words(word):
+            by_tier[tier].append(self._ranked_ids(candidate))
+        found, seen = [], set()
+        for tier in (3, 2, 1):
+            for product_id in heapq.merge(*by_tier[tier], key=self._rank_key):
+                if product_id not in seen:
+                    seen.add(product_id)
+                    found.append(product_id)
+                    if len(found) == limit:
+                        return found
+        return found
+
+    def search(self, query, limit=None):
+        """Return matching product ids, best match first"""
+        words = tokenize(query)
+        if not words:
+            return []
+        with self._lock:
+            if limit and len(set(words)) == 1:
+                # Suggestions: cost depends on the matching words, not the matching products
+                return self._first_matches(words[0], limit)
+            # Per query word, each product's best tier; a product must match every word
+            scores = None
+            for word in sorted(set(words), key=len, reverse=True):
+                tiers = {}
+                for candidate, tier in self._matching_words(word):
+                    for product_id in self._words[candidate]:
+                        if tiers.get(product_id, 0) < tier:
+                            tiers[product_id] = tier
+                if scores is None:
+                    scores = tiers
+                else:
+                    scores = {product_id: score + tiers[product_id]
+                              for product_id, score in scores.items() if product_id in tiers}
+                if not scores:
+                    return []
+            ranked = [(-score, self._lengths[product_id], product_id)
+                      for product_id, score in scores.items()]
+
+        if limit:
+            ranked = heapq.nsmallest(limit, ranked)
+        else:
+            ranked.sort()
+        return [product_id for _, _, product_id in ranked]
@@ -75,15 +75,20 @@ document.addEventListener('DOMContentLoaded', function() {
             e.preventDefault();
             const productId = this.dataset.productId;
             
-            fetch(`/add_to_cart/${productId}`)
+            fetch('/api/v1/cart/items', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({product_id: productId, quantity: 1})
+            })
                 .then(response => response.json())
                 .then(data => {
                     if (data.success) {
                         // Update cart count
                         const cartCount = document.querySelector('.cart-count');
                         if (cartCount) {
-                            const currentCount = parseInt(cartCount.textContent) || 0;
-                            cartCount.textContent = currentCount + 1;
+                            cartCount.textContent = data.summary.count;
                         }
                         
                         // Show success message
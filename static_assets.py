@@ -0,0 +1,162 @@
+# Fingerprinted, minified and precompressed static assets
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from flask import request, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # listed in requirements.txt; without it only .gz siblings are written
+    brotli = None
+
+BUILD_DIR = 'dist'
+MANIFEST = 'manifest.json'
+MINIFY_EXTENSIONS = ('.css', '.js')
+COMPRESS_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.html')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+logger = logging.getLogger(__name__)
+
+
+def minify_css(source):
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    source = re.sub(r'\s+', ' ', source)
+    source = re.sub(r'\s*([{};,>])\s*', r'\1', source)
+    source = re.sub(r':\s+', ':', source)
+    return source.replace(';}', '}').strip()
+
+
+def minify_js(source):
+    """Conservative: drops indentation, blank lines and comments that start a line"""
+    lines = []
+    in_block_comment = False
+    for line in source.splitlines():
+        line = line.strip()
+        # Strip only the comment span: code after a closing */ on the same line is kept
+        while in_block_comment or line.startswith('/*'):
+            if not in_block_comment:
+                line, in_block_comment = line[2:], True
+            end = line.find('*/')
+            if end == -1:
+                line = ''
+                break
+            line, in_block_comment = line[end + 2:].lstrip(), False
+        if not line or line.startswith('//'):
+            continue
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def build_assets(static_folder):
+    """Write fingerprinted copies (plus .gz/.br) under static/dist and return the manifest"""
+    build_root = os.path.join(static_folder, BUILD_DIR)
+    manifest = {}
+    if brotli is None:
+        logger.warning('brotli is not installed; writing .gz siblings only (pip install -r requirements.txt)')
+    for root, dirs, files in os.walk(static_folder):
+        if os.path.abspath(root).startswith(os.path.abspath(build_root)):
+            continue
+        for filename in sorted(files):
+            path = os.path.join(root, filename)
+            logical = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            stem, ext = os.path.splitext(logical)
+            with open(path, 'rb') as f:
+                data = f.read()
+            if ext in MINIFY_EXTENSIONS:
+                data = MINIFIERS[ext](data.decode('utf-8')).encode('utf-8')
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            built = f'{BUILD_DIR}/{stem}.{digest}{ext}'
+            target = os.path.join(static_folder, built)
+            _write(target, data)
+            if ext in COMPRESS_EXTENSIONS:
+                _write(target + '.gz', gzip.compress(data, 9, mtime=0))
+                if brotli is not None:
+                    _write(target + '.br', brotli.compress(data, quality=11))
+            manifest[logical] = built
+    with open(os.path.join(build_root, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, BUILD_DIR, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class StaticAssets:
+    """Point url_for('static') at built assets and serve them precompressed.
+
+    Without a manifest (no ``flask build-assets`` yet) the original files
+    are served as before. In production the web server should serve
+    ``static/dist`` directly (``gzip_static``/``brotli_static`` in nginx);
+    this is the fallback for when Flask is serving them itself.
+    """
+
+    def __init__(self, app=None):
+        self.manifest = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.static_folder = app.static_folder
+        self.manifest = load_manifest(self.static_folder)
+        app.url_defaults(self._rewrite_url)
+        app.view_functions['static'] = self.send_static_file
+
+    def reload(self):
+        self.manifest = load_manifest(self.static_folder)
+
+    def _rewrite_url(self, endpoint, values):
+        if endpoint == 'static' and values.get('filename') in self.manifest:
+            values['filename'] = self.manifest[values['filename']]
+
+    def send_static_file(self, filename):
+        fingerprinted = filename.startswith(BUILD_DIR + '/')
+        encoding = None
+        if fingerprinted:
+            accepted = request.accept_encodings
+            for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+                if accepted[candidate] and os.path.isfile(os.path.join(self.static_folder, filename + suffix)):
+                    encoding = candidate
+                    break
+
+        if encoding is None:
+            response = send_from_directory(self.static_folder, filename)
+        else:
+            response = send_from_directory(self.static_folder, filename + ('.br' if encoding == 'br' else '.gz'),
+                                           mimetype=mimetypes.guess_type(filename)[0])
+            response.headers['Content-Encoding'] = encoding
+        if fingerprinted:
+            response.headers['Cache-Control'] = IMMUTABLE
+            response.vary.add('Accept-Encoding')
+        return response
+
+
+def image_url(url, width):
+    """Ask the image CDN for a resized, re-encoded copy instead of the original"""
+    if not url:
+        return url
+    parts = urlsplit(url)
+    if parts.netloc != 'images.unsplash.com':
+        return url
+    query = dict(parse_qsl(parts.query))
+    query.update({'w': str(width), 'auto': 'format', 'fit': 'crop', 'q': query.get('q', '75')})
+    return urlunsplit(parts._replace(query=urlencode(query)))
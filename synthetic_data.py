@@ -0,0 +1,151 @@
+# Reproducible synthetic catalog, users and orders for benchmarks
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from catalog_io import chunked
+
+SCALES = {'1k': 1_000, '10k': 10_000, '100k': 100_000}
+
+# (English, French, Arabic)
+THEMES = [
+    ('Birthday', 'Anniversaire', 'عيد ميلاد'),
+    ('Wedding', 'Mariage', 'زفاف'),
+    ('Ramadan', 'Ramadan', 'رمضان'),
+    ('Baby Shower', 'Baby shower', 'استقبال المولود'),
+    ('Graduation', 'Remise de diplômes', 'تخرج'),
+    ('Eid', 'Aïd', 'عيد'),
+    ('Halloween', 'Halloween', 'الهالوين'),
+    ('New Year', 'Nouvel An', 'رأس السنة'),
+]
+ADJECTIVES = [
+    ('Golden', 'doré', 'ذهبي'),
+    ('Pastel', 'pastel', 'باستيل'),
+    ('Sparkling', 'scintillant', 'لامع'),
+    ('Classic', 'classique', 'كلاسيكي'),
+    ('Rustic', 'rustique', 'ريفي'),
+    ('Royal', 'royal', 'ملكي'),
+    ('Floral', 'floral', 'زهري'),
+    ('Vintage', 'vintage', 'عتيق'),
+]
+NOUNS = [
+    ('Balloon Set', 'Ensemble de ballons', 'مجموعة بالونات'),
+    ('Table Runner', 'Chemin de table', 'مفرش طاولة'),
+    ('Cake Topper', 'Décoration de gâteau', 'زينة الكعكة'),
+    ('Banner', 'Banderole', 'لافتة'),
+    ('Candle Pack', 'Lot de bougies', 'علبة شموع'),
+    ('Paper Plates', 'Assiettes en papier', 'أطباق ورقية'),
+    ('Gift Box', 'Boîte cadeau', 'علبة هدايا'),
+    ('Confetti', 'Confettis', 'قصاصات ملونة'),
+    ('Lantern', 'Lanterne', 'فانوس'),
+    ('Garland', 'Guirlande', 'إكليل'),
+]
+STATUSES = (('pending', 30), ('Processing', 15), ('Shipped', 15), ('Delivered', 25), ('Completed', 10), ('Cancelled', 5))
+SEARCH_TERMS = [noun[0].split()[0].lower() for noun in NOUNS] + [adjective[0].lower() for adjective in ADJECTIVES]
+
+
+def _next_id(connection, table):
+    return (connection.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+
+
+def _product_rows(rng, start_id, count, category_ids):
+    for product_id in range(start_id, start_id + count):
+        adjective, noun, theme_index = rng.choice(ADJECTIVES), rng.choice(NOUNS), rng.randrange(len(THEMES))
+        theme = THEMES[theme_index]
+        price = round(rng.uniform(5, 900), 2)
+        discount = rng.choice((None, None, None, 10, 20, 30))
+        yield {
+            'id': product_id,
+            'name_en': f'{adjective[0]} {theme[0]} {noun[0]} {product_id}',
+            'name_fr': f'{noun[1]} {adjective[1]} {theme[1]} {product_id}',
+            'name_ar': f'{noun[2]} {adjective[2]} {theme[2]} {product_id}',
+            'description_en': f'{adjective[0]} {noun[0].lower()} for a {theme[0].lower()} party.',
+            'description_fr': f'{noun[1]} {adjective[1]} pour une fête {theme[1].lower()}.',
+            'description_ar': f'{noun[2]} {adjective[2]} لحفلة {theme[2]}.',
+            'price': price,
+            'original_price': round(price / (1 - discount / 100), 2) if discount else None,
+            'discount': discount,
+            'image': None,
+            'stock': rng.randint(1_000, 100_000),
+            'category_id': category_ids[theme_index],
+            'is_active': rng.random() > 0.02,
+        }
+
+
+def seed(db, models, scale, seed=42, batch_size=5000, days=365):
+    """Add ``scale`` products plus scale/10 users and scale/5 orders; returns row counts.
+
+    ``models`` maps 'Category', 'Product', 'User', 'Order' and 'OrderItem'
+    to the model classes. The same seed always produces the same data.
+    """
+    count = SCALES.get(scale, scale)
+    rng = random.Random(seed)
+    categories = models['Category'].__table__
+    products = models['Product'].__table__
+    users = models['User'].__table__
+    orders = models['Order'].__table__
+    order_items = models['OrderItem'].__table__
+    now = datetime.utcnow().replace(microsecond=0)
+    counts = {}
+
+    with db.engine.begin() as connection:
+        names = {row.name_en: row.id for row in connection.execute(select(categories.c.id, categories.c.name_en))}
+        missing = [{'name_en': en, 'name_fr': fr, 'name_ar': ar} for en, fr, ar in THEMES if en not in names]
+        if missing:
+            connection.execute(categories.insert(), missing)
+            names = {row.name_en: row.id for row in connection.execute(select(categories.c.id, categories.c.name_en))}
+        category_ids = [names[theme[0]] for theme in THEMES]
+        counts['categories'] = len(missing)
+
+        first_product = _next_id(connection, products)
+        for batch in chunked(_product_rows(rng, first_product, count, category_ids), batch_size):
+            connection.execute(products.insert(), batch)
+        counts['products'] = count
+        prices = dict(connection.execute(select(products.c.id, products.c.price)
+                                         .where(products.c.id >= first_product)).all())
+        product_ids = list(prices)
+
+        first_user = _next_id(connection, users)
+        user_count = max(count // 10, 1)
+        user_rows = ({
+            'id': user_id,
+            'username': f'bench{user_id}',
+            'email': f'bench{user_id}@example.com',
+            'password': 'password',
+            'first_name': 'Bench',
+            'last_name': str(user_id),
+            'is_admin': False,
+            'created_at': now - timedelta(seconds=rng.randrange(days * 86400)),
+        } for user_id in range(first_user, first_user + user_count))
+        for batch in chunked(user_rows, batch_size):
+            connection.execute(users.insert(), batch)
+        counts['users'] = user_count
+
+        first_order = _next_id(connection, orders)
+        order_count = max(count // 5, 1)
+        statuses, weights = zip(*STATUSES)
+        items_written = 0
+        for batch in chunked(range(first_order, first_order + order_count), batch_size):
+            order_rows, item_rows = [], []
+            for order_id in batch:
+                lines = [(product_id, rng.randint(1, 3)) for product_id in rng.sample(product_ids, rng.randint(1, 4))]
+                subtotal = round(sum(prices[product_id] * quantity for product_id, quantity in lines), 2)
+                order_rows.append({
+                    'id': order_id,
+                    'user_id': rng.randrange(first_user, first_user + user_count),
+                    'order_number': f'SYN{order_id:012d}',
+                    'total_amount': subtotal,
+                    'shipping_cost': 0 if subtotal >= 500 else 45,
+                    'status': rng.choices(statuses, weights)[0],
+                    'shipping_address': f'{order_id} Rue des Fêtes\nCasablanca',
+                    'created_at': now - timedelta(seconds=rng.randrange(days * 86400)),
+                })
+                item_rows.extend({'order_id': order_id, 'product_id': product_id, 'quantity': quantity,
+                                  'price': prices[product_id]} for product_id, quantity in lines)
+            connection.execute(orders.insert(), order_rows)
+            connection.execute(order_items.insert(), item_rows)
+            items_written += len(item_rows)
+        counts['orders'] = order_count
+        counts['order_items'] = items_written
+    return counts
@@ -0,0 +1,71 @@
+import pytest
+from sqlalchemy import event
+
+import app as shop
+
+MODELS = {'Category': shop.Category, 'Product': shop.Product, 'User': shop.User,
+          'Order': shop.Order, 'OrderItem': shop.OrderItem}
+
+CHECKOUT = {'full_name': 'Salma Idrissi', 'email': 'salma@example.com', 'phone': '0600000000',
+            'address': '12 Rue des Fêtes', 'city': 'Casablanca'}
+
+
+def make_app(tmp_path, **config):
+    return shop.create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'shop.db'}",
+        'CART_STORE_PATH': str(tmp_path / 'carts.db'),
+        'WTF_CSRF_ENABLED': False,
+        'JOB_QUEUE_MODE': 'inline',
+        'MAIL_BACKEND': 'memory',
+        'INSTRUMENTATION_ENABLED': False,
+        **config,
+    }, instance_path=str(tmp_path / 'instance'))
+
+
+@pytest.fixture
+def app(tmp_path, request):
+    # Tests can pass extra config with @pytest.mark.app_config(KEY=value)
+    marker = request.node.get_closest_marker('app_config')
+    app = make_app(tmp_path, **(marker.kwargs if marker else {}))
+    with app.app_context():
+        shop.initialize_database()
+        shop.migrate_database()
+        yield app
+        shop.db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def statements(app):
+    """SQL statements executed since the fixture was requested (clear() between requests)"""
+    executed = []
+    event.listen(shop.db.engine, 'before_cursor_execute',
+                 lambda conn, cursor, statement, *args: executed.append(statement))
+    return executed
+
+
+def add_products(count):
+    """Add ``count`` active products to the first category; returns their ids"""
+    category = shop.Category.query.first()
+    products = [shop.Product(name_en=f'Extra {i}', description_en=f'Extra product {i}', price=10 + i,
+                             stock=5, category_id=category.id) for i in range(count)]
+    shop.db.session.add_all(products)
+    shop.db.session.commit()
+    shop.product_changed()
+    return [product.id for product in products]
+
+
+def log_in(client, email='admin@partyyacout.com', password='admin123'):
+    response = client.post('/login', data={'email': email, 'password': password})
+    assert response.status_code == 302
+    return client
+
+
+@pytest.fixture
+def admin_client(client):
+    return log_in(client)
@@ -0,0 +1,78 @@
+import json
+import os
+
+import pytest
+
+import app as shop
+import benchmark
+import synthetic_data
+from conftest import MODELS
+
+
+def synthetic_rows():
+    products = [(p.name_en, p.price, p.stock, p.category_id, p.is_active)
+                for p in shop.Product.query.order_by(shop.Product.id)]
+    orders = [(o.user_id, o.total_amount, o.status, len(o.order_items))
+              for o in shop.Order.query.order_by(shop.Order.id)]
+    return products, orders
+
+
+def test_seed_adds_the_requested_rows(app):
+    products, orders = shop.Product.query.count(), shop.Order.query.count()
+
+    counts = synthetic_data.seed(shop.db, MODELS, 200, batch_size=64)
+
+    assert counts['products'] == 200 and counts['users'] == 20 and counts['orders'] == 40
+    assert shop.Product.query.count() == products + 200
+    assert shop.Order.query.count() == orders + 40
+    assert shop.OrderItem.query.join(shop.Order).filter(shop.Order.order_number.like('SYN%')).count() \
+        == counts['order_items']
+
+
+def test_same_seed_gives_the_same_data(tmp_path):
+    seeded = []
+    for run in range(2):
+        app = shop.create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / f'shop{run}.db'}",
+            'CART_STORE_PATH': str(tmp_path / f'carts{run}.db'),
+        }, instance_path=str(tmp_path / f'instance{run}'))
+        with app.app_context():
+            shop.initialize_database()
+            synthetic_data.seed(shop.db, MODELS, 100, seed=7)
+            seeded.append(synthetic_rows())
+            shop.db.session.remove()
+
+    assert seeded[0] == seeded[1]
+    assert len(seeded[0][1]) == 20
+
+
+@pytest.mark.parametrize('scale', ['1k'])
+def test_committed_baseline_covers_every_route(scale):
+    with open(os.path.join(benchmark.ROOT, 'benchmarks', f'baseline-{scale}.json')) as f:
+        baseline = json.load(f)
+
+    assert baseline['scale'] == scale
+    assert set(baseline['results']) == {scenario['name'] for scenario in benchmark.SCENARIOS}
+    assert not any(result['errors'] for result in baseline['results'].values())
+
+
+def result(**changes):
+    return {'p50_ms': 10.0, 'p99_ms': 20.0, 'sql_per_request': 1.0, 'errors': 0, **changes}
+
+
+def test_compare_flags_sql_latency_and_errors():
+    baseline = {'home': result(), 'cart': result(), 'fast': result(p50_ms=0.4, p99_ms=0.8)}
+
+    assert benchmark.compare({'home': result(p50_ms=12.0, p99_ms=29.0)}, baseline, 0.25) == []
+    assert benchmark.compare({'fast': result(p50_ms=1.2, p99_ms=1.6)}, baseline, 0.25) == []
+    assert benchmark.compare({'new': result(sql_per_request=9)}, baseline, 0.25) == []
+    assert benchmark.compare({
+        'home': result(sql_per_request=2.0),
+        'cart': result(p50_ms=13.0, p99_ms=31.0, errors=1),
+    }, baseline, 0.25) == [
+        'home: 2.0 SQL/request (baseline 1.0)',
+        'cart: p50_ms 13.0 (baseline 10.0)',
+        'cart: p99_ms 31.0 (baseline 20.0)',
+        'cart: 1 error responses',
+    ]
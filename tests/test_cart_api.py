@@ -0,0 +1,96 @@
+import pytest
+
+import app as shop
+from conftest import add_products
+
+pytestmark = pytest.mark.usefixtures('app')
+
+
+@pytest.fixture
+def product_ids():
+    return add_products(3)
+
+
+def add(client, product_id, quantity=1, **headers):
+    return client.post('/api/v1/cart/items', json={'product_id': product_id, 'quantity': quantity}, headers=headers)
+
+
+def test_adding_a_new_line_is_201_and_adding_to_it_again_is_200(client, product_ids):
+    created = add(client, product_ids[0], 2)
+    assert created.status_code == 201
+    assert created.get_json()['line']['quantity'] == 2
+
+    updated = add(client, product_ids[0], 3)
+    assert updated.status_code == 200
+    assert updated.get_json()['line']['quantity'] == 5
+    assert updated.get_json()['summary']['count'] == 1
+
+    replaced = client.put(f'/api/v1/cart/items/{product_ids[0]}', json={'quantity': 1})
+    assert replaced.status_code == 200
+    assert client.put(f'/api/v1/cart/items/{product_ids[1]}', json={'quantity': 1}).status_code == 201
+
+
+@pytest.mark.parametrize('payload', [
+    {}, {'product_id': 'balloons'}, {'product_id': 1, 'quantity': 0}, {'product_id': 1, 'quantity': 'lots'},
+    {'product_id': 1, 'quantity': shop.MAX_CART_QUANTITY + 1},
+])
+def test_bad_payloads_are_400(client, payload):
+    response = client.post('/api/v1/cart/items', json=payload)
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+
+def test_unknown_products_are_404(client, product_ids):
+    assert add(client, 999999).status_code == 404
+    assert client.put('/api/v1/cart/items/999999', json={'quantity': 1}).status_code == 404
+    assert client.delete(f'/api/v1/cart/items/{product_ids[0]}').status_code == 404
+    assert client.get('/api/v1/cart').get_json()['items'] == []
+
+
+def test_stale_if_match_is_412_and_leaves_the_cart_alone(client, product_ids):
+    etag = add(client, product_ids[0]).headers['ETag']
+    add(client, product_ids[1])
+
+    stale = add(client, product_ids[2], **{'If-Match': etag})
+    assert stale.status_code == 412
+    assert client.patch('/api/v1/cart', json={'items': {str(product_ids[0]): 4}},
+                        headers={'If-Match': etag}).status_code == 412
+    assert [line['product_id'] for line in client.get('/api/v1/cart').get_json()['items']] == product_ids[:2]
+
+    current = client.get('/api/v1/cart').headers['ETag']
+    assert add(client, product_ids[2], **{'If-Match': current}).status_code == 201
+
+
+def test_unchanged_cart_revalidates_with_304(client, product_ids):
+    add(client, product_ids[0])
+    first = client.get('/api/v1/cart')
+    assert client.get('/api/v1/cart', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+    assert client.get('/api/v1/cart/summary', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+    add(client, product_ids[0])
+    assert client.get('/api/v1/cart', headers={'If-None-Match': first.headers['ETag']}).status_code == 200
+
+
+def test_bulk_patch_changes_several_lines_at_once(client, product_ids):
+    add(client, product_ids[0], 1)
+    add(client, product_ids[1], 1)
+
+    response = client.patch('/api/v1/cart', json={'items': {
+        str(product_ids[0]): 0, str(product_ids[1]): 4, str(product_ids[2]): 2,
+    }})
+
+    assert response.status_code == 200
+    assert {line['product_id']: line['quantity'] for line in response.get_json()['lines']} == {
+        product_ids[0]: 0, product_ids[1]: 4, product_ids[2]: 2,
+    }
+    items = client.get('/api/v1/cart').get_json()['items']
+    assert {line['product_id']: line['quantity'] for line in items} == {product_ids[1]: 4, product_ids[2]: 2}
+    assert response.get_json()['summary']['count'] == 2
+
+
+def test_bulk_patch_is_all_or_nothing(client, product_ids):
+    add(client, product_ids[0], 1)
+    response = client.patch('/api/v1/cart', json={'items': {str(product_ids[0]): 3, '999999': 1}})
+    assert response.status_code == 404
+    assert client.patch('/api/v1/cart', json={'items': {}}).status_code == 400
+    assert client.get('/api/v1/cart').get_json()['items'][0]['quantity'] == 1
@@ -0,0 +1,24 @@
+import pytest
+
+from conftest import add_products
+
+
+def fresh_get(app, client, url):
+    # A new app context per request, so nothing memoized on g carries over
+    with app.app_context():
+        return client.get(url)
+
+
+@pytest.mark.parametrize('lines', [1, 30])
+@pytest.mark.parametrize('url', ['/cart', '/checkout'])
+def test_cart_pages_price_every_line_with_one_query(app, client, statements, lines, url):
+    product_ids = add_products(lines)
+    client.patch('/api/v1/cart', json={'items': {str(product_id): 2 for product_id in product_ids}})
+    statements.clear()
+
+    response = fresh_get(app, client, url)
+
+    assert response.status_code == 200
+    assert f'Extra {lines - 1}' in response.get_data(as_text=True)
+    assert len(statements) == 1, statements
+    assert 'FROM product' in statements[0] and ' IN (' in statements[0]
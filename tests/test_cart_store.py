@@ -0,0 +1,61 @@
+import pytest
+
+import app as shop
+from conftest import add_products
+
+
+@pytest.fixture(params=['sqlite', 'file'])
+def backend(request, app, tmp_path):
+    app.config['CART_BACKEND'] = request.param
+    app.config['CART_STORE_PATH'] = str(tmp_path / f'carts-{request.param}')
+    shop.cart_store.init_app(app)
+    return request.param
+
+
+def session_of(app, client):
+    cookie = client.get_cookie('session')
+    return app.session_interface.get_signing_serializer(app).loads(cookie.value)
+
+
+def cart_lines(client):
+    return {line['product_id']: line['quantity'] for line in client.get('/api/v1/cart').get_json()['items']}
+
+
+def test_session_cookie_carries_only_the_cart_id(app, client, backend):
+    product_ids = add_products(30)
+    client.patch('/api/v1/cart', json={'items': {str(product_id): 5 for product_id in product_ids}})
+
+    assert list(session_of(app, client)) == ['cart_id']
+    assert len(client.get_cookie('session').value) < 120
+
+
+def test_cart_survives_across_requests_and_restarts(app, client, backend):
+    product_ids = add_products(3)
+    client.post('/api/v1/cart/items', json={'product_id': product_ids[0], 'quantity': 2})
+    client.post('/api/v1/cart/items', json={'product_id': product_ids[1]})
+    assert cart_lines(client) == {product_ids[0]: 2, product_ids[1]: 1}
+
+    shop.cart_store.init_app(app)  # a restarted worker reopens the store
+    client.put(f'/api/v1/cart/items/{product_ids[1]}', json={'quantity': 0})
+
+    assert cart_lines(client) == {product_ids[0]: 2}
+    assert shop.cart_store.load(session_of(app, client)['cart_id'])[0] == {product_ids[0]: 2}
+
+
+def test_emptied_cart_is_removed_from_the_store(app, client, backend):
+    product_id = add_products(1)[0]
+    client.post('/api/v1/cart/items', json={'product_id': product_id})
+    cart_id = session_of(app, client)['cart_id']
+
+    client.delete(f'/api/v1/cart/items/{product_id}')
+
+    assert shop.cart_store.backend.get(shop.cart_store.prefix + cart_id) is None
+
+
+def test_carts_from_the_old_cookie_move_to_the_store(app, client, backend):
+    product_id = add_products(1)[0]
+    with client.session_transaction() as session:
+        session['cart'] = {str(product_id): 3}
+
+    assert cart_lines(client) == {product_id: 3}
+    assert list(session_of(app, client)) == ['cart_id']
@@ -0,0 +1,57 @@
+import re
+
+import app as shop
+from conftest import add_products
+
+
+def product_queries(statements):
+    return [statement for statement in statements if re.search(r'FROM product\b', statement)]
+
+
+def stored_summary(app, client):
+    cookie = client.get_cookie('session')
+    cart_id = app.session_interface.get_signing_serializer(app).loads(cookie.value)['cart_id']
+    return shop.cart_store.load(cart_id)[1]
+
+
+def test_summary_is_reused_until_the_cart_changes(app, client, statements):
+    first, second = add_products(2)
+    client.post('/api/v1/cart/items', json={'product_id': first, 'quantity': 2})
+    cached = stored_summary(app, client)
+    assert cached['count'] == 1 and cached['subtotal'] == 20
+
+    # A price change alone does not reprice the cart summary; the next cart change does
+    shop.db.session.get(shop.Product, first).price = 15
+    shop.db.session.commit()
+    shop.product_changed(first)
+    statements.clear()
+    for _ in range(3):
+        assert client.get('/api/v1/cart/summary').get_json()['summary'] == cached
+    assert product_queries(statements) == []
+
+    client.post('/api/v1/cart/items', json={'product_id': second, 'quantity': 1})
+    assert stored_summary(app, client)['subtotal'] == 2 * 15 + 11
+
+
+def test_form_updates_drop_the_cached_summary(app, client):
+    product_id = add_products(1)[0]
+    client.post('/api/v1/cart/items', json={'product_id': product_id})
+    assert stored_summary(app, client) is not None
+
+    client.post(f'/update_cart/{product_id}', data={'quantity': 4})
+
+    assert stored_summary(app, client) is None
+    assert client.get('/api/v1/cart/summary').get_json()['summary']['subtotal'] == 40
+    assert stored_summary(app, client)['subtotal'] == 40
+
+
+def test_cart_badge_comes_from_the_cached_summary(app, client, statements):
+    product_ids = add_products(2)
+    client.patch('/api/v1/cart', json={'items': {str(product_id): 1 for product_id in product_ids}})
+    statements.clear()
+
+    page = client.get('/products').get_data(as_text=True)
+
+    assert re.search(r'class="badge bg-danger cart-count">2<', page)
+    assert product_queries(statements) == []
+    assert client.get('/api/cart_count').get_json() == {'count': 2}
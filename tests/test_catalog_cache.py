@@ -0,0 +1,60 @@
+import logging
+
+from catalog_cache import CatalogCache, VersionFile
+
+
+class Loader:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return [], []
+
+
+def test_workers_sharing_a_version_file_agree_on_the_version(tmp_path):
+    path = str(tmp_path / 'catalog.version')
+    a, b = CatalogCache(Loader(), path), CatalogCache(Loader(), path)
+    a.get(), b.get()
+    before = a.version
+
+    a.bump()
+
+    assert a.version == b.version != before
+
+
+def test_bump_reloads_the_catalog_in_other_workers(tmp_path):
+    path = str(tmp_path / 'catalog.version')
+    loader_b = Loader()
+    a, b = CatalogCache(Loader(), path), CatalogCache(loader_b, path)
+    b.get()
+    b.get()
+    assert loader_b.calls == 1
+
+    a.bump()
+    b.get()
+
+    assert loader_b.calls == 2
+
+
+def test_quick_successive_bumps_are_all_seen(tmp_path):
+    version_file = VersionFile(str(tmp_path / 'catalog.version'))
+    seen = set()
+    for _ in range(20):
+        version_file.bump()
+        seen.add(version_file.read())
+    assert len(seen) == 20
+
+
+def test_failed_write_is_logged_and_the_local_catalog_still_reloads(tmp_path, caplog):
+    (tmp_path / 'not-a-directory').write_text('')
+    loader = Loader()
+    cache = CatalogCache(loader, str(tmp_path / 'not-a-directory' / 'catalog.version'))
+    cache.get()
+
+    with caplog.at_level(logging.ERROR, logger='catalog_cache'):
+        cache.bump()
+    cache.get()
+
+    assert 'Could not write' in caplog.text
+    assert loader.calls == 2
@@ -0,0 +1,90 @@
+import io
+import json
+
+import pytest
+
+import app as shop
+from catalog_io import ProductImporter, iter_json_array, read_records
+
+pytestmark = pytest.mark.usefixtures('app')
+
+
+def importer(**options):
+    return ProductImporter(shop.db, shop.Product, shop.Category, **options)
+
+
+def records(*rows):
+    return list(enumerate(rows, 1))
+
+
+def test_reads_csv_json_and_json_lines():
+    csv_file = io.StringIO('name,price\nBanner,10\n')
+    assert list(read_records(csv_file, 'csv')) == [(2, {'name': 'Banner', 'price': '10'})]
+    assert list(read_records(io.StringIO('{"a": 1}\n\n{"a": 2}\n'), 'jsonl')) == [(1, {'a': 1}), (3, {'a': 2})]
+    for chunk_size in (1, 2, 3, 64):
+        assert list(iter_json_array(io.StringIO('[1, {"b": [2]}, 3.5, -12e3]'), chunk_size)) == [1, {'b': [2]}, 3.5, -12e3]
+
+
+def test_invalid_rows_are_reported_and_the_rest_imported():
+    report = importer().run(records({'name': 'Banner', 'price': 12},
+                                    {'name': 'Lantern', 'price': 'cheap'},
+                                    {'price': 3}))
+    assert (report.inserted, report.error_count) == (1, 2)
+    assert shop.Product.query.filter_by(name_en='Banner').count() == 1
+
+
+def test_repeated_new_ids_in_one_batch_are_written_once_last_fields_winning():
+    report = importer().run(records({'id': 500, 'name': 'Banner', 'price': 12, 'stock': 3},
+                                    {'id': 500, 'price': 15}))
+    product = shop.db.session.get(shop.Product, 500)
+    assert (report.inserted, report.error_count) == (1, 0)
+    assert (product.name_en, product.price, product.stock) == ('Banner', 15, 3)
+
+
+@pytest.fixture
+def failing_insert():
+    """Make inserting a product called 'Boom' violate a constraint"""
+    with shop.db.engine.begin() as connection:
+        connection.exec_driver_sql("CREATE TRIGGER boom BEFORE INSERT ON product WHEN NEW.name_en = 'Boom' "
+                                   "BEGIN SELECT RAISE(ABORT, 'boom'); END")
+
+
+def test_a_batch_that_violates_a_constraint_is_rolled_back_and_reported(failing_insert):
+    report = importer(batch_size=2).run(records(
+        {'name': 'Banner', 'price': 12},
+        {'name': 'Lantern', 'price': 8},
+        {'name': 'Boom', 'price': 1},
+        {'name': 'Garland', 'price': 5, 'category': 'Fresh Picks'},
+        {'name': 'Confetti', 'price': 2, 'category': 'Fresh Picks'},
+    ))
+
+    assert (report.inserted, report.error_count, report.categories_created) == (3, 2, 1)
+    assert report.errors[0][0] == '3-4'
+    confetti = shop.Product.query.filter_by(name_en='Confetti').one()
+    assert shop.db.session.get(shop.Category, confetti.category_id).name_en == 'Fresh Picks'
+    assert shop.Product.query.filter_by(name_en='Garland').count() == 0
+
+
+def test_dry_run_writes_nothing_and_counts_each_new_category_once():
+    categories = shop.Category.query.count()
+    report = importer(batch_size=1).run(records(
+        {'name': 'Garland', 'price': 5, 'category': 'Fresh Picks'},
+        {'name': 'Confetti', 'price': 2, 'category': 'Fresh Picks'},
+    ), dry_run=True)
+
+    assert (report.inserted, report.categories_created) == (2, 1)
+    assert shop.Category.query.count() == categories
+    assert shop.Product.query.filter_by(name_en='Garland').count() == 0
+
+
+def test_cli_import_refreshes_the_catalog_even_when_a_batch_fails(app, client, tmp_path, failing_insert):
+    client.get('/products')
+    path = tmp_path / 'products.jsonl'
+    path.write_text('\n'.join(json.dumps(row) for row in (
+        {'id': 900, 'name': 'Banner', 'price': 12}, {'id': 900, 'price': 13}, {'name': 'Boom', 'price': 1})))
+
+    result = app.test_cli_runner().invoke(args=['import-products', str(path), '--batch-size', '2'])
+
+    assert 'batch rolled back' in result.output
+    assert '1 inserted' in result.output
+    assert 'Banner' in client.get('/products').get_data(as_text=True)
@@ -0,0 +1,50 @@
+import app as shop
+from conftest import CHECKOUT
+
+
+def product_named(name):
+    return shop.Product.query.filter_by(name_en=name).one()
+
+
+def test_checkout_redirects_to_a_confirmation_that_survives_a_refresh(app, client):
+    product = product_named('Balloon Garland Kit')
+    client.get(f'/add_to_cart/{product.id}')
+    client.get(f'/add_to_cart/{product.id}')
+
+    response = client.post('/checkout', data=CHECKOUT)
+    assert response.status_code == 302
+    confirmation = response.headers['Location']
+
+    order = shop.Order.query.one()
+    assert confirmation.endswith(f'/order_confirmation/{order.id}')
+    for _ in range(2):
+        page = client.get(confirmation)
+        assert page.status_code == 200
+        assert order.order_number in page.get_data(as_text=True)
+
+    shop.db.session.refresh(product)
+    assert product.stock == 28
+    assert [message['To'] for message in shop.get_mail_sink().outbox] == ['salma@example.com', 'admin@partyyacout.com']
+    assert client.get('/cart').status_code == 200
+    assert shop.Order.query.count() == 1
+
+
+def test_other_visitors_cannot_see_a_guest_order(app, client):
+    product = product_named('Balloon Garland Kit')
+    client.get(f'/add_to_cart/{product.id}')
+    confirmation = client.post('/checkout', data=CHECKOUT).headers['Location']
+
+    assert app.test_client().get(confirmation).status_code == 404
+
+
+def test_checkout_never_oversells(app, client):
+    product = product_named('Balloon Garland Kit')
+    client.get(f'/add_to_cart/{product.id}')
+    client.post(f'/update_cart/{product.id}', data={'quantity': 31})
+
+    response = client.post('/checkout', data=CHECKOUT)
+
+    assert response.headers['Location'].endswith('/cart')
+    assert shop.Order.query.count() == 0
+    shop.db.session.refresh(product)
+    assert product.stock == 30
@@ -0,0 +1,39 @@
+from flask import Flask
+
+import app as shop
+from db_config import configure_database
+
+
+def engine_options(uri):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    configure_database(app)
+    return app.config['SQLALCHEMY_ENGINE_OPTIONS']
+
+
+def test_connections_use_wal_and_a_busy_timeout(app):
+    with shop.db.engine.connect() as connection:
+        pragma = lambda name: connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+        assert pragma('journal_mode') == 'wal'
+        assert pragma('busy_timeout') == 5000
+        assert pragma('synchronous') == 1  # NORMAL
+        assert pragma('cache_size') == -20000
+
+
+def test_sqlite_files_are_pooled_without_pings_or_recycling():
+    options = engine_options('sqlite:////tmp/shop.db')
+    assert options['pool_size'] == 5 and options['connect_args'] == {'timeout': 5.0}
+    assert 'pool_pre_ping' not in options and 'pool_recycle' not in options
+
+    options = engine_options('postgresql://shop@db/shop')
+    assert options['pool_pre_ping'] is True and options['pool_recycle'] == 3600
+
+    assert 'pool_size' not in engine_options('sqlite://')
+
+
+def test_database_uri_comes_from_the_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv('SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'env.db'}")
+    app = Flask(__name__)
+    configure_database(app)
+    assert app.config['SQLALCHEMY_DATABASE_URI'] == f"sqlite:///{tmp_path / 'env.db'}"
+
@@ -0,0 +1,45 @@
+import app as shop
+from fragment_cache import FragmentCache
+
+
+def test_renders_once_per_key():
+    cache = FragmentCache()
+    renders = []
+    for _ in range(3):
+        cache.get_or_render(('card', 1), lambda: renders.append(1) or '<b>card</b>')
+    assert len(renders) == 1
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_evicts_least_recently_used_fragments_past_the_byte_budget():
+    cache = FragmentCache(max_bytes=10)
+    cache.get_or_render('a', lambda: 'aaaa')
+    cache.get_or_render('b', lambda: 'bbbb')
+    cache.get_or_render('a', lambda: 'aaaa')
+    cache.get_or_render('c', lambda: 'cccc')
+    assert len(cache) == 2
+    assert cache.get_or_render('b', lambda: 'rendered again') == 'rendered again'
+
+
+def test_invalidate_drops_matching_keys():
+    cache = FragmentCache()
+    cache.get_or_render((1, 'en'), lambda: 'one')
+    cache.get_or_render((2, 'en'), lambda: 'two')
+    cache.invalidate(lambda key: key[0] == 1)
+    assert len(cache) == 1
+
+
+def test_product_cards_are_shared_across_pages_and_follow_locale_and_edits(client):
+    client.get('/products')
+    misses = shop.fragment_cache.misses
+    client.get('/products?per_page=50')
+    assert shop.fragment_cache.misses == misses
+
+    client.get('/change_language/fr')
+    assert "Kit de guirlande de ballons" in client.get('/products').get_data(as_text=True)
+
+    product = shop.Product.query.filter_by(name_en='Balloon Garland Kit').one()
+    product.price = 99.5
+    shop.db.session.commit()
+    shop.product_changed(product.id)
+    assert '99.50' in client.get('/products').get_data(as_text=True)
@@ -0,0 +1,70 @@
+import app as shop
+from conftest import CHECKOUT
+
+
+def stock_of(client, product_id):
+    products = client.get('/products?format=json').get_json()['products']
+    return next(product['stock'] for product in products if product['id'] == product_id)
+
+
+def test_stock_sold_through_orders_reaches_new_visitors_after_the_ttl(app):
+    shop.catalog_cache.ttl = 0
+    shop.http_cache.page_cache = True
+    product = shop.Product.query.filter_by(name_en='Birthday Party Set').one()
+    visitor = app.test_client()
+    first = visitor.get('/products?format=json')
+    assert stock_of(visitor, product.id) == 50
+
+    buyer = app.test_client()
+    buyer.get(f'/add_to_cart/{product.id}')
+    buyer.post(f'/update_cart/{product.id}', data={'quantity': 48})
+    assert buyer.post('/checkout', data=CHECKOUT).status_code == 302
+
+    assert stock_of(app.test_client(), product.id) == 2
+    revalidated = visitor.get('/products?format=json', headers={'If-None-Match': first.headers['ETag']})
+    assert revalidated.status_code == 200
+    assert revalidated.headers['ETag'] != first.headers['ETag']
+
+
+def test_unchanged_catalog_revalidates_with_304(client):
+    first = client.get('/products')
+    again = client.get('/products', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+
+
+def test_workers_sharing_a_catalog_agree_on_etags(app, client):
+    etag = client.get('/products').headers['ETag']
+    shop.catalog_cache.init_app(app)  # a freshly started worker
+    assert client.get('/products').headers['ETag'] == etag
+
+    shop.product_changed()
+    assert client.get('/products').headers['ETag'] == etag
+
+
+def test_weak_validators_revalidate_with_304(client):
+    etag = client.get('/products').headers['ETag']
+    again = client.get('/products', headers={'If-None-Match': f'W/{etag}'})
+    assert again.status_code == 304
+
+
+def test_inactive_product_pages_are_not_revalidated_against_the_catalog(app, client):
+    product = shop.Product.query.filter_by(name_en='Birthday Party Set').one()
+    product.is_active = False
+    shop.db.session.commit()
+    shop.product_changed(product.id)
+    first = client.get(f'/product/{product.id}')
+    assert first.status_code == 200
+    assert 'ETag' not in first.headers
+
+    product.description_en = 'Now with twice the confetti'
+    shop.db.session.commit()
+    again = client.get(f'/product/{product.id}', headers={'If-None-Match': '"anything"'})
+    assert again.status_code == 200
+    assert 'twice the confetti' in again.get_data(as_text=True)
+
+
+def test_active_product_pages_keep_their_etag(client):
+    product = shop.Product.query.filter_by(name_en='Birthday Party Set').one()
+    first = client.get(f'/product/{product.id}')
+    again = client.get(f'/product/{product.id}', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
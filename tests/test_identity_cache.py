@@ -0,0 +1,76 @@
+import pytest
+
+import app as shop
+from conftest import log_in
+from identity_cache import IdentityCache
+
+
+def fresh_get(app, client, url):
+    # A new app context, so Flask-Login loads the user again instead of reusing g
+    with app.app_context():
+        return client.get(url)
+
+
+def user_selects(statements):
+    return [statement for statement in statements if 'FROM user' in statement]
+
+
+@pytest.fixture
+def customer(app):
+    user = shop.User(username='amina', email='amina@example.com', password='secret', first_name='Amina')
+    shop.db.session.add(user)
+    shop.db.session.commit()
+    return user.id
+
+
+def test_warm_cache_serves_logged_in_browsing_without_user_queries(app, client, customer, statements):
+    log_in(client, 'amina@example.com', 'secret')
+    fresh_get(app, client, '/')
+    statements.clear()
+
+    for url in ('/', '/products', '/cart', '/profile', f'/product/{shop.Product.query.first().id}'):
+        assert fresh_get(app, client, url).status_code == 200
+
+    assert user_selects(statements) == []
+
+
+def test_committed_changes_invalidate_other_workers(app, client, customer):
+    log_in(client, 'amina@example.com', 'secret')
+    # Another worker's cache: same version file, its own entries
+    other = IdentityCache(shop.load_identity, shop.identity_cache.version_file.path)
+    assert other.get(customer).is_admin is False
+    assert shop.load_user(customer).first_name == 'Amina'
+
+    user = shop.db.session.get(shop.User, customer)
+    user.is_admin = True
+    user.first_name = 'Amina B.'
+    shop.db.session.commit()
+
+    assert other.get(customer).is_admin is True
+    assert shop.load_user(customer).first_name == 'Amina B.'
+    assert fresh_get(app, client, '/admin').status_code == 200
+
+
+def test_rolled_back_changes_keep_the_cache(app, customer):
+    other = IdentityCache(shop.load_identity, shop.identity_cache.version_file.path)
+    cached = other.get(customer)
+
+    shop.db.session.get(shop.User, customer).is_admin = True
+    shop.db.session.flush()
+    shop.db.session.rollback()
+
+    assert other.get(customer) is cached
+
+
+def test_deleted_users_are_not_served_from_the_cache(app, client, customer):
+    log_in(client, 'amina@example.com', 'secret')
+    assert fresh_get(app, client, '/profile').status_code == 200
+    other = IdentityCache(shop.load_identity, shop.identity_cache.version_file.path)
+    assert other.get(customer) is not None
+
+    shop.db.session.delete(shop.db.session.get(shop.User, customer))
+    shop.db.session.commit()
+
+    assert other.get(customer) is None
+    assert shop.load_user(customer) is None
+    assert fresh_get(app, client, '/profile').status_code == 302
@@ -0,0 +1,69 @@
+import io
+import re
+
+import pytest
+from PIL import Image
+
+import app as shop
+from image_pipeline import ImageError
+
+
+def png(width, height):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 30, 90)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def pipeline(app, tmp_path):
+    shop.image_pipeline.static_folder = str(tmp_path / 'static')
+    yield shop.image_pipeline
+    shop.image_pipeline.shutdown()
+
+
+def test_uploaded_image_is_stored_once_with_responsive_variants(admin_client, pipeline, tmp_path):
+    category = shop.Category.query.first()
+    response = admin_client.post('/admin/product/new', data={
+        'name_en': 'Piñata', 'price': 120, 'stock': 4, 'category_id': category.id,
+        'image_file': (io.BytesIO(png(1000, 500)), 'pinata.png'),
+    }, content_type='multipart/form-data')
+    assert response.status_code == 302
+
+    product = shop.Product.query.filter_by(name_en='Piñata').one()
+    assert re.fullmatch(r'/static/uploads/products/[0-9a-f]{20}/original\.png', product.image)
+    variants = shop.ProductImage.query.filter_by(product_id=product.id).order_by(
+        shop.ProductImage.format, shop.ProductImage.width).all()
+    assert [(v.format, v.width, v.height) for v in variants] == [
+        ('jpeg', 200, 100), ('jpeg', 400, 200), ('jpeg', 800, 400),
+        ('webp', 200, 100), ('webp', 400, 200), ('webp', 800, 400),
+    ]
+    for variant in variants:
+        with Image.open(tmp_path / 'static' / variant.path) as image:
+            assert image.size == (variant.width, variant.height)
+
+    page = admin_client.get(f'/product/{product.id}').get_data(as_text=True)
+    assert f'{variants[3].path} 200w' in page and f'{variants[2].path} 800w' in page
+
+
+def test_small_sources_are_not_upscaled(pipeline):
+    source = pipeline.store(png(300, 300))
+    assert pipeline.store(png(300, 300)) == source
+
+    variants = pipeline.generate(source)
+
+    assert sorted((v['format'], v['width']) for v in variants) == [
+        ('jpeg', 200), ('jpeg', 300), ('webp', 200), ('webp', 300)]
+
+
+def test_non_images_are_rejected(admin_client, pipeline):
+    with pytest.raises(ImageError):
+        pipeline.store(b'<svg onload="alert(1)">')
+    with pytest.raises(ImageError):
+        pipeline.fetch('file:///etc/passwd')
+
+    response = admin_client.post('/admin/product/new', data={
+        'name_en': 'Fake', 'price': 5, 'stock': 1, 'category_id': shop.Category.query.first().id,
+        'image_file': (io.BytesIO(b'GIF87 not really'), 'fake.gif'),
+    }, content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert shop.Product.query.filter_by(name_en='Fake').count() == 0
@@ -0,0 +1,61 @@
+import logging
+import re
+
+import pytest
+
+import app as shop
+from conftest import log_in
+
+pytestmark = pytest.mark.app_config(INSTRUMENTATION_ENABLED=True, METRICS_TOKEN='scrape-me')
+
+SERVER_TIMING = re.compile(r'app;dur=[\d.]+, db;dur=[\d.]+;desc="(\d+) queries", '
+                           r'tpl;dur=[\d.]+;desc="(\d+) templates"(, locale;dur=[\d.]+)?$')
+
+
+@pytest.fixture
+def customer(app):
+    shop.db.session.add(shop.User(username='amina', email='amina@example.com', password='secret'))
+    shop.db.session.commit()
+
+
+def test_responses_carry_server_timing(client, statements):
+    for url, templates in (('/', True), ('/products', True), ('/api/v1/cart', False)):
+        statements.clear()
+        response = client.get(url)
+
+        match = SERVER_TIMING.match(response.headers['Server-Timing'])
+        assert match, response.headers['Server-Timing']
+        assert int(match.group(1)) == len(statements)
+        assert (int(match.group(2)) > 0) == templates
+
+
+def test_requests_are_logged_as_json_lines(client, caplog):
+    with caplog.at_level(logging.INFO, logger='instrumentation'):
+        client.get('/products')
+
+    assert '"endpoint": "products"' in caplog.text
+    assert '"sql_queries": ' in caplog.text
+
+
+@pytest.mark.parametrize('login', [None, ('amina@example.com', 'secret')])
+def test_metrics_are_forbidden_to_non_admins(client, customer, login):
+    if login:
+        log_in(client, *login)
+    assert client.get('/admin/metrics').status_code == 403
+    assert client.get('/admin/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 403
+
+
+def test_admins_and_scrapers_get_prometheus_text(admin_client):
+    admin_client.get('/products')
+    admin_client.get('/products')
+
+    response = admin_client.get('/admin/metrics')
+    assert response.status_code == 200
+    assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+    body = response.get_data(as_text=True)
+    assert '# TYPE http_request_duration_seconds histogram' in body
+    assert 'http_requests_total{endpoint="products",method="GET",status="200"} 2' in body
+    assert re.search(r'http_request_sql_queries_bucket\{endpoint="products",method="GET",le="\+Inf"\} 2', body)
+
+    admin_client.get('/logout')
+    assert admin_client.get('/admin/metrics', headers={'Authorization': 'Bearer scrape-me'}).status_code == 200
@@ -0,0 +1,53 @@
+import time
+
+import app as shop
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def job_status(job_id):
+    shop.db.session.rollback()
+    return shop.db.session.get(shop.Job, job_id).status
+
+
+def test_thread_mode_retries_a_failed_job_without_another_kick(app, monkeypatch):
+    app.config.update(JOB_QUEUE_MODE='thread', JOB_RETRY_BASE_DELAY=0.3)
+    calls = []
+
+    def flaky():
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise ConnectionError('mail server down')
+
+    monkeypatch.setitem(shop.job_queue.handlers, 'flaky', flaky)
+    job = shop.job_queue.enqueue('flaky')
+    shop.db.session.commit()
+    shop.job_queue.kick()
+
+    assert wait_for(lambda: job_status(job.id) == 'done')
+    assert len(calls) == 2
+    assert calls[1] - calls[0] >= 0.25
+
+
+def test_inline_mode_gives_up_after_max_attempts(app, monkeypatch):
+    app.config.update(JOB_MAX_ATTEMPTS=2, JOB_RETRY_BASE_DELAY=0)
+
+    def broken():
+        raise ValueError('bad payload')
+
+    monkeypatch.setitem(shop.job_queue.handlers, 'broken', broken)
+    job = shop.job_queue.enqueue('broken')
+    shop.db.session.commit()
+    shop.job_queue.kick()
+    shop.job_queue.kick()
+
+    job = shop.db.session.get(shop.Job, job.id)
+    assert (job.status, job.attempts) == ('failed', 2)
+    assert 'bad payload' in job.last_error
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+import app as shop
+from legacy_migration import LegacyMigrator
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    directory = tmp_path / 'data'
+    directory.mkdir()
+    files = {
+        'products.json': [
+            {'id': 3, 'name': 'ÉCLAIR Géant', 'price': 12.5, 'category': 'Pâtisserie', 'image': '⌨️', 'stock': 4},
+            {'id': 4, 'name': 'Lantern', 'price': 20, 'image': 'https://example.com/lantern.jpg',
+             'reviews': [{'rating': 5}]},
+            {'id': 5, 'name': 'éclair géant', 'price': 13},
+        ],
+        'users.json': [
+            {'id': 1, 'name': 'brahim', 'email': 'Brahim@Example.com', 'password': 'secret'},
+            {'id': 2, 'name': 'Administrator', 'email': 'brahim@example.com', 'password': 'x', 'is_admin': True},
+        ],
+        'orders.json': [
+            {'id': 7, 'user_id': 2, 'total': 25, 'status': 'Delivered',
+             'items': [{'product_id': 5, 'quantity': 2, 'price': 12.5}]},
+        ],
+        'wishlist.json': [{'user_id': 1, 'product_id': 3}],
+    }
+    for name, records in files.items():
+        (directory / name).write_text(json.dumps(records, ensure_ascii=False), encoding='utf-8')
+    return str(directory)
+
+
+def migrate(data_dir, **options):
+    migrator = LegacyMigrator(shop.db, shop.User, shop.Category, shop.Product, shop.Order, shop.OrderItem,
+                              data_dir, **options)
+    return {report.name: report for report in migrator.run()}
+
+
+def test_migrates_products_users_and_orders_with_their_links(app, data_dir):
+    reports = migrate(data_dir)
+
+    assert reports['products.json'].inserted == 2
+    assert reports['users.json'].inserted == 1
+    order = shop.Order.query.filter_by(order_number='LEGACY7').one()
+    eclair = shop.Product.query.filter_by(name_en='ÉCLAIR Géant').one()
+    assert order.user.email == 'brahim@example.com'
+    assert [(item.product_id, item.quantity) for item in order.order_items] == [(eclair.id, 2)]
+    assert any('wishlist' in message for _, message in reports['wishlist.json'].conflicts)
+
+
+def test_running_again_changes_nothing_even_for_non_ascii_names(app, data_dir):
+    migrate(data_dir, batch_size=1)
+    counts = (shop.Product.query.count(), shop.User.query.count(), shop.Order.query.count(),
+              shop.OrderItem.query.count(), shop.Category.query.count())
+
+    reports = migrate(data_dir, batch_size=1)
+
+    assert sum(report.inserted for report in reports.values()) == 0
+    assert reports['products.json'].existing == 3
+    assert (shop.Product.query.count(), shop.User.query.count(), shop.Order.query.count(),
+            shop.OrderItem.query.count(), shop.Category.query.count()) == counts
+
+
+def test_only_urls_and_static_paths_are_carried_as_images(app, data_dir):
+    reports = migrate(data_dir)
+
+    assert shop.Product.query.filter_by(name_en='ÉCLAIR Géant').one().image is None
+    assert shop.Product.query.filter_by(name_en='Lantern').one().image == 'https://example.com/lantern.jpg'
+    assert (3, "image '⌨️' is not a URL or static path; left empty") in reports['products.json'].conflicts
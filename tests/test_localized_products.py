@@ -0,0 +1,44 @@
+import pytest
+
+import app as shop
+from catalog_cache import LocalizedProduct
+from conftest import add_products
+
+
+@pytest.fixture
+def translated(app):
+    product = shop.Product.query.filter_by(name_en='Birthday Party Set').one()
+    product.name_fr, product.description_fr = 'Kit Anniversaire', None
+    shop.db.session.commit()
+    shop.product_changed(product.id)
+    return product.id
+
+
+def test_views_fall_back_to_english_and_are_built_once_per_catalog(translated):
+    catalog = shop.catalog_cache.get()
+    views = catalog.localized('fr')
+
+    view = views[translated]
+    assert isinstance(view, LocalizedProduct)
+    assert (view.name, view.description) == ('Kit Anniversaire', catalog.by_id[translated].description_en)
+    assert view.category == catalog.by_id[translated].category.name_fr
+    assert not hasattr(view, '__dict__')
+    assert catalog.localized('fr') is views
+    assert catalog.localized('ar') is not views
+
+    shop.product_changed(translated)
+    assert shop.catalog_cache.get().localized('fr') is not views
+
+
+def test_locale_is_resolved_once_per_request(client, translated, monkeypatch):
+    add_products(40)
+    resolved = []
+    monkeypatch.setattr(shop, 'record_phase', lambda name, seconds: resolved.append(name))
+    client.get('/change_language/fr')
+    resolved.clear()
+
+    page = client.get('/products?per_page=50').get_data(as_text=True)
+
+    assert resolved == ['locale']
+    assert 'Kit Anniversaire' in page
+    assert 'Extra 39' in page
@@ -0,0 +1,96 @@
+import re
+
+import app as shop
+from conftest import CHECKOUT
+
+
+def snapshot():
+    return (shop.metrics.totals(), sorted(map(tuple, shop.metrics.orders_by_status())),
+            sorted(map(tuple, shop.metrics.top_products())), shop.metrics.daily_range(3))
+
+
+def buy(client, product_name, quantity):
+    product = shop.Product.query.filter_by(name_en=product_name).one()
+    client.get(f'/add_to_cart/{product.id}')
+    client.post(f'/update_cart/{product.id}', data={'quantity': quantity})
+    assert client.post('/checkout', data=CHECKOUT).status_code == 302
+
+
+def test_incremental_rollups_match_a_full_rebuild(app, admin_client):
+    buy(admin_client, 'Balloon Garland Kit', 2)
+    buy(admin_client, 'Birthday Party Set', 1)
+    buy(admin_client, 'Balloon Garland Kit', 3)
+    cancelled = shop.Order.query.order_by(shop.Order.id).first()
+    response = admin_client.post(f'/admin/orders/update_status/{cancelled.id}', json={'status': 'Cancelled'})
+    assert response.get_json()['success']
+
+    incremental = snapshot()
+    shop.rebuild_metrics()
+
+    assert snapshot() == incremental
+    assert incremental[0]['orders'] == 3
+    assert incremental[0]['units'] == 4
+
+
+def test_rebuild_counts_orders_without_a_status_as_pending(app):
+    user = shop.User.query.first()
+    for number, status in (('A1', None), ('A2', 'pending'), ('A3', 'Shipped')):
+        shop.db.session.add(shop.Order(user_id=user.id, order_number=number, total_amount=10, status=status))
+    shop.db.session.commit()
+    shop.db.session.execute(shop.Order.__table__.update().where(shop.Order.order_number == 'A1').values(status=None))
+    shop.db.session.commit()
+
+    shop.rebuild_metrics()
+
+    assert dict(shop.metrics.orders_by_status()) == {'pending': 2, 'Shipped': 1}
+
+
+def test_dashboard_counts_inactive_products_too(admin_client):
+    shop.Product.query.filter_by(name_en='Balloon Garland Kit').one().is_active = False
+    shop.db.session.commit()
+    shop.product_changed()
+
+    page = admin_client.get('/admin').get_data(as_text=True)
+
+    assert re.search(r'Total Products\s*</div>\s*<div[^>]*>2</div>', page)
+
+
+def test_dashboard_reads_the_product_count_from_the_rollups(app, admin_client, statements):
+    admin_client.get('/admin')
+    statements.clear()
+
+    page = admin_client.get('/admin').get_data(as_text=True)
+
+    assert re.search(r'Total Products\s*</div>\s*<div[^>]*>2</div>', page)
+    assert not [statement for statement in statements if re.search(r'FROM product\b', statement)]
+    assert len(statements) == 4
+
+
+def test_product_count_follows_added_and_imported_products(app, admin_client, tmp_path):
+    category = shop.Category.query.first()
+    response = admin_client.post('/admin/product/new', data={
+        'name_en': 'Piñata', 'description_en': 'Star piñata', 'price': 120, 'stock': 4, 'category_id': category.id,
+    })
+    assert response.status_code == 302
+    assert shop.metrics.totals()['products'] == 3
+
+    path = tmp_path / 'products.jsonl'
+    path.write_text('{"name_en": "Confetti", "price": 15, "stock": 9}\n'
+                    '{"name_en": "Streamers", "price": 12, "stock": 3}\n', encoding='utf-8')
+    result = app.test_cli_runner().invoke(args=['import-products', str(path)])
+    assert result.exit_code == 0, result.output
+
+    incremental = shop.metrics.totals()
+    assert incremental['products'] == 5
+    shop.rebuild_metrics()
+    assert shop.metrics.totals() == incremental
+
+
+def test_migrate_rebuilds_rollups_missing_a_counter(app):
+    shop.db.session.execute(shop.MetricCounter.__table__.delete().where(shop.MetricCounter.name == 'products'))
+    shop.db.session.commit()
+    assert shop.metrics.totals()['products'] == 0
+
+    shop.migrate_database()
+
+    assert shop.metrics.totals()['products'] == 2
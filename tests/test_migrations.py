@@ -0,0 +1,48 @@
+import pytest
+
+import app as shop
+import synthetic_data
+from conftest import MODELS
+
+
+@pytest.fixture
+def seeded(app):
+    # Enough rows for ANALYZE to give the planner the statistics a real shop has
+    synthetic_data.seed(shop.db, MODELS, '1k')
+    shop.db.session.commit()
+    return app
+
+
+def declared_indexes():
+    return {(table.name, index.name) for table in shop.db.metadata.sorted_tables for index in table.indexes}
+
+
+def existing_indexes():
+    inspector = shop.db.inspect(shop.db.engine)
+    return {(table.name, index['name']) for table in shop.db.metadata.sorted_tables
+            for index in inspector.get_indexes(table.name)}
+
+
+def test_migrate_db_creates_missing_indexes(app):
+    with shop.db.engine.begin() as connection:
+        connection.exec_driver_sql('DROP INDEX ix_product_active_id')
+    assert ('product', 'ix_product_active_id') not in existing_indexes()
+
+    result = app.test_cli_runner().invoke(args=['migrate-db'])
+
+    assert result.exit_code == 0, result.output
+    assert 'Created index ix_product_active_id' in result.output
+    assert declared_indexes() <= existing_indexes()
+    assert 'Created index' not in app.test_cli_runner().invoke(args=['migrate-db']).output
+
+
+def test_main_queries_use_indexes(seeded):
+    result = seeded.test_cli_runner().invoke(args=['migrate-db', '--explain'])
+
+    assert result.exit_code == 0, result.output
+    assert 'full scan' not in result.output
+    plans = shop.explain_queries()
+    for name in ('catalog products', 'category products', 'admin products page'):
+        assert not any('TEMP B-TREE' in step for step in plans[name]), (name, plans[name])
+    assert plans['catalog products'] == ['SEARCH product USING INDEX ix_product_active_id (is_active=?)']
+    assert plans['admin products page'][0] == 'SEARCH product USING INTEGER PRIMARY KEY (rowid>?)'
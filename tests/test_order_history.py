@@ -0,0 +1,46 @@
+import pytest
+
+import app as shop
+from conftest import log_in
+
+
+def add_customer():
+    user = shop.User(username='customer', email='customer@example.com', password='secret')
+    shop.db.session.add(user)
+    shop.db.session.commit()
+    return user
+
+
+def add_orders(user, count):
+    products = shop.Product.query.all()
+    for _ in range(count):
+        order = shop.Order(user_id=user.id, order_number=shop.generate_order_number(),
+                           total_amount=sum(p.price for p in products), status='pending')
+        order.order_items = [shop.OrderItem(product_id=p.id, quantity=2, price=p.price) for p in products]
+        shop.db.session.add(order)
+    shop.db.session.commit()
+
+
+def statements_for(client, statements, url):
+    client.get(url)  # identity and catalog caches warm
+    statements.clear()
+    response = client.get(url)
+    assert response.status_code == 200
+    assert 'Balloon Garland Kit' in response.get_data(as_text=True)
+    return len(statements)
+
+
+@pytest.mark.parametrize('url, email, password', [
+    ('/profile', 'customer@example.com', 'secret'),
+    ('/admin/orders', 'admin@partyyacout.com', 'admin123'),
+])
+def test_order_history_statement_count_does_not_grow_with_orders(client, statements, url, email, password):
+    customer = add_customer()
+    log_in(client, email, password)
+
+    add_orders(customer, 1)
+    one_order = statements_for(client, statements, url)
+    add_orders(customer, 25)
+    many_orders = statements_for(client, statements, url)
+
+    assert one_order == many_orders
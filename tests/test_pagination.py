@@ -0,0 +1,31 @@
+import app as shop
+from conftest import add_products
+
+
+def test_storefront_pages_follow_the_cursor_and_keep_the_page_size(client):
+    add_products(3)
+    first = client.get('/products?per_page=2&format=json').get_json()
+    second = client.get(f"/products?per_page=2&format=json&cursor={first['next_cursor']}").get_json()
+
+    assert len(first['products']) == 2
+    assert second['products'][0]['id'] > first['products'][-1]['id']
+
+    page = client.get('/products?per_page=2').get_data(as_text=True)
+    assert f"per_page=2&amp;cursor={first['next_cursor']}" in page
+
+
+def test_admin_product_pages_render_and_keep_the_page_size(admin_client, statements):
+    add_products(3)
+    statements.clear()
+    response = admin_client.get('/admin/products?per_page=2')
+    page = response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert 'Complete birthday party package' in page
+    assert 'Birthday Parties' in page
+    assert 'per_page=2' in page
+    assert len([statement for statement in statements if 'FROM product' in statement]) == 1
+
+    products = shop.Product.query.order_by(shop.Product.id).all()
+    response = admin_client.get(f'/admin/products?per_page=2&cursor={products[1].id}')
+    assert f'<td>{products[2].id}</td>' in response.get_data(as_text=True)
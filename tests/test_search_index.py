@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+
+import app as shop
+from search_index import SearchIndex, normalize
+
+
+def product(product_id, name_en='', name_fr='', name_ar=''):
+    return SimpleNamespace(id=product_id, name_en=name_en, name_fr=name_fr, name_ar=name_ar)
+
+
+def build(*products):
+    index = SearchIndex()
+    index.sync(products, 1)
+    return index
+
+
+def test_normalize_folds_case_accents_and_arabic_variants():
+    assert normalize('ÉCLAIR Géant') == 'eclair geant'
+    assert normalize('أَلْعاب') == normalize('العاب')
+
+
+def test_matches_substrings_in_every_language():
+    index = build(product(1, 'Balloon Garland', 'Guirlande de ballons', 'إكليل البالونات'),
+                  product(2, 'Paper Plates', 'Assiettes en papier', 'أطباق ورقية'))
+    assert index.search('lloo') == [1]
+    assert index.search('guirlande') == [1]
+    assert index.search('بالون') == [1]
+    assert index.search('ap') == [2]
+    assert index.search('balloon plates') == []
+
+
+def test_exact_words_rank_before_prefixes_before_infixes():
+    index = build(product(1, 'Mega Confetti'), product(2, 'Confetti'), product(3, 'Confettis Box'),
+                  product(4, 'Superconfetti'))
+    assert index.search('confetti') == [2, 1, 3, 4]
+    assert index.search('confetti', limit=2) == [2, 1]
+
+
+def test_sync_reindexes_changed_products_and_drops_removed_ones():
+    index = build(product(1, 'Banner'), product(2, 'Lantern'))
+    index.sync([product(1, 'Gift Box')], 2)
+    assert index.search('banner') == []
+    assert index.search('lantern') == []
+    assert index.search('gift') == [1]
+
+
+def test_index_is_built_when_the_catalog_loads(app):
+    shop.catalog_cache.get()
+    assert len(shop.search_index) == shop.Product.query.filter_by(is_active=True).count()
+
+
+def test_suggestions_run_no_sql_once_the_catalog_is_loaded(client, statements):
+    client.get('/products')
+    statements.clear()
+    response = client.get('/search_suggestions?q=ballo')
+    assert response.status_code == 200
+    assert [s['name'] for s in response.get_json()] == ['Balloon Garland Kit']
+    assert statements == []
@@ -0,0 +1,24 @@
+import benchmark
+
+
+def test_worker_startup_is_within_budget(tmp_path, monkeypatch):
+    monkeypatch.setenv('SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'shop.db'}")
+    monkeypatch.setenv('CART_STORE_PATH', str(tmp_path / 'carts.db'))
+
+    result = benchmark.measure_startup(runs=3)
+
+    assert result['sql'] == 0, 'create_app() must not touch the database'
+    assert result['import_ms'] <= benchmark.IMPORT_BUDGET_MS, result
+    assert result['create_app_ms'] <= benchmark.CREATE_APP_BUDGET_MS, result
+    assert not benchmark.startup_failures(result)
+
+
+def test_startup_failures_name_each_budget():
+    result = {'import_ms': benchmark.IMPORT_BUDGET_MS + 1, 'create_app_ms': benchmark.CREATE_APP_BUDGET_MS + 1,
+              'sql': 2}
+
+    assert benchmark.startup_failures(result) == [
+        f"import app took {benchmark.IMPORT_BUDGET_MS + 1} ms",
+        f"create_app() took {benchmark.CREATE_APP_BUDGET_MS + 1} ms",
+        'create_app() ran 2 SQL statements; startup must not touch the database',
+    ]
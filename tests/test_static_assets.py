@@ -0,0 +1,62 @@
+import gzip
+import logging
+
+import brotli
+import pytest
+from flask import Flask, url_for
+
+import static_assets
+from static_assets import StaticAssets, build_assets, minify_js
+
+
+@pytest.fixture
+def static_folder(tmp_path):
+    folder = tmp_path / 'static'
+    (folder / 'js').mkdir(parents=True)
+    (folder / 'js' / 'script.js').write_text('/* setup */ init();\n// done\n', encoding='utf-8')
+    (folder / 'style.css').write_text('body {\n  color: red;\n}\n', encoding='utf-8')
+    return folder
+
+
+def test_minify_js_keeps_code_after_a_closing_comment():
+    source = '/* x */ init();\n  /* a\n   b */ go();\n/** doc\n */\nvar a = 1; // note\n/* one *//* two */ last();\n'
+    assert minify_js(source) == 'init();\ngo();\nvar a = 1; // note\nlast();'
+
+
+def test_build_writes_gzip_and_brotli_siblings(static_folder):
+    manifest = build_assets(str(static_folder))
+
+    for logical, minified in (('js/script.js', b'init();'), ('style.css', b'body{color:red}')):
+        built = static_folder / manifest[logical]
+        assert built.read_bytes() == minified
+        assert gzip.decompress((static_folder / (manifest[logical] + '.gz')).read_bytes()) == minified
+        assert brotli.decompress((static_folder / (manifest[logical] + '.br')).read_bytes()) == minified
+
+
+def test_build_without_brotli_logs_and_writes_gzip_only(static_folder, monkeypatch, caplog):
+    monkeypatch.setattr(static_assets, 'brotli', None)
+
+    with caplog.at_level(logging.WARNING, logger='static_assets'):
+        manifest = build_assets(str(static_folder))
+
+    built = static_folder / manifest['js/script.js']
+    assert (static_folder / (manifest['js/script.js'] + '.gz')).exists()
+    assert not (static_folder / (manifest['js/script.js'] + '.br')).exists()
+    assert built.exists()
+    assert 'brotli is not installed' in caplog.text
+
+
+@pytest.mark.parametrize('accept, encoding', [('br, gzip', 'br'), ('gzip', 'gzip'), ('identity', None)])
+def test_built_assets_are_served_precompressed(static_folder, accept, encoding):
+    build_assets(str(static_folder))
+    app = Flask(__name__, static_folder=str(static_folder))
+    StaticAssets(app)
+    with app.test_request_context():
+        url = url_for('static', filename='js/script.js')
+
+    response = app.test_client().get(url, headers={'Accept-Encoding': accept})
+
+    assert response.headers.get('Content-Encoding') == encoding
+    assert response.headers['Cache-Control'] == static_assets.IMMUTABLE
+    body = response.get_data()
+    assert {'br': brotli.decompress, 'gzip': gzip.decompress, None: bytes}[encoding](body) == b'init();'
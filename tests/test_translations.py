@@ -0,0 +1,93 @@
+import json
+import logging
+
+import pytest
+
+import app as shop
+import translations
+from translations import TranslationCatalogs, fallback_chain
+
+
+def write(directory, lang, strings):
+    (directory / f'{lang}.json').write_text(json.dumps(strings, ensure_ascii=False), encoding='utf-8')
+
+
+@pytest.fixture
+def catalogs(tmp_path):
+    write(tmp_path, 'en', {'home': 'Home', 'cart': 'Cart'})
+    write(tmp_path, 'fr', {'home': 'Accueil'})
+    write(tmp_path, 'ar', {'cart': 'السلة'})
+    return TranslationCatalogs(str(tmp_path), auto_reload=True, check_interval=0)
+
+
+def no_disk(*args):
+    raise AssertionError('translation lookups must not touch the filesystem')
+
+
+def test_fallback_chain():
+    assert fallback_chain('fr') == ('fr', 'en')
+    assert fallback_chain('fr-CA') == ('fr-CA', 'fr', 'en')
+    assert fallback_chain('en') == ('en',)
+
+
+def test_missing_keys_fall_back_to_english(catalogs):
+    assert catalogs.languages == ('ar', 'en', 'fr')
+    assert dict(catalogs.catalog('fr')) == {'home': 'Accueil', 'cart': 'Cart'}
+    assert dict(catalogs.catalog('ar')) == {'home': 'Home', 'cart': 'السلة'}
+    assert catalogs.catalog('fr-CA') is catalogs.catalog('fr')
+    assert catalogs.catalog('de') is catalogs.catalog('en')
+    assert catalogs.gettext('missing', 'fr') == 'missing'
+    with pytest.raises(TypeError):
+        catalogs.catalog('fr')['home'] = 'Maison'
+
+
+def test_lookups_do_not_touch_the_filesystem(catalogs, monkeypatch):
+    catalogs.auto_reload = False
+    catalogs.reload()
+    monkeypatch.setattr(TranslationCatalogs, '_stamps', no_disk)
+    monkeypatch.setattr(TranslationCatalogs, '_compile', no_disk)
+
+    assert catalogs.gettext('home', 'fr') == 'Accueil'
+    assert catalogs.languages == ('ar', 'en', 'fr')
+
+
+def test_changed_file_is_recompiled(catalogs, tmp_path):
+    assert catalogs.gettext('cart', 'fr') == 'Cart'
+
+    write(tmp_path, 'fr', {'home': 'Accueil', 'cart': 'Panier'})
+    write(tmp_path, 'es', {'home': 'Inicio'})
+
+    assert catalogs.gettext('cart', 'fr') == 'Panier'
+    assert catalogs.gettext('cart', 'es') == 'Cart'
+    assert catalogs.languages == ('ar', 'en', 'es', 'fr')
+
+
+def test_broken_file_keeps_the_previous_catalogs(catalogs, tmp_path, caplog):
+    previous = catalogs.catalog('fr')
+    (tmp_path / 'fr.json').write_text('{"home": "Accueil",', encoding='utf-8')
+
+    with caplog.at_level(logging.ERROR, logger='translations'):
+        assert catalogs.catalog('fr') is previous
+        # Not recompiled again until the file changes once more
+        assert catalogs.catalog('fr') is previous
+    assert len(caplog.records) == 1
+
+    write(tmp_path, 'fr', {'home': 'Maison'})
+    assert catalogs.gettext('home', 'fr') == 'Maison'
+
+
+def test_module_helpers_use_the_shared_catalogs():
+    assert translations.get_available_languages() == list(translations.catalogs.languages)
+    assert translations.load_translations('fr') is translations.catalogs.catalog('fr')
+    assert {'en', 'fr', 'ar'} <= set(translations.get_available_languages())
+
+
+def test_language_switch_renders_without_reading_files(client, monkeypatch):
+    monkeypatch.setattr(translations.catalogs, 'auto_reload', False)
+    monkeypatch.setattr(TranslationCatalogs, '_stamps', no_disk)
+    monkeypatch.setattr(TranslationCatalogs, '_compile', no_disk)
+
+    assert client.get('/change_language/fr').status_code == 302
+    with client:
+        assert client.get('/').status_code == 200
+        assert shop.translate('home') == 'Accueil'
@@ -1,24 +1,121 @@
-# Translation module
+# Translation module: <lang>.json catalogs compiled once and kept in memory
 import json
+import logging
 import os
+import threading
+import time
+from types import MappingProxyType
 
 TRANSLATIONS_DIR = os.path.dirname(__file__)
+DEFAULT_LANGUAGE = 'en'
+EMPTY = MappingProxyType({})
+
+logger = logging.getLogger(__name__)
+
+
+def fallback_chain(lang, default=DEFAULT_LANGUAGE):
+    """Languages to try for ``lang``: itself, its base language (fr-CA -> fr), then the default"""
+    chain = [lang]
+    base = lang.replace('_', '-').split('-')[0]
+    if base != lang:
+        chain.append(base)
+    if default not in chain:
+        chain.append(default)
+    return tuple(chain)
+
+
+class TranslationCatalogs:
+    """Every ``<lang>.json`` compiled into a read-only mapping with fallbacks applied.
+
+    A language's mapping already holds the default language's strings for
+    the keys it lacks (ar -> en, fr -> en), so a lookup is a single dict
+    access and never touches the filesystem. With ``auto_reload`` (for
+    development) the files are re-checked at most every ``check_interval``
+    seconds and recompiled when one of them changed.
+    """
+
+    def __init__(self, directory=TRANSLATIONS_DIR, default=DEFAULT_LANGUAGE, auto_reload=False, check_interval=1.0):
+        self.directory = directory
+        self.default = default
+        self.auto_reload = auto_reload
+        self.check_interval = check_interval
+        self._compiled = None  # (file stamps, sorted languages, {lang: mapping})
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.auto_reload = app.config.setdefault('TRANSLATIONS_AUTO_RELOAD', app.debug)
+        # Compiled before workers fork or serve, not on the first request
+        self.reload()
+
+    def _stamps(self):
+        stamps = {}
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                stat = os.stat(os.path.join(self.directory, name))
+                stamps[name[:-len('.json')]] = (stat.st_mtime_ns, stat.st_size)
+        return stamps
+
+    def _compile(self, stamps):
+        raw = {}
+        for lang in stamps:
+            with open(os.path.join(self.directory, f'{lang}.json'), 'r', encoding='utf-8') as f:
+                raw[lang] = json.load(f)
+        compiled = {}
+        for lang in raw:
+            merged = {}
+            for source in reversed(fallback_chain(lang, self.default)):
+                merged.update(raw.get(source, {}))
+            compiled[lang] = MappingProxyType(merged)
+        return stamps, tuple(sorted(raw)), compiled
+
+    def reload(self):
+        """Recompile from disk; a broken file keeps the previous catalogs in service"""
+        with self._lock:
+            stamps = self._stamps()
+            if self._compiled is None:
+                self._compiled = self._compile(stamps)
+            elif stamps != self._compiled[0]:
+                try:
+                    self._compiled = self._compile(stamps)
+                except (OSError, ValueError):
+                    logger.exception('Could not reload translations; keeping the previous catalogs')
+                    self._compiled = (stamps,) + self._compiled[1:]
+            self._checked_at = time.monotonic()
+            return self._compiled
+
+    def _state(self):
+        compiled = self._compiled
+        if compiled is None:
+            return self.reload()
+        if self.auto_reload and time.monotonic() - self._checked_at >= self.check_interval:
+            return self.reload()
+        return compiled
+
+    @property
+    def languages(self):
+        return self._state()[1]
+
+    def catalog(self, lang=None):
+        """Read-only mapping for ``lang``, following its fallback chain when it has no file"""
+        compiled = self._state()[2]
+        for candidate in fallback_chain(lang or self.default, self.default):
+            if candidate in compiled:
+                return compiled[candidate]
+        return EMPTY
+
+    def gettext(self, key, lang=None):
+        return self.catalog(lang).get(key, key)
+
+
+catalogs = TranslationCatalogs()
+
 
 def load_translations(lang='en'):
-    """Load translations for specified language"""
-    filepath = os.path.join(TRANSLATIONS_DIR, f'{lang}.json')
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except:
-        # Fallback to English
-        with open(os.path.join(TRANSLATIONS_DIR, 'en.json'), 'r', encoding='utf-8') as f:
-            return json.load(f)
+    """Load translations for specified language (read-only; English fills any gaps)"""
+    return catalogs.catalog(lang)
+
 
 def get_available_languages():
     """Get list of available languages"""
-    languages = []
-    for file in os.listdir(TRANSLATIONS_DIR):
-        if file.endswith('.json'):
-            languages.append(file.replace('.json', ''))
-    return sorted(languages)
+    return list(catalogs.languages)